@@ -18,6 +18,8 @@
 #
 """Artifacts defintions internally used to refer to intermediate results."""
 
+import io
+import mmap
 from enum import Enum
 from pathlib import Path
 
@@ -69,8 +71,20 @@ def lookup_artifacts(artifacts, name=None, fmt=None, flags=None, first_only=Fals
     return matches
 
 
+def map_file(path):
+    """Map a file read-only into memory. Its pages are only loaded (and shared with other processes) when accessed."""
+    with open(path, "rb") as handle:
+        if Path(path).stat().st_size == 0:
+            return b""  # Empty files can not be mapped
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
 class Artifact:
-    """Artifact type."""
+    """Artifact type.
+
+    Artifacts can either hold their data in memory (content/raw) or refer to a file (path) which is only read when the
+    data is actually accessed. Binary files are mapped into memory instead of being read.
+    """
 
     def __init__(
         self,
@@ -83,23 +97,90 @@ class Artifact:
         flags=None,
         archive=False,
         optional=False,
+        temporary=False,
     ):
         # TODO: Allow to store filenames as well as raw data
         self.name = name
         # TODO: too many attributes...
-        self.content = content
+        self._content = content
         self.path = path
         self.data = data
-        self.raw = raw
+        self._raw = raw
         self.fmt = fmt
         self.flags = flags if flags is not None else {}
         self.archive = archive
         self.optional = optional
+        self.temporary = temporary  # The file at path is moved instead of copied on export
         self.validate()
 
     def __repr__(self):
         return f"Artifact({self.name}, fmt={self.fmt}, flags={self.flags})"
 
+    @property
+    def content(self):
+        """Text content of the artifact, which is read from the exported file if it was unloaded."""
+        if self._content is None and self._loadable:
+            with utils.open_compressed(self.path, "rt", encoding="utf-8") as handle:
+                self._content = handle.read()
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    @property
+    def raw(self):
+        """Binary content of the artifact, which is mapped from the exported file if it was unloaded."""
+        if self._raw is None and self._loadable:
+            self._raw = map_file(self.path)
+        return self._raw
+
+    @raw.setter
+    def raw(self, value):
+        self._raw = value
+
+    @property
+    def _loadable(self):
+        return self.fmt != ArtifactFormat.PATH and self.path is not None and Path(self.path).is_file()
+
+    def open(self):
+        """Open the text content of the artifact for reading without loading an exported file into memory.
+
+        Files compressed with gzip or zstd are decompressed on the fly.
+        """
+        assert self.fmt in [ArtifactFormat.TEXT, ArtifactFormat.SOURCE], "Only text artifacts can be opened"
+        if self._content is None and self._loadable:
+            return utils.open_compressed(self.path, "rt", encoding="utf-8", errors="replace")
+        return io.StringIO(self.content)
+
+    def unload(self):
+        """Drop the in-memory data of an exported artifact. It will be read from the disk again when required."""
+        if self._loadable:
+            self._content = None
+            self._raw = None
+
+    @property
+    def in_memory(self):
+        """Returns true if the data of the artifact is held in memory (mapped files do not count)."""
+        return self._content is not None or isinstance(self._raw, (bytes, bytearray))
+
+    @property
+    def memory_size(self):
+        """Approximate number of bytes held in memory by this artifact."""
+        ret = 0
+        if self._content is not None:
+            ret += len(self._content)
+        if isinstance(self._raw, (bytes, bytearray)):
+            ret += len(self._raw)
+        return ret
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if isinstance(state["_raw"], mmap.mmap):
+            # Mappings can not be pickled, the (rarely needed) data is copied instead
+            state["_raw"] = state["_raw"][:] if not self._loadable else None
+        return state
+
     @property
     def exported(self):
         """Returns true if the artifact was writtem to disk."""
@@ -107,12 +188,13 @@ class Artifact:
 
     def validate(self):
         """Checker for artifact attributes for the given format."""
+        # File-backed artifacts are not read into memory here
         if self.fmt in [ArtifactFormat.TEXT, ArtifactFormat.SOURCE]:
-            assert self.content is not None
+            assert self._content is not None or self._loadable
         elif self.fmt in [ArtifactFormat.RAW, ArtifactFormat.BIN]:
-            assert self.raw is not None
+            assert self._raw is not None or self._loadable
         elif self.fmt in [ArtifactFormat.MLF, ArtifactFormat.SHARED_OBJECT]:
-            assert self.raw is not None
+            assert self._raw is not None or self._loadable
         elif self.fmt in [ArtifactFormat.PATH]:
             assert self.path is not None
         else:
@@ -135,6 +217,24 @@ class Artifact:
             filename = dest / self.name
         else:
             filename = dest
+        file_backed = not self.in_memory and self._loadable
+        if file_backed and Path(self.path).resolve() == filename.resolve():
+            # Already exported to this location
+            if extract:
+                utils.extract(filename, dest)
+            return
+        if file_backed and not extract:
+            # Large file-backed artifacts (i.e. instruction traces or ELFs) never have to enter memory
+            if self.temporary:
+                utils.move(self.path, filename)
+                self.path = filename
+                self.temporary = False
+            else:
+                utils.link_or_copy(self.path, filename)
+            return
+        # Never write through a hardlink to the file of another artifact
+        if filename.is_file() and not (self._loadable and Path(self.path).resolve() == filename.resolve()):
+            filename.unlink()
         if self.fmt in [ArtifactFormat.TEXT, ArtifactFormat.SOURCE]:
             assert not extract, "extract option is only available for ArtifactFormat.MLF"
             with open(filename, "w", encoding="utf-8") as handle:
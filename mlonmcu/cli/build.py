@@ -61,6 +61,8 @@ def get_parser(subparsers, parent=None):
 
 def _handle(args, context, require_target=False):
     handle_load(args, ctx=context)
+    if context.sessions[-1].resumed:
+        return
     backends = extract_backend_names(args, context=context)
     targets = extract_target_names(args, context=context if require_target else None)
     platforms = extract_platform_names(args, context=context)
@@ -69,42 +71,39 @@ def _handle(args, context, require_target=False):
     platform_backends = get_platforms_backends(context, config=new_config)  # This will be slow?
     platform_targets = get_platforms_targets(context, config=new_config)  # This will be slow?
 
+    # The platforms are resolved once per backend/target instead of once per run
+    backend_platforms = {
+        backend_name: [platform for platform in platforms if backend_name in platform_backends[platform]]
+        for backend_name in backends
+        if backend_name is not None
+    }
+    target_platforms = {}
+    for target_name in targets:
+        if target_name is None:
+            continue
+        platform_name = None
+        for platform in platforms:
+            candidates = platform_targets[platform]
+            if target_name in candidates:
+                platform_name = platform
+        assert platform_name is not None, f"Unable to find a suitable platform for the target '{target_name}'"
+        target_platforms[target_name] = platform_name
+
     assert len(context.sessions) > 0
     session = context.sessions[-1]
     new_runs = []
     for run in session.runs:
         for target_name in targets:
             for backend_name in backends:
+                # The components are only instantiated once the run gets processed
                 new_run = run.copy()
-                if backend_name is not None:
-                    platform_name = None
-                    for platform in platforms:
-                        candidates = platform_backends[platform]
-                        if backend_name in candidates:
-                            try:
-                                platform_name = platform
-                                new_run.add_platform_by_name(platform_name, context=context)
-                                break
-                            except AssertionError:  # TODO: replace with incompatble error
-                                platform_name = None
-                                continue
-                    # assert (
-                    #     platform_name is not None
-                    # ), f"Unable to find a suitable platform for the backend '{target_name}'"
-                    # assert platform_name is not None
-
                 if target_name is not None:
-                    platform_name = None
-                    for platform in platforms:
-                        candidates = platform_targets[platform]
-                        if target_name in candidates:
-                            platform_name = platform
-                    assert (
-                        platform_name is not None
-                    ), f"Unable to find a suitable platform for the target '{target_name}'"
-                    new_run.add_platform_by_name(platform_name, context=context)
-                    new_run.add_target_by_name(target_name, context=context)
-                new_run.add_backend_by_name(backend_name, context=context)
+                    # The platform of the target is also used for the backend
+                    new_run.defer_component("platform", target_platforms[target_name])
+                    new_run.defer_component("target", target_name)
+                elif backend_name is not None and len(backend_platforms[backend_name]) > 0:
+                    new_run.defer_component("platform", *backend_platforms[backend_name], optional=True)
+                new_run.defer_component("backend", backend_name)
                 new_runs.append(new_run)
 
     session.runs = new_runs
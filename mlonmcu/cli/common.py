@@ -21,9 +21,6 @@ import sys
 import multiprocessing
 import logging
 
-from mlonmcu.platform import get_platforms
-from mlonmcu.session.postprocess import SUPPORTED_POSTPROCESSES
-from mlonmcu.feature.features import get_available_feature_names
 from mlonmcu.logging import get_logger, set_log_level
 from .helper.parse import extract_config
 
@@ -43,6 +40,11 @@ def handle_logging_flags(args):
 
 
 def add_flow_options(parser):
+    # Only required by the flow subcommands, hence not imported at the module level
+    from mlonmcu.platform import get_platforms
+    from mlonmcu.session.postprocess import SUPPORTED_POSTPROCESSES
+    from mlonmcu.feature.features import get_available_feature_names
+
     flow_parser = parser.add_argument_group("flow options")
     flow_parser.add_argument(  # TODO: move to compile.py?
         "-t",
@@ -140,7 +142,7 @@ def add_flow_options(parser):
     flow_parser.add_argument(
         "--resume",
         action="store_true",
-        help="Try to resume the latest session (default: %(default)s)",
+        help="Continue the unfinished runs of the latest session from their checkpoints (default: %(default)s)",
     )
     flow_parser.add_argument(  # TODO: move to compile.py?
         "-l",
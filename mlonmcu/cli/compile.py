@@ -44,6 +44,8 @@ def get_parser(subparsers):
 
 def _handle(args, context):
     handle_build(args, ctx=context)
+    if context.sessions[-1].resumed:
+        return
     targets = extract_target_names(args, context=context)  # This will eventually be ignored below
     platforms = extract_platform_names(args, context=context)
 
@@ -54,7 +56,7 @@ def _handle(args, context):
     session = context.sessions[-1]
     new_runs = []
     for run in session.runs:
-        if run.target is None:
+        if run.target is None and not run.is_pending("target"):
             # assert run.compile_platform is None
             targets_ = targets
         else:
@@ -67,8 +69,8 @@ def _handle(args, context):
                     candidates = platform_targets[platform]
                     if target_name in candidates:
                         platform_name = platform
-                new_run.add_platform_by_name(platform_name, context=context)
-                new_run.add_target_by_name(target_name, context=context)
+                new_run.defer_component("platform", platform_name)
+                new_run.defer_component("target", target_name)
             new_runs.append(new_run)
     session.runs = new_runs
 
@@ -65,6 +65,8 @@ def _handle(args, context):
     frontends = extract_frontend_names(args, context=context)
     postprocesses = extract_postprocess_names(args, context=context)
     session = context.get_session(label=args.label, resume=args.resume, config=config)
+    if session.resumed:
+        return  # The restored runs already have their models, features and configs
     models = apply_modelgroups(args.models, context=context)
     for model in models:
         for f in gen_features:
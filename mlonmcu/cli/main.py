@@ -20,24 +20,38 @@
 
 import os
 import argparse
+import importlib
 import sys
 import subprocess
 import platform
 
 
 from mlonmcu.logging import get_logger
-import mlonmcu.cli.init as init
-import mlonmcu.cli.setup as setup
-import mlonmcu.cli.flow as flow
-import mlonmcu.cli.cleanup as cleanup
-import mlonmcu.cli.export as export
-import mlonmcu.cli.env as env
-import mlonmcu.cli.models as models
 from .common import handle_logging_flags, add_common_options
 from ..version import __version__
 
 logger = get_logger()
 
+# Only the module of the selected subcommand is imported to keep the startup time of the CLI low
+SUBCOMMANDS = {
+    "init": ("mlonmcu.cli.init", "Initialize ML on MCU environment."),
+    "setup": ("mlonmcu.cli.setup", "Setup ML on MCU dependencies."),
+    "flow": ("mlonmcu.cli.flow", "Invoke ML on MCU flow"),
+    "cleanup": ("mlonmcu.cli.cleanup", "Cleanup ML on MCU environment."),
+    "export": ("mlonmcu.cli.export", "Export ML on MCU sessions/runs."),
+    "env": ("mlonmcu.cli.env", "List ML on MCU environments."),
+    "models": ("mlonmcu.cli.models", "Manage ML on MCU models."),
+    "results": ("mlonmcu.cli.results", "Query the results of all ML on MCU sessions."),
+}
+
+
+def get_subcommand(args):
+    """Find the name of the selected subcommand in the command line arguments."""
+    for arg in args:
+        if not arg.startswith("-"):
+            return arg if arg in SUBCOMMANDS else None
+    return None
+
 
 def handle_docker(args):
     if args.docker:
@@ -82,6 +96,7 @@ def handle_docker(args):
 def main(args=None):
     """Console script for mlonmcu."""
     parser = argparse.ArgumentParser(
+        prog="mlonmcu",
         description="ML on MCU Flow",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
@@ -89,17 +104,16 @@ def main(args=None):
     parser.add_argument("-V", "--version", action="version", version="mlonmcu " + __version__)
     add_common_options(parser)
     subparsers = parser.add_subparsers(dest="subcommand")  # this line changed
-    init.get_parser(subparsers)
-    setup.get_parser(subparsers)
-    flow.get_parser(subparsers)
-    cleanup.get_parser(subparsers)
-    export.get_parser(subparsers)
-    env.get_parser(subparsers)
-    models.get_parser(subparsers)
-    if args:
-        args = parser.parse_args(args)
-    else:
-        args = parser.parse_args()
+    if not args:
+        args = sys.argv[1:]
+    selected = get_subcommand(args)
+    for name, (module, description) in SUBCOMMANDS.items():
+        if name == selected:
+            importlib.import_module(module).get_parser(subparsers)
+        else:
+            # The other subcommands only need to be listed in the help message
+            subparsers.add_parser(name, description=description, help=description)
+    args = parser.parse_args(args)
     handle_logging_flags(args)
     handle_docker(args)
 
@@ -0,0 +1,201 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Command line subcommand for querying the results of all sessions."""
+
+import csv
+import sys
+
+from mlonmcu.context.context import MlonMcuContext
+from mlonmcu.session.results_store import get_results_store, KEY_COLUMNS, AGGREGATES
+from mlonmcu.cli.common import add_common_options, add_context_options
+
+
+def add_query_options(parser):
+    query_parser = parser.add_argument_group("query options")
+    for column in ["label", "model", "backend", "target", "platform", "framework"]:
+        query_parser.add_argument(
+            f"--{column}",
+            type=str,
+            action="append",
+            default=None,
+            help=f"Only consider runs with the given {column} (can be used multiple times)",
+        )
+    query_parser.add_argument(
+        "-f",
+        "--feature",
+        type=str,
+        action="append",
+        default=None,
+        help="Only consider runs which used the given feature (can be used multiple times)",
+    )
+    query_parser.add_argument(
+        "-m",
+        "--metric",
+        type=str,
+        action="append",
+        default=None,
+        help="Metrics to be shown (default: all)",
+    )
+    query_parser.add_argument(
+        "-g",
+        "--group-by",
+        type=str,
+        action="append",
+        default=None,
+        choices=KEY_COLUMNS,
+        help="Aggregate the metrics for each group of runs",
+    )
+    query_parser.add_argument(
+        "-a",
+        "--aggregate",
+        type=str,
+        default="avg",
+        choices=AGGREGATES,
+        help="Aggregation function used with --group-by (default: %(default)s)",
+    )
+    query_parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        help="Only consider sessions started at or after the given date (i.e. 2024-01-31)",
+    )
+    query_parser.add_argument(
+        "-n",
+        "--limit",
+        type=int,
+        default=None,
+        help="Maximum number of rows",
+    )
+    query_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Write the results to a CSV file instead of printing them",
+    )
+    query_parser.add_argument(
+        "--list-metrics",
+        default=False,
+        action="store_true",
+        help="List the names of all stored metrics",
+    )
+
+
+def add_compact_options(parser):
+    compact_parser = parser.add_argument_group("compact options")
+    compact_parser.add_argument(
+        "-s",
+        "--session",
+        metavar="SESSION",
+        type=int,
+        default=None,
+        help="Session whose incremental report should be compacted (default: latest session id)",
+    )
+    compact_parser.add_argument(
+        "--no-db",
+        dest="db",
+        default=True,
+        action="store_false",
+        help="Do not add the recovered rows to the results database",
+    )
+
+
+def get_parser(subparsers):
+    """ "Define and return a subparser for the results subcommand."""
+    parser = subparsers.add_parser("results", description="Query the results of all ML on MCU sessions.")
+    parser.set_defaults(func=handle)
+    add_common_options(parser)
+    add_context_options(parser)
+    subparsers = parser.add_subparsers(dest="subcommand2")
+    query_parser = subparsers.add_parser("query", description="Filter and aggregate the stored results.")
+    query_parser.set_defaults(results_func=handle_query)
+    add_query_options(query_parser)
+    compact_parser = subparsers.add_parser(
+        "compact", description="Recover the report of an interrupted session from its incremental report."
+    )
+    compact_parser.set_defaults(results_func=handle_compact)
+    add_compact_options(compact_parser)
+    return parser
+
+
+def print_table(columns, rows, file=sys.stdout):
+    def fmt(value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.6g}"
+        return str(value)
+
+    lines = [[fmt(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(line[i]) for line in lines]) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)), file=file)
+    for line in lines:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)), file=file)
+
+
+def handle_query(args, context):
+    store = get_results_store(context.environment.paths["results"].path)
+    if args.list_metrics:
+        for name in store.get_metric_names():
+            print(name)
+        return
+    filters = {
+        column: getattr(args, column)
+        for column in ["label", "model", "backend", "target", "platform", "framework"]
+        if getattr(args, column)
+    }
+    columns, rows = store.query(
+        filters=filters,
+        features=args.feature,
+        metrics=args.metric,
+        group_by=args.group_by,
+        aggregate=args.aggregate,
+        since=args.since,
+        limit=args.limit,
+    )
+    if args.output:
+        with open(args.output, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    else:
+        print_table(columns, rows)
+
+
+def handle_compact(args, context):
+    sessions = [session for session in context.sessions if not session.active]
+    if args.session is not None:
+        sessions = [session for session in sessions if session.idx == args.session]
+        assert len(sessions) > 0, f"Session {args.session} does not exist"
+    assert len(sessions) > 0, "There is no recent session available"
+    session = sessions[-1]
+    results_dir = context.environment.paths["results"].path
+    report = session.compact_report(results_dir=results_dir, results_db=args.db)
+    if report is None:
+        print(f"Session {session.idx} does not have an incremental report")
+        sys.exit(1)
+    print(f"Recovered {len(report.df)} row(s) of session {session.idx}")
+
+
+def handle(args):
+    if not hasattr(args, "results_func"):
+        print("Invalid command. Check 'mlonmcu results --help' for the available subcommands!")
+        sys.exit(1)
+    with MlonMcuContext(path=args.home, deps_lock="read") as context:
+        args.results_func(args, context)
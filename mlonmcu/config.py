@@ -17,7 +17,6 @@
 # limitations under the License.
 #
 """Collection of utilities to manage MLonMCU configs."""
-import distutils.util
 import ast
 
 from mlonmcu.feature.type import FeatureType
@@ -206,6 +205,11 @@ def resolve_required_config(
     return ret
 
 
+# Same values as accepted by distutils.util.strtobool (importing distutils is slow and it was removed in Python 3.12)
+TRUE_VALUES = ("y", "yes", "t", "true", "on", "1")
+FALSE_VALUES = ("n", "no", "f", "false", "off", "0")
+
+
 def str2bool(value, allow_none=False):
     if value is None:
         assert allow_none, "str2bool received None value while allow_none=False"
@@ -213,7 +217,12 @@ def str2bool(value, allow_none=False):
     if isinstance(value, (int, bool)):
         return bool(value)
     assert isinstance(value, str)
-    return bool(distutils.util.strtobool(value))
+    value_ = value.lower()
+    if value_ in TRUE_VALUES:
+        return True
+    if value_ in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid truth value {value!r}")
 
 
 def str2dict(value, allow_none=False):
@@ -28,12 +28,12 @@ import filelock
 
 from mlonmcu.utils import ask_user
 from mlonmcu.logging import get_logger, set_log_file
-from mlonmcu.session.run import Run
 from mlonmcu.session.session import Session
 from mlonmcu.setup.cache import TaskCache
 import mlonmcu.setup.utils as utils
 from mlonmcu.plugins import process_extensions
 from mlonmcu.context.read_write_filelock import ReadFileLock, WriteFileLock, RWLockTimeout
+from mlonmcu.context.session_index import SessionIndex, get_ids  # noqa: F401
 
 from mlonmcu.environment.environment import Environment, UserEnvironment
 
@@ -130,26 +130,21 @@ def get_environment_by_name(name: str) -> Environment:
     return None
 
 
-def get_ids(directory: Path) -> List[int]:
-    """Get a sorted list of ids for sessions/runs found in the given directory.
+class ArchivedRun:
+    """Lightweight reference to a run of a previous session."""
 
-    Parameters
-    ----------
-    directory : Path
-        Directory where the sessions/runs are stored.
+    archived = True
+    resumed = False
 
-    Returns:
-    list
-        List of integers representing the session numbers. Empty list if directory does not exist.
-    """
-    if not directory.is_dir():
-        return []
+    def __init__(self, idx, directory):
+        self.idx = idx
+        self.dir = directory
 
-    ids = [int(o) for o in os.listdir(directory) if os.path.isdir(directory / o) and not os.path.islink(directory / o)]
-    return sorted(ids)  # TODO: sort by session datetime?
+    def __repr__(self):
+        return f"ArchivedRun(idx={self.idx})"
 
 
-def load_recent_sessions(env: Environment, count: int = None) -> List[Session]:
+def load_recent_sessions(env: Environment, count: int = None, index: SessionIndex = None) -> List[Session]:
     """Get a list of recent sessions for the environment.
 
     Parameters
@@ -158,6 +153,8 @@ def load_recent_sessions(env: Environment, count: int = None) -> List[Session]:
         MLonMCU environment which should be used.
     count : int
         Maximum number of sessions to return. Collect all if None.
+    index : SessionIndex
+        Index of the sessions directory. Created and loaded if not provided.
 
     Returns
     -------
@@ -171,28 +168,19 @@ def load_recent_sessions(env: Environment, count: int = None) -> List[Session]:
 
     sessions_directory = env.paths["temp"].path / "sessions"
 
-    # TODO: in the future also strs (custom or hash) should be allowed
-    session_ids = get_ids(sessions_directory)
+    # The index is used to avoid scanning all session and run directories
+    if index is None:
+        index = SessionIndex(sessions_directory)
+        index.load()
 
-    for sid in session_ids:
+    # TODO: in the future also strs (custom or hash) should be allowed
+    for sid, entry in sorted(index.entries.items()):
         session_directory = sessions_directory / str(sid)
-        # session_file = sessions_directory / str(sid) / "session.txt"
-        # if not session_file.is_file():
-        #     continue
         runs_directory = session_directory / "runs"
-        run_ids = get_ids(runs_directory)
-        runs = []
-        for rid in run_ids:
-            run_directory = runs_directory / str(rid)
-            # run_file = run_directory / "run.txt"
-            # run = Run.from_file(run_file)  # TODO: actually implement run restore
-            run = Run()  # TODO: fix
-            run.archived = True
-            run.dir = run_directory
-            runs.append(run)
-        session = Session(idx=sid, archived=True, dir=session_directory)
+        # TODO: actually implement run restore
+        runs = [ArchivedRun(rid, runs_directory / str(rid)) for rid in entry["runs"]]
+        session = Session(idx=sid, label=entry.get("label") or "", archived=True, dir=session_directory)
         session.runs = runs
-        session.dir = session_directory
         sessions.append(session)
     return sessions
 
@@ -275,19 +263,22 @@ class MlonMcuContext:
         self.environment = UserEnvironment.from_file(env_file)  # TODO: move to __enter__
         setup_logging(self.environment)
         assert deps_lock in ["read", "write"]
+        lock_timeout = self.environment.defaults.lock_timeout
         if deps_lock == "read":
-            self.deps_lock = ReadFileLock(os.path.join(self.environment.home, ".deps_lock"))
+            self.deps_lock = ReadFileLock(os.path.join(self.environment.home, ".deps_lock"), timeout=lock_timeout)
         elif deps_lock == "write":
-            self.deps_lock = WriteFileLock(os.path.join(self.environment.home, ".deps_lock"))
+            self.deps_lock = WriteFileLock(os.path.join(self.environment.home, ".deps_lock"), timeout=lock_timeout)
         self.latest_session_link_lock = filelock.FileLock(
             os.path.join(self.environment.home, ".latest_session_link_lock_lock")
         )
-        self.sessions = load_recent_sessions(self.environment)
+        self.session_index = SessionIndex(self.environment.paths["temp"].path / "sessions")
+        with self.latest_session_link_lock:
+            self.session_index.load()
+        self.sessions = load_recent_sessions(self.environment, index=self.session_index)
+        self.session_idx = self.session_index.last_idx
         if self.environment.defaults.cleanup_auto:
             logger.debug("Cleaning up old sessions automaticaly")
             self.cleanup_sessions(keep=self.environment.defaults.cleanup_keep, interactive=False)
-            self.sessions = load_recent_sessions(self.environment)
-        self.session_idx = self.sessions[-1].idx if len(self.sessions) > 0 else -1
         logger.debug(f"Restored {len(self.sessions)} recent sessions")
         self.cache = TaskCache()
         self.export_paths = set()
@@ -300,8 +291,9 @@ class MlonMcuContext:
         else:
             with lock:
                 """Create a new session in the current context."""
-                self.sessions = load_recent_sessions(self.environment)
-                idx = self.session_idx + 1
+                # Sessions might have been created by other processes in the meantime
+                self.session_index.load()
+                idx = max(self.session_idx, self.session_index.last_idx) + 1
                 logger.debug("Creating a new session with idx %s", idx)
                 temp_directory = self.environment.paths["temp"].path
                 sessions_directory = temp_directory / "sessions"
@@ -309,6 +301,8 @@ class MlonMcuContext:
                 session = Session(idx=idx, label=label, dir=session_dir, config=config)
                 self.sessions.append(session)
                 self.session_idx = idx
+                self.session_index.update(session)
+                self.session_index.save()
                 # TODO: move this to a helper function
                 session_link = sessions_directory / "latest"
                 if os.path.islink(session_link):
@@ -316,6 +310,17 @@ class MlonMcuContext:
                 os.symlink(session_dir, session_link)
         return session
 
+    def resume_session(self, label="", config=None):
+        """Replace the latest (archived) session by an active one whose runs are restored from their checkpoints."""
+        archived = self.sessions[-1]
+        assert archived.archived, "The latest session is still active"
+        logger.info("Resuming session %s", archived.idx)
+        session = Session(idx=archived.idx, label=label or archived.label, dir=archived.dir, config=config)
+        session.restore_runs()
+        self.sessions[-1] = session
+        self.session_idx = session.idx
+        return session
+
     def load_cache(self):
         """If available load the cache.ini file in the deps directory"""
         if self.environment:
@@ -356,6 +361,11 @@ class MlonMcuContext:
     def get_session(self, label="", resume=False, config=None) -> Session:
         """Get an active session if available, else create a new one.
 
+        Parameters
+        ----------
+        resume : bool
+            Continue the runs of the latest session from their checkpoints instead of creating new runs.
+
         Returns
         -------
         Session:
@@ -363,9 +373,9 @@ class MlonMcuContext:
         """
         if resume:
             assert len(self.sessions) > 0, "There is no recent session available"
-            # session = self.sessions[-1]
-            assert False, "The latest session can not be resumed"
-            raise NotImplementedError
+            if self.sessions[-1].archived:
+                self.resume_session(label=label, config=config)
+            return self.sessions[-1]
 
         if self.session_idx < 0 or not self.sessions[-1].active:
             self.create_session(label=label, config=config)
@@ -373,18 +383,14 @@ class MlonMcuContext:
 
     def __enter__(self):
         logger.debug("Enter MlonMcuContext")
-        if self.deps_lock.is_locked:
-            raise RuntimeError(
-                "Lock on current context could not be acquired. "
-                f"Current context is locked via: {self.deps_lock.filepath}"
-            )
         if self.deps_lock:
             logger.debug("Locking context")
             try:
+                # Blocks until the environment is not used by a conflicting session anymore
                 self.deps_lock.acquire()
             except RWLockTimeout as err:
                 raise RuntimeError(
-                    "Lock on current context could not be aquired. "
+                    "Lock on current context could not be acquired. "
                     f"Current context is locked via: {self.deps_lock.filepath}"
                 ) from err
         self.load_cache()
@@ -397,6 +403,21 @@ class MlonMcuContext:
         for session in self.sessions:
             if session.active:
                 session.close()
+        self.update_session_index()
+
+    def update_session_index(self):
+        """Write the status and runs of the sessions created in this context to the index."""
+        created = [session for session in self.sessions if not session.archived]
+        if len(created) == 0:
+            return
+        with self.latest_session_link_lock:
+            self.session_index.load()
+            for session in created:
+                if session.dir.is_dir():
+                    self.session_index.update(session)
+                else:  # Discarded
+                    self.session_index.remove([session.idx])
+            self.session_index.save()
 
     @property
     def is_clean(self):
@@ -427,6 +448,10 @@ class MlonMcuContext:
                         # Skip / Dir does not exist
                         continue
                     shutil.rmtree(session_dir)
+                with self.latest_session_link_lock:
+                    self.session_index.load()
+                    self.session_index.remove([session.idx for session in to_remove])
+                    self.session_index.save()
                 self.sessions = to_keep
                 self.session_idx = self.sessions[-1].idx if len(self.sessions) > 0 else -1
                 if interactive:
@@ -17,17 +17,61 @@
 # limitations under the License.
 #
 """
-This file contains read lock and write lock classes based on filelock
-The locks are non-blocking.
+This file contains blocking read lock and write lock classes based on filelock.
+
+Every holder (and waiter) of a lock is represented by an empty marker file in a directory next to the lock file. The
+name of the marker encodes a ticket, the kind of lock, its state and the owning process. Hence the lock situation can
+be determined by listing the directory and acquiring or releasing a lock only creates, renames or deletes a single
+marker instead of rewriting a shared tracking file. The filelock itself is only held for a short moment while the
+markers are inspected.
+
+Locks are granted in the order of their tickets: a waiting writer blocks readers which arrived after it, so writers can
+not be starved by a steady stream of readers. Markers of processes which are not alive anymore (on the same host) are
+removed automatically, so a crashed session does not block the environment forever.
 """
 
-from filelock import FileLock
-import uuid  # this is used to create a identifier for every ReadFileLock and WriteFileLock instance.
-import datetime  # this is used to track the lock actions
 import os
-import yaml
-from pathlib import Path
+import time
+import uuid  # this is used to create a identifier for every ReadFileLock and WriteFileLock instance.
+import socket
 import atexit
+from collections import namedtuple
+from pathlib import Path
+
+from filelock import FileLock
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+HOSTNAME = socket.gethostname()
+
+LockEntry = namedtuple("LockEntry", ["ticket", "kind", "state", "pid", "id", "host", "path"])
+
+
+def pid_alive(pid):
+    """Check if a process with the given PID is running on this host."""
+    if os.name == "nt":
+        return True  # os.kill would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Process exists but belongs to another user
+    return True
+
+
+def parse_entry(path):
+    """Parse the name of a marker file. Returns None for unrelated files."""
+    # The hostname goes last because it might contain the separator
+    parts = path.name.split("_", 5)
+    if len(parts) != 6 or not parts[0].isdigit() or not parts[3].isdigit():
+        return None
+    ticket, kind, state, pid, lock_id, host = parts
+    if kind not in ["read", "write"] or state not in ["waiting", "held"]:
+        return None
+    return LockEntry(int(ticket), kind, state, int(pid), lock_id, host, path)
 
 
 class RWLockTimeout(TimeoutError):
@@ -41,287 +85,163 @@ class RWLockTimeout(TimeoutError):
         return f"The lock with id '{self.lock.id}' in env '{self.lock.filepath.parent}' could not be acquired."
 
 
-class ReadFileLock:
-    def __init__(self, filepath):
+class RWFileLock:
+    """Base class for the read and write locks.
+
+    Parameters
+    ----------
+    filepath : str or Path
+        Path of the lock file. The markers are stored in the directory `<filepath>_holders`.
+    timeout : float
+        Default number of seconds to wait in `acquire()`. A negative value waits forever, 0 does not wait at all.
+    poll_interval : float
+        Number of seconds to sleep between two attempts.
+    """
+
+    KIND = None
+
+    def __init__(self, filepath, timeout=-1, poll_interval=0.1):
         self.filepath = Path(filepath)
-        self.trackfilepath = self.filepath.parent / (str(self.filepath.stem) + "_track")
+        self.trackdir = self.filepath.parent / (str(self.filepath.name) + "_holders")
         self.lock = FileLock(self.filepath)
         self.id = str(uuid.uuid4())
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.entry = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
 
-    def acquire(self, raise_exception=True):
+    @property
+    def acquired(self):
+        """Returns true if the lock is held by this instance."""
+        return self.entry is not None and self.entry.state == "held"
+
+    def get_entries(self):
+        """List the markers of all other holders and waiters while removing the ones of dead processes.
+
+        Needs to be called while the filelock is held.
         """
-        This function tried to acquire a ReadFileLock.
-        The process is the following:
-        1. acquire filelock
-        2. read the lock occupation situation
-        3. check if the lock is already occupied by another write process
-        4.1. release filelock and raise exception(or return 0) if the lock is already occupied by another write process
-        4.2. otherwise write the updated lock occupation situation back, release filelock and return
+        if not self.trackdir.is_dir():
+            return []
+        entries = []
+        for path in self.trackdir.iterdir():
+            entry = parse_entry(path)
+            if entry is None or entry.id == self.id:
+                continue
+            if entry.host == HOSTNAME and not pid_alive(entry.pid):
+                logger.warning("Removing stale %s lock of terminated process %d: %s", entry.kind, entry.pid, path)
+                path.unlink(missing_ok=True)
+                continue
+            entries.append(entry)
+        return entries
+
+    def is_blocked_by(self, entry, ticket):
+        """Decide if the given marker of another process prevents this lock (with the given ticket) to be granted."""
+        raise NotImplementedError
+
+    def write_entry(self, ticket, state):
+        name = f"{ticket}_{self.KIND}_{state}_{os.getpid()}_{self.id}_{HOSTNAME}"
+        path = self.trackdir / name
+        if self.entry is None:
+            self.trackdir.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        else:
+            os.rename(self.entry.path, path)
+        self.entry = LockEntry(ticket, self.KIND, state, os.getpid(), self.id, HOSTNAME, path)
+
+    def remove_entry(self):
+        if self.entry is not None:
+            self.entry.path.unlink(missing_ok=True)
+            self.entry = None
+
+    def try_acquire(self):
+        """Make a single attempt to get the lock. A waiting marker is kept if it is not available yet."""
+        with self.lock:
+            entries = self.get_entries()
+            if self.entry is None:
+                ticket = max([entry.ticket for entry in entries], default=0) + 1
+                self.write_entry(ticket, "waiting")
+            if any(self.is_blocked_by(entry, self.entry.ticket) for entry in entries):
+                return False
+            self.write_entry(self.entry.ticket, "held")
+        return True
+
+    def acquire(self, raise_exception=True, timeout=None):
+        """
+        This function tries to acquire the lock and waits until it is available or the timeout expired.
 
             Parameters:
                 raise_exception (bool): whether an exception should be raised when failed (default: True)
+                timeout (float): seconds to wait, overrides the timeout of the instance (default: None)
 
             Returns:
                 success (bool): whether succeeded or not.
-                    True means succeeded, False means failed (if the param raiseException is set to False).
-                    A RWLockTimeout exception will be raised if failed (if the param raiseException is set to True).
+                    True means succeeded, False means failed (if the param raise_exception is set to False).
+                    A RWLockTimeout exception will be raised if failed (if the param raise_exception is set to True).
         """
-
-        # 1. acquire filelock
-        self.lock.acquire(timeout=2)
-
-        # 2. read the lock occupation situation
-        if not os.path.exists(self.trackfilepath):
-            # create a file to tack the lock occupation situation
-            with open(self.trackfilepath, "w") as track_file:
-                pass
-
-        with open(self.trackfilepath, "r") as stream:
-            # read the current lock occupation situation
-            try:
-                lock_occupy_info = yaml.safe_load(stream) or {}
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        # 3. check if the lock is already occupied by another write process
-        write_occupied = False
-        for k, v in lock_occupy_info.items():
-            if v["type"] == "write":
-                write_occupied = True
-                break
-
-        # 4
-        if write_occupied:
-            lock_acquire_success = False
-            self.lock.release()
-            if raise_exception:
-                raise RWLockTimeout(self)
-        else:
-            time_info = datetime.datetime.now().replace(microsecond=0).isoformat()
-            lock_occupy_info[self.id] = {"time": f"{time_info}", "type": "read"}
-            with open(self.trackfilepath, "w") as track_file:
-                yaml.dump(lock_occupy_info, track_file, default_flow_style=False)
-            lock_acquire_success = True
-
-        self.lock.release()
+        if self.acquired:
+            return True
+        if timeout is None:
+            timeout = self.timeout
+        start = time.monotonic()
+        waiting = False
+        try:
+            while not self.try_acquire():
+                if 0 <= timeout <= time.monotonic() - start:
+                    self.remove_entry()
+                    if raise_exception:
+                        raise RWLockTimeout(self)
+                    return False
+                if not waiting:
+                    logger.info("Waiting for %s lock: %s", self.KIND, self.filepath)
+                    waiting = True
+                time.sleep(self.poll_interval)
+        except BaseException:
+            self.remove_entry()
+            raise
         atexit.register(self.release)
-        return lock_acquire_success
+        return True
 
     def release(self):
         """
-        This function releases a ReadFileLock.
-        the process is the following:
-        1. acquire filelock
-        2. read the lock occupation situation
-        3. delete the record of self.id (no exception will be raised if self.id is not found in the record)
-        4. write the updated lock occupation situation back, release filelock and return
+        This function releases the lock (no exception will be raised if it is not held).
         """
-
-        # 1. acquire filelock
-        self.lock.acquire(timeout=2)
-
-        # 2. read the lock occupation situation
-        if not os.path.exists(self.trackfilepath):
-            # raise error if file does not exist
-            raise RuntimeError("track file for read write log is missing.")
-
-        with open(self.trackfilepath, "r") as stream:
-            # read the current lock occupation situation
-            try:
-                lock_occupy_info = yaml.safe_load(stream) or {}
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        # 3. delete the record of self.id
-        if self.id in lock_occupy_info.keys():
-            lock_occupy_info.pop(self.id)
-
-        # 4. write the updated lock occupation situation back, release filelock and return
-        with open(self.trackfilepath, "w") as track_file:
-            if lock_occupy_info:
-                yaml.dump(lock_occupy_info, track_file, default_flow_style=False)
-
-        self.lock.release()
+        self.remove_entry()
+        atexit.unregister(self.release)
 
     @property
     def is_locked(self):
         """
-        This property returns if a lock is occupied(locked) by other processes.
-        the process is the following:
-        1. acquire filelock
-        2. read the lock occupation situation
-        3. check if the lock is already occupied(locked) by another write process
-
-            Returns:
-                is_locked (bool): whether the lock is already occupied(locked) by another write process
-        """
-
-        # 1. acquire filelock
-        self.lock.acquire(timeout=2)
-
-        # 2. read the lock occupation situation
-        if not os.path.exists(self.trackfilepath):
-            # create a file to tack the lock occupation situation
-            with open(self.trackfilepath, "w"):
-                pass
-
-        with open(self.trackfilepath, "r") as stream:
-            # read the current lock occupation situation
-            try:
-                lock_occupy_info = yaml.safe_load(stream) or {}
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        # 3. check if the lock is already occupied by another write process
-        write_occupied = False
-        for k, v in lock_occupy_info.items():
-            if v["type"] == "write":
-                write_occupied = True
-                break
-
-        self.lock.release()
-        return write_occupied
-
-
-class WriteFileLock:
-    def __init__(self, filepath):
-        self.filepath = Path(filepath)
-        self.trackfilepath = self.filepath.parent / (str(self.filepath.stem) + "_track")
-        self.lock = FileLock(self.filepath)
-        self.id = str(uuid.uuid4())
-
-    def acquire(self, raise_exception=True):
-        """
-        This function tried to acquire a WriteFileLock.
-        The process is the following:
-        1. acquire filelock
-        2. read the lock occupation situation
-        3. check if the lock is already occupied by another write process
-        4.1. release filelock and raise exception(or return 0) if the lock is already occupied by another write process
-        4.2. otherwise write the updated lock occupation situation back, release filelock and return
-
-            Parameters:
-                raise_exception (bool): whether raises an exception when failed (default: True)
+        This property returns if the lock is occupied(locked) by other processes.
 
             Returns:
-                success (bool): whether succeeded or not.
-                    True means succeeded, False means failed (if the param raiseException is set to False).
-                    A RWLockTimeout exception will be raised if failed (if the param raiseException is set to True).
+                is_locked (bool): whether acquiring the lock would have to wait
         """
+        with self.lock:
+            entries = self.get_entries()
+        ticket = self.entry.ticket if self.entry is not None else float("inf")
+        return any(self.is_blocked_by(entry, ticket) for entry in entries)
 
-        # 1. acquire filelock
-        self.lock.acquire(timeout=2)
-
-        # 2. read the lock occupation situation
-        if not os.path.exists(self.trackfilepath):
-            # create a file to tack the lock occupation situation
-            with open(self.trackfilepath, "w") as track_file:
-                pass
-
-        with open(self.trackfilepath, "r") as stream:
-            # read the current lock occupation situation
-            try:
-                lock_occupy_info = yaml.safe_load(stream) or {}
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        # 3. check if the lock is already occupied by another process
-        occupied = False
-        for k, v in lock_occupy_info.items():
-            if v["type"] == "write" or "read":
-                occupied = True
-                break
-
-        # 4
-        if occupied:
-            lock_acquire_success = False
-            self.lock.release()
-            if raise_exception:
-                raise RWLockTimeout(self)
-        else:
-            time_info = datetime.datetime.now().replace(microsecond=0).isoformat()
-            lock_occupy_info[self.id] = {"time": f"{time_info}", "type": "write"}
-            with open(self.trackfilepath, "w") as track_file:
-                yaml.dump(lock_occupy_info, track_file, default_flow_style=False)
-            lock_acquire_success = True
 
-        self.lock.release()
-        atexit.register(self.release)
-        return lock_acquire_success
-
-    def release(self):
-        """
-        This function releases a WriteFileLock.
-        the process is the following:
-        1. acquire filelock
-        2. read the lock occupation situation
-        3. delete the record of self.id (no exception will be raised if self.id is not found in the record)
-        4. write the updated lock occupation situation back, release filelock and return
-        """
+class ReadFileLock(RWFileLock):
+    """Shared lock which can be held by multiple readers at the same time."""
 
-        # 1. acquire filelock
-        self.lock.acquire(timeout=2)
+    KIND = "read"
 
-        # 2. read the lock occupation situation
-        if not os.path.exists(self.trackfilepath):
-            # raise error if file does not exist
-            raise RuntimeError("track file for read write log is missing.")
+    def is_blocked_by(self, entry, ticket):
+        # Writers which are waiting since before this reader arrived are served first
+        return entry.kind == "write" and (entry.state == "held" or entry.ticket < ticket)
 
-        with open(self.trackfilepath, "r") as stream:
-            # read the current lock occupation situation
-            try:
-                lock_occupy_info = yaml.safe_load(stream) or {}
-                if lock_occupy_info is None:
-                    lock_occupy_info = {}
-            except yaml.YAMLError as exc:
-                print(exc)
 
-        # 3. delete the record of self.id
-        if self.id in lock_occupy_info.keys():
-            lock_occupy_info.pop(self.id)
+class WriteFileLock(RWFileLock):
+    """Exclusive lock."""
 
-        # 4. write the updated lock occupation situation back, release filelock and return
-        with open(self.trackfilepath, "w") as track_file:
-            if lock_occupy_info:
-                yaml.dump(lock_occupy_info, track_file, default_flow_style=False)
-
-        self.lock.release()
-
-    @property
-    def is_locked(self):
-        """
-        This property returns if a lock is occupied(locked) by other processes.
-        the process is the following:
-        1. acquire filelock
-        2. read the lock occupation situation
-        3. check if the lock is already occupied(locked) by another write process
-
-            Returns:
-                is_locked (bool): whether the lock is already occupied(locked) by another write process
-        """
+    KIND = "write"
 
-        # 1. acquire filelock
-        self.lock.acquire(timeout=2)
-
-        # 2. read the lock occupation situation
-        if not os.path.exists(self.trackfilepath):
-            # create a file to tack the lock occupation situation
-            with open(self.trackfilepath, "w"):
-                pass
-
-        with open(self.trackfilepath, "r") as stream:
-            # read the current lock occupation situation
-            try:
-                lock_occupy_info = yaml.safe_load(stream) or {}
-            except yaml.YAMLError as exc:
-                print(exc)
-
-        # 3. check if the lock is already occupied by another write process
-        occupied = False
-        for k, v in lock_occupy_info.items():
-            if v["type"] == "write" or "read":
-                occupied = True
-                break
-
-        self.lock.release()
-        return occupied
+    def is_blocked_by(self, entry, ticket):
+        return entry.state == "held" or entry.ticket < ticket
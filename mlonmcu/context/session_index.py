@@ -0,0 +1,154 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""On-disk index of the sessions and runs of an environment."""
+
+import os
+import json
+import tempfile
+from typing import List
+from pathlib import Path
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+
+def get_ids(directory: Path) -> List[int]:
+    """Get a sorted list of ids for sessions/runs found in the given directory.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory where the sessions/runs are stored.
+
+    Returns:
+    list
+        List of integers representing the session numbers. Empty list if directory does not exist.
+    """
+    if not directory.is_dir():
+        return []
+
+    ids = [int(o) for o in os.listdir(directory) if os.path.isdir(directory / o) and not os.path.islink(directory / o)]
+    return sorted(ids)  # TODO: sort by session datetime?
+
+
+class SessionIndex:
+    """Index of the sessions (with their labels, status and run ids) stored in a sessions directory.
+
+    Looking up the sessions in the index does not require listing every session and run directory. The index file is
+    replaced atomically on every update and rebuilt from the directory structure if it is missing or invalid.
+
+    Attributes
+    ----------
+    directory : Path
+        The sessions directory of the environment.
+    entries : dict
+        Mapping of session ids to their label, status and run ids.
+    """
+
+    VERSION = 1
+    FILENAME = "index.json"
+    UNFINISHED = ["created", "open"]  # Status of sessions whose runs might be missing in the index
+    UNKNOWN = "unknown"  # Status of sessions found in the directory structure
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.entries = {}
+
+    @property
+    def file(self):
+        return self.directory / self.FILENAME
+
+    @property
+    def last_idx(self):
+        """Id of the latest session (-1 if there are no sessions)."""
+        return max(self.entries.keys()) if len(self.entries) > 0 else -1
+
+    def load(self):
+        """Read the index file and rebuild it if required."""
+        try:
+            with open(self.file, "r") as handle:
+                data = json.load(handle)
+            if data.get("version") != self.VERSION:
+                raise ValueError(f"Unsupported session index version: {data.get('version')}")
+            self.entries = {int(sid): entry for sid, entry in data["sessions"].items()}
+            if self.refresh_unfinished():
+                self.save()
+        except FileNotFoundError:
+            self.rebuild()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+            logger.warning("Rebuilding invalid session index (%s)", err)
+            self.rebuild()
+        return self.entries
+
+    def rebuild(self):
+        """Recreate the index by scanning the session and run directories."""
+        logger.debug("Rebuilding session index: %s", self.file)
+        self.entries = {}
+        for sid in get_ids(self.directory):
+            run_ids = get_ids(self.directory / str(sid) / "runs")
+            self.entries[sid] = {"label": None, "status": self.UNKNOWN, "runs": run_ids}
+        if self.directory.is_dir():
+            self.save()
+
+    def refresh_unfinished(self):
+        """Look up the run ids of sessions which were never closed (i.e. still active or killed) in their directories.
+
+        The runs of a session are only written to the index when it is closed, hence the entry of a crashed session
+        would list no runs at all. Refreshed entries get the status "unknown" so that they are only scanned once. A
+        session which is still active overwrites its entry when it is closed.
+
+        Returns
+        -------
+        bool
+            True if any entry was refreshed.
+        """
+        refreshed = False
+        for sid, entry in self.entries.items():
+            if entry.get("status") in self.UNFINISHED:
+                entry["runs"] = get_ids(self.directory / str(sid) / "runs")
+                entry["status"] = self.UNKNOWN
+                refreshed = True
+        return refreshed
+
+    def save(self):
+        """Atomically replace the index file."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {"version": self.VERSION, "sessions": {str(sid): entry for sid, entry in sorted(self.entries.items())}}
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".index", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as handle:
+                json.dump(data, handle)
+            os.replace(tmp_name, self.file)
+        except BaseException:
+            os.remove(tmp_name)
+            raise
+
+    def update(self, session):
+        """Add or update the entry of a session."""
+        self.entries[session.idx] = {
+            "label": session.label,
+            "status": session.status.name.lower(),
+            "runs": sorted(run.idx if run.idx is not None else i for i, run in enumerate(session.runs)),
+        }
+
+    def remove(self, sids):
+        """Drop the entries of removed sessions."""
+        for sid in sids:
+            self.entries.pop(sid, None)
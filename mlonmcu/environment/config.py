@@ -93,6 +93,7 @@ class DefaultsConfig(BaseConfig):
         default_target=None,
         cleanup_auto=False,
         cleanup_keep=100,
+        lock_timeout=60,
     ):
         self.log_level = log_level
         self.log_to_file = log_to_file
@@ -102,6 +103,7 @@ class DefaultsConfig(BaseConfig):
         self.default_target = default_target
         self.cleanup_auto = cleanup_auto
         self.cleanup_keep = cleanup_keep
+        self.lock_timeout = lock_timeout  # Seconds to wait for the environment lock (-1: forever)
 
 
 class PathConfig(BaseConfig):
@@ -17,7 +17,6 @@
 # limitations under the License.
 #
 import sys
-import git
 from pathlib import Path
 import venv
 import os
@@ -49,6 +48,8 @@ def create_environment_directories(path, directories):
 def clone_models_repo(
     dest, url="https://github.com/tum-ei-eda/mlonmcu-models.git"
 ):  # TODO: how to get submodule url/ref
+    import git
+
     git.Repo.clone_from(url, dest)
 
 
@@ -95,6 +95,10 @@ def load_environment_from_file(filename, base):
         else:
             cleanup_auto = False
             cleanup_keep = 100
+        if "locks" in loaded and "timeout" in loaded["locks"]:
+            lock_timeout = float(loaded["locks"]["timeout"])
+        else:
+            lock_timeout = 60
         if "paths" in loaded:
             paths = {}
             for key in loaded["paths"]:
@@ -233,6 +237,7 @@ def load_environment_from_file(filename, base):
             default_target=default_target,
             cleanup_auto=cleanup_auto,
             cleanup_keep=cleanup_keep,
+            lock_timeout=lock_timeout,
         )
         env = base(
             home,
@@ -19,14 +19,14 @@
 """Definitions of mlonmcu config templates."""
 import pkgutil
 import os
-import jinja2
 from pathlib import Path
-import pkg_resources
 
 from .config import get_config_dir
 
 
 def get_template_names():
+    import pkg_resources
+
     template_files = pkg_resources.resource_listdir("mlonmcu", os.path.join("..", "resources", "templates"))
     names = [name.split(".yml.j2")[0] for name in template_files]
     return names
@@ -51,6 +51,8 @@ def fill_template(name, data={}):
                 template_text = template_text.decode("utf-8")
             except UnicodeDecodeError as e:
                 raise e
+        import jinja2
+
         tmpl = jinja2.Template(template_text)
         rendered = tmpl.render(**data)
         return rendered
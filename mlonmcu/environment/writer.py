@@ -35,6 +35,9 @@ def create_environment_dict(environment):
         "auto": environment.defaults.cleanup_auto,
         "keep": environment.defaults.cleanup_keep,
     }
+    data["locks"] = {
+        "timeout": environment.defaults.lock_timeout,
+    }
     data["paths"] = {
         path: (
             str(path_config.path)
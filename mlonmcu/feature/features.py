@@ -18,13 +18,16 @@
 #
 """Definition of MLonMCU features and the feature registry."""
 
+import os
 import re
-import pandas as pd
+import tempfile
+from pathlib import Path
 from typing import Union
 
 from mlonmcu.utils import is_power_of_two
 from mlonmcu.config import str2bool
 from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.setup import utils
 from .feature import (
     BackendFeature,
     FrameworkFeature,
@@ -61,6 +64,7 @@ def register_feature(name):
 
     def real_decorator(obj):
         REGISTERED_FEATURES[name] = obj
+        return obj
 
     return real_decorator
 
@@ -976,7 +980,8 @@ class CacheSim(TargetFeature):
                     r"(D|I|L2)\$ ((?:Bytes (?:Read|Written))|(?:Read|Write) "
                     r"(?:Accesses|Misses)|(?:Writebacks)|(?:Miss Rate)):\s*(\d+\.?\d*%?)*"
                 )
-                matches = re.compile(expr).findall(stdout)
+                regex = re.compile(expr)
+                matches = [groups for line in utils.output_lines(stdout) for groups in regex.findall(line)]
                 prefixes = [
                     x for (x, y) in zip(["I", "D", "L2"], [self.ic_enable, self.dc_enable, self.l2_enable]) if y
                 ]
@@ -999,7 +1004,18 @@ class CacheSim(TargetFeature):
 class LogInstructions(TargetFeature):
     """Enable logging of the executed instructions of a simulator-based target."""
 
-    DEFAULTS = {**FeatureBase.DEFAULTS, "to_file": False}
+    DEFAULTS = {
+        **FeatureBase.DEFAULTS,
+        "to_file": False,
+        "compress": None,  # values: None, gzip, zstd
+    }
+
+    # Patterns used to find the traced instructions in the simulator output
+    INSTR_PATTERNS = {
+        "etiss_pulpino": re.compile(r"0x[a-fA-F0-9]+: .* \[.*\]"),
+        "spike": re.compile(r"core\s+\d+: 0x[a-fA-F0-9]+ \(0x[a-fA-F0-9]+\) .*"),
+        "ovpsim": re.compile(r"Info 'riscvOVPsim\/cpu',\s0x[0-9abcdef]+\(.*\):\s[0-9abcdef]+\s+\w+\s+.*"),
+    }
 
     def __init__(self, features=None, config=None):
         super().__init__("log_instrs", features=features, config=config)
@@ -1009,46 +1025,74 @@ class LogInstructions(TargetFeature):
         value = self.config["to_file"]
         return str2bool(value, allow_none=True) if not isinstance(value, (bool, int)) else value
 
+    @property
+    def compress(self):
+        value = self.config["compress"]
+        if value in [None, "", "none", "None", False]:
+            return None
+        assert value in utils.COMPRESSION_SUFFIXES, f"Unsupported value for log_instrs.compress: {value}"
+        return value
+
+    @staticmethod
+    def get_trace_file(target):
+        """Name of the trace file which is written to the working directory of the simulator."""
+        return f"{target}_instrs.log"
+
     def add_target_config(self, target, config):
         assert target in ["spike", "etiss_pulpino", "ovpsim", "gvsoc_pulp"]
         if not self.enabled:
             return
+        trace_file = self.get_trace_file(target)
         if target == "spike":
             extra_args_new = config.get("extra_args", [])
             extra_args_new.append("-l")
-            # if self.to_file:
-            #     extra_args_new.append("--log=?")
+            if self.to_file:
+                extra_args_new.append(f"--log={trace_file}")
             config.update({f"{target}.extra_args": extra_args_new})
         elif target == "etiss_pulpino":
+            # The PrintInstruction plugin has no file output, hence its stdout is filtered instead
             plugins_new = config.get("plugins", [])
             plugins_new.append("PrintInstruction")
             config.update({f"{target}.plugins": plugins_new})
         elif target == "ovpsim":
             extra_args_new = config.get("extra_args", [])
             extra_args_new.append("--trace")
-            # if self.to_file:
-            #    extra_args_new.append("--tracefile")
+            if self.to_file:
+                extra_args_new.extend(["--tracefile", trace_file])
             config.update({f"{target}.extra_args": extra_args_new})
         elif target == "gvsoc_pulp":
             extra_args_new = config.get("extra_args", [])
             if self.to_file:
-                extra_args_new.append(f"--trace=insn:{target}_instrs.log")
-                """
-                TODO: The above code will generate a instruction log.
-                But it will not be recorded by Artifact (which should be done in get_target_callbacks).
-                The code to let it be recorded by Artifact is currently not added because of the following reasons:
-                1. This feature is rarely used.
-                2. GVSOC can directly write the instruction log into a file which should be much faster than
-                read/write from the output. This makes GVSOC special and difficult to be adapted in the current
-                code.
-                3. This difficulty reflected in that the methods add_target_config and get_target_callbacks should
-                have a consensus about where in the system file system the instruction log is written to and can be
-                read from. This is not feasible in current code and the realization requires a workaround.
-                """
+                extra_args_new.append(f"--trace=insn:{trace_file}")
             else:
                 extra_args_new.append("--trace=insn")
             config.update({f"{target}.extra_args": extra_args_new})
 
+    def _filter_stdout(self, target, stdout, dest):
+        """Move the traced instructions from the simulator output into a file.
+
+        Large outputs (utils.ProcessOutput) are filtered line by line into a new ProcessOutput.
+        """
+        expr = self.INSTR_PATTERNS[target]
+        if isinstance(stdout, utils.ProcessOutput):
+            new_output = utils.ProcessOutput()
+            with open(dest, "w", encoding="utf-8") as handle:
+                for line in stdout.lines():
+                    if expr.match(line):
+                        handle.write(line)
+                    else:
+                        new_output.write(line.encode())
+            stdout.close()
+            return new_output
+        new_lines = []
+        with open(dest, "w", encoding="utf-8") as handle:
+            for line in stdout.split("\n"):
+                if expr.match(line):
+                    handle.write(line + "\n")
+                else:
+                    new_lines.append(line)
+        return "\n".join(new_lines)
+
     def get_target_callbacks(self, target):
         assert target in [
             "spike",
@@ -1056,41 +1100,43 @@ class LogInstructions(TargetFeature):
             "ovpsim",
             "gvsoc_pulp",
         ], f"Unsupported feature '{self.name}' for target '{target}'"
-        if self.enabled:
-            if not target == "gvsoc_pulp":
-
-                def log_instrs_callback(stdout, metrics, artifacts):
-                    """Callback which parses the targets output and updates the generated metrics and artifacts."""
-                    new_lines = []
-                    if self.to_file:
-                        # TODO: update stdout and remove log_instrs lines
-                        instrs = []
-                        for line in stdout.split("\n"):
-                            if target == "etiss_pulpino":
-                                expr = re.compile(r"0x[a-fA-F0-9]+: .* \[.*\]")
-                            elif target == "spike":
-                                expr = re.compile(r"core\s+\d+: 0x[a-fA-F0-9]+ \(0x[a-fA-F0-9]+\) .*")
-                            elif target == "ovpsim":
-                                expr = re.compile(
-                                    r"Info 'riscvOVPsim\/cpu',\s0x[0-9abcdef]+\(.*\):\s[0-9abcdef]+\s+\w+\s+.*"
-                                )
-                            match = expr.match(line)
-                            if match is not None:
-                                instrs.append(line)
-                            else:
-                                new_lines.append(line)
-                        instrs_artifact = Artifact(
-                            f"{target}_instrs.log",
-                            content="\n".join(instrs),
-                            fmt=ArtifactFormat.TEXT,
-                            flags=(self.name, target),
-                        )
-                        artifacts.append(instrs_artifact)
-                        return "\n".join(new_lines)
-                    else:
-                        return stdout
+        if self.enabled and self.to_file:
+            trace_file = self.get_trace_file(target)
+            # Shared between the callbacks of a single target execution
+            state = {}
+
+            def log_instrs_pre_callback(directory, args):
+                """Callback which remembers the working directory of the simulator."""
+                state["directory"] = Path(directory)
+
+            def log_instrs_callback(stdout, metrics, artifacts):
+                """Callback which turns the simulator trace into a file-backed artifact."""
+                src = state["directory"] / trace_file
+                if target == "etiss_pulpino" or (target in self.INSTR_PATTERNS and not src.is_file()):
+                    stdout = self._filter_stdout(target, stdout, src)
+                if not src.is_file():
+                    raise RuntimeError(f"Instruction trace of target '{target}' not found: {src}")
+                name = trace_file
+                if self.compress:
+                    name += utils.COMPRESSION_SUFFIXES[self.compress]
+                # The working directory is removed after the execution, the exported artifact is moved to the run
+                fd, dest = tempfile.mkstemp(prefix=f"mlonmcu_{target}_", suffix=f"_{name}")
+                os.close(fd)
+                if self.compress:
+                    utils.compress(src, dest, self.compress)
+                else:
+                    utils.move(src, dest)
+                instrs_artifact = Artifact(
+                    name,
+                    path=Path(dest),
+                    fmt=ArtifactFormat.TEXT,
+                    flags=(self.name, target),
+                    temporary=True,
+                )
+                artifacts.append(instrs_artifact)
+                return stdout
 
-                return None, log_instrs_callback
+            return log_instrs_pre_callback, log_instrs_callback
         return None, None
 
 
@@ -1209,11 +1255,26 @@ class Benchmark(PlatformFeature, TargetFeature):
         "num_runs": 1,
         "num_repeat": 1,
         "total": False,
-        "aggregate": "avg",  # Allowed: avg, max, min, none, all
+        "aggregate": "avg",  # Allowed: avg, median, min, max, stddev, ci, none, all, stats or a comma-separated list
+        "confidence": 0.95,  # Level of the confidence interval
+        "num_workers": 1,  # Number of repetitions executed in parallel by the target
     }
 
     REQUIRED = []
 
+    AGGREGATES = {
+        "avg": ["mean"],
+        "mean": ["mean"],
+        "median": ["median"],
+        "min": ["min"],
+        "max": ["max"],
+        "stddev": ["stddev"],
+        "ci": ["ci"],
+        "none": [],
+        "all": ["mean", "min", "max"],
+        "stats": ["median", "min", "max", "stddev", "ci"],
+    }
+
     def __init__(self, features=None, config=None):
         super().__init__("benchmark", features=features, config=config)
 
@@ -1233,9 +1294,30 @@ class Benchmark(PlatformFeature, TargetFeature):
     @property
     def aggregate(self):
         value = self.config["aggregate"]
-        assert value in ["avg", "all", "max", "min", "none"]
+        if isinstance(value, str):
+            value = value.split(",")
+        value = [x.strip() for x in value if len(x.strip()) > 0]
+        assert all(x in self.AGGREGATES for x in value), f"Unsupported aggregate: {value}"
         return value
 
+    @property
+    def confidence(self):
+        value = float(self.config["confidence"])
+        assert 0 < value < 1
+        return value
+
+    @property
+    def num_workers(self):
+        return int(self.config["num_workers"])
+
+    def get_statistics(self):
+        ret = []
+        for value in self.aggregate:
+            for stat in self.AGGREGATES[value]:
+                if stat not in ret:
+                    ret.append(stat)
+        return ret
+
     def get_platform_config(self, platform):
         supported = ["mlif", "tvm"]  # TODO: support microtvm and espidf
         assert platform in supported, f"Unsupported feature '{self.name}' for platform '{platform}'"
@@ -1244,7 +1326,7 @@ class Benchmark(PlatformFeature, TargetFeature):
             return {
                 f"{platform}.number": self.num_runs,
                 f"{platform}.repeat": self.num_repeat,
-                f"{platform}.aggregate": self.aggregate,
+                f"{platform}.aggregate": self.config["aggregate"],
                 f"{platform}.total_time": self.total,
             }
         else:
@@ -1253,6 +1335,7 @@ class Benchmark(PlatformFeature, TargetFeature):
     def get_target_config(self, target):
         return {
             f"{target}.repeat": self.num_repeat,
+            f"{target}.repeat_workers": self.num_workers,
         }
 
     def get_platform_defs(self, platform):
@@ -1271,55 +1354,35 @@ class Benchmark(PlatformFeature, TargetFeature):
 
             def benchmark_callback(stdout, metrics, artifacts):
                 if len(metrics) <= 1:
-                    return
+                    return stdout
+                from mlonmcu.target.metrics import summarize
+
                 metrics_ = metrics[1:]  # drop first run (warmup)
 
-                # TODO: this currently processes all numeric metrics, should probably ignore stuff like MIPS etc.
+                def is_time(key):
+                    return "cycle" in key.lower() or "time" in key.lower()
+
+                # Rates such as the (wall-clock based) MIPS are not scaled with the number of runs
                 data_ = [
                     {
-                        key: (float(value) / self.num_runs) if self.num_runs > 1 else value
+                        key: (float(value) / self.num_runs) if self.num_runs > 1 and is_time(key) else value
                         for key, value in m.data.items()
-                        if "cycle" in key.lower() or "time" in key.lower()
+                        if is_time(key) or "mips" in key.lower()
                     }
                     for m in metrics_
                 ]
 
-                df = pd.DataFrame(data_)
-
-                if self.aggregate == "all":
-                    aggs = ["mean", "min", "max"]
-                elif self.aggregate in ["avg", "mean"]:
-                    aggs = ["mean"]
-                elif self.aggregate == "min":
-                    aggs = ["min"]
-                elif self.aggregate == "max":
-                    aggs = ["max"]
-                elif self.aggregate == "none":
-                    aggs = []
-
-                if len(aggs) == 0:
-                    data = {}
-                else:
-                    df_ = df.agg(aggs)
-
-                    # rename columns
-                    index_mapping = {
-                        "mean": "Average",
-                        "min": "Min",
-                        "max": "Max",
-                    }
-
-                    df_ = df_.rename(index=index_mapping)
-
-                    data = df_.to_dict()
-
-                    data = {f"{prefix} {key}": value for key, temp in data.items() for prefix, value in temp.items()}
+                data = {}
+                for key in data_[-1].keys():
+                    values = [d.get(key) for d in data_]
+                    stats = summarize(values, self.get_statistics(), confidence=self.confidence)
+                    data.update({f"{prefix} {key}": value for prefix, value in stats.items()})
                 if self.total:
                     data.update(
                         {
                             f"Total {key}": (value * self.num_runs) if self.num_runs > 1 else value
                             for key, value in data_[-1].items()
-                            if "cycle" in key.lower() or "time" in key.lower()
+                            if is_time(key)
                         }
                     )
                 metrics_ = metrics_[-1]
@@ -1327,7 +1390,7 @@ class Benchmark(PlatformFeature, TargetFeature):
 
                 for key in data_[-1].keys():
                     if key in metrics_.order:
-                        if self.total:
+                        if self.total and is_time(key):
                             metrics_.order.append(f"Total {key}")
                         metrics_.order.remove(key)
                 for key in data.keys():
@@ -102,6 +102,11 @@ class Backend(ABC):
     def has_tuner(self):
         return self.tuner is not None
 
+    @property
+    def cacheable(self):
+        """Returns true if the artifacts only depend on the model contents and the config (see run.build_cache)."""
+        return True
+
     def set_tuning_records(self, filepath):
         if not self.has_tuner:
             raise NotImplementedError("Backend does not support autotuning")
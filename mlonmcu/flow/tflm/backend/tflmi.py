@@ -23,14 +23,13 @@ from .backend import TFLMBackend
 from mlonmcu.config import str2bool
 from mlonmcu.flow.backend import main
 from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.models.utils import format_hex_array, make_incbin_asm
+
+MODEL_EMBEDDING_MODES = ["array", "incbin"]
 
 
-# TODO: move to another place
 def make_hex_array(data):
-    out = ""
-    for x in data:
-        out += "0x{:02x}, ".format(x)
-    return out
+    return format_hex_array(data)
 
 
 class TFLMICodegen:
@@ -110,6 +109,7 @@ size_t {prefix}_outputs();
         custom_ops=None,  # TODO: implement
         registrations=None,  # TODO: implement
         ops_resolver=None,  # TODO: implement
+        model_embedding=None,
     ):
         arena_size = arena_size if arena_size is not None else TFLMIBackend.DEFAULTS["arena_size"]
         ops = ops if ops else TFLMIBackend.DEFAULTS["ops"]
@@ -152,10 +152,8 @@ size_t {prefix}_outputs();
         ops_resolver = ops_resolver if ops_resolver else TFLMIBackend.DEFAULTS["ops_resolver"]
         if ops_resolver != "mutable":
             raise NotImplementedError
-
-        model_data = None
-        with open(model, "rb") as model_buf:
-            model_data = model_buf.read()
+        model_embedding = model_embedding if model_embedding else TFLMIBackend.DEFAULTS["model_embedding"]
+        assert model_embedding in MODEL_EMBEDDING_MODES, f"Unsupported model embedding: {model_embedding}"
 
         if header:
             header_content = self.generate_header()
@@ -187,9 +185,18 @@ size_t {prefix}_outputs();
 #endif
 
 """
-        wrapper_content += """const unsigned char g_model_data[] ALIGN(16) = { """
-        wrapper_content += make_hex_array(model_data)
-        wrapper_content += """ };
+        if model_embedding == "incbin":
+            # The flatbuffer is linked as is, hence the codegen does not depend on the size of the model
+            wrapper_content += make_incbin_asm("g_model_data", model)
+            wrapper_content += """extern "C" const unsigned char g_model_data[];
+
+"""
+        else:
+            with open(model, "rb") as model_buf:
+                model_data = model_buf.read()
+            wrapper_content += """const unsigned char g_model_data[] ALIGN(16) = { """
+            wrapper_content += make_hex_array(model_data)
+            wrapper_content += """ };
 
 """
         wrapper_content += self.makeCustomOpPrototypes(custom_ops)
@@ -321,6 +328,7 @@ class TFLMIBackend(TFLMBackend):
         "registrations": {},
         "ops_resolver": "mutable",
         "legacy": False,
+        "model_embedding": "array",  # values: array, incbin (reference the .tflite file instead of a C array)
     }
 
     REQUIRED = TFLMBackend.REQUIRED + []
@@ -349,6 +357,15 @@ class TFLMIBackend(TFLMBackend):
     def arena_size(self):
         return int(self.config["arena_size"])
 
+    @property
+    def model_embedding(self):
+        return str(self.config["model_embedding"])
+
+    @property
+    def cacheable(self):
+        # The incbin wrapper refers to the model file of this run by its absolute path
+        return self.model_embedding != "incbin"
+
     def generate(self) -> Tuple[dict, dict]:
         artifacts = []
         assert self.model is not None
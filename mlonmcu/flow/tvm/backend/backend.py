@@ -21,6 +21,7 @@ import multiprocessing
 from mlonmcu.flow.backend import Backend
 from mlonmcu.setup import utils
 from mlonmcu.config import str2bool
+from mlonmcu.logging import get_logger
 from .model_info import get_model_info, get_supported_formats
 from .python_utils import prepare_python_environment
 from .tvmc_utils import (
@@ -31,6 +32,9 @@ from .tvmc_utils import (
     get_input_shapes_tvmc_args,
     get_tuning_records_tvmc_args,
 )
+from .tvmc_server import get_tvmc_server, TvmcServerUnavailable
+
+logger = get_logger()
 
 
 class TVMBackend(Backend):
@@ -61,6 +65,8 @@ class TVMBackend(Backend):
         # See https://github.com/apache/tvm/blob/1115fd9bc261619ffa0539746ae0aebc46232dc6/python/tvm/autotvm/tophub.py
         "tophub_url": None,
         "num_threads": multiprocessing.cpu_count(),
+        "use_tvmc_server": False,  # Reuse warm tvmc processes for compilation
+        "tvmc_server_workers": None,  # Defaults to the number of CPUs
     }
 
     REQUIRED = []
@@ -197,9 +203,20 @@ class TVMBackend(Backend):
         value = self.config["tvm.use_tlcpack"]
         return str2bool(value, allow_none=True) if not isinstance(value, (bool, int)) else value
 
+    @property
     def num_threads(self):
         return self.config["num_threads"]
 
+    @property
+    def use_tvmc_server(self):
+        value = self.config["use_tvmc_server"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def tvmc_server_workers(self):
+        value = self.config["tvmc_server_workers"]
+        return int(value) if value is not None else None
+
     def get_target_details(self):
         ret = {}
         if self.target_device:
@@ -258,6 +275,11 @@ class TVMBackend(Backend):
             tophub_url=self.tophub_url,
             num_threads=self.num_threads,
         )
+        if self.use_tvmc_server and self.tvmc_custom_script is None and command == "compile":
+            try:
+                return self.invoke_tvmc_server(command, *args, env=env, cwd=cwd)
+            except TvmcServerUnavailable as e:
+                logger.warning("tvmc server unavailable, falling back to subprocess: %s", e)
         if self.use_tlcpack:
             pre = ["tvmc"]
             return utils.exec_getout(
@@ -270,6 +292,17 @@ class TVMBackend(Backend):
                 pre = [self.tvmc_custom_script]
             return utils.python(*pre, command, *args, live=self.print_outputs, print_output=False, env=env, cwd=cwd)
 
+    def invoke_tvmc_server(self, command, *args, env=None, cwd=None):
+        server = get_tvmc_server(env, num_workers=self.tvmc_server_workers)
+        logger.debug("- Executing (tvmc server): tvmc %s %s", command, " ".join(map(str, args)))
+        exit_code, out = server.invoke([command, *args], cwd=cwd)
+        if self.print_outputs:
+            print(out)
+        assert exit_code == 0, "The tvmc server returned an non-zero exit code {}! (CMD: `tvmc {} {}`)\n{}".format(
+            exit_code, command, " ".join(map(str, args)), out
+        )
+        return out
+
     def invoke_tvmc_compile(self, out, dump=None, cwd=None):
         args = self.get_tvmc_compile_args(out)
         return self.invoke_tvmc("compile", *args, cwd=cwd)
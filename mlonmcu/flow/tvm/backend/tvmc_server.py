@@ -0,0 +1,192 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Pool of persistent tvmc worker processes.
+
+Starting `python -m tvm.driver.tvmc` for every build pays the full TVM import cost which often dominates the
+actual compilation time for small models. The pool defined here keeps warm worker processes (see tvmc_worker.py)
+around which are shared by all backends using the same TVM environment.
+"""
+import sys
+import json
+import queue
+import atexit
+import threading
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+WORKER_SCRIPT = Path(__file__).parent / "tvmc_worker.py"
+
+# Workers are restarted after a fixed number of requests to avoid accumulating state/memory inside TVM
+MAX_REQUESTS_PER_WORKER = 50
+
+
+class TvmcServerUnavailable(RuntimeError):
+    """Raised if a request can not be processed by the server and the caller should fall back to a subprocess."""
+
+
+class TvmcWorker:
+    """Wrapper around a single warm tvmc process."""
+
+    def __init__(self, env):
+        self.num_requests = 0
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", str(WORKER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            universal_newlines=True,
+        )
+        status = self._receive()
+        if not status.get("ready", False):
+            self.stop()
+            raise TvmcServerUnavailable(f"tvmc worker failed to start: {status.get('error', '?')}")
+
+    def _receive(self):
+        line = self.process.stdout.readline()
+        if len(line) == 0:
+            raise TvmcServerUnavailable("tvmc worker terminated unexpectedly")
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as e:
+            raise TvmcServerUnavailable(f"Invalid response of tvmc worker: {line.strip()}") from e
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, args, cwd=None):
+        """Send a single request to the worker and wait for the result."""
+        request = {"args": list(map(str, args)), "cwd": str(cwd) if cwd else None}
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise TvmcServerUnavailable(str(e)) from e
+        response = self._receive()
+        self.num_requests += 1
+        return response["exit_code"], response["output"]
+
+    def stop(self):
+        """Terminate the worker process."""
+        if self.process.stdin:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class TvmcServer:
+    """A pool of up to `num_workers` tvmc workers sharing the same environment.
+
+    Workers are spawned lazily when all existing workers are busy.
+    """
+
+    def __init__(self, env, num_workers=None):
+        self.env = env
+        self.num_workers = num_workers if num_workers else multiprocessing.cpu_count()
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.num_spawned = 0
+        self.failed = False
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.failed:
+                raise TvmcServerUnavailable("tvmc server is disabled due to a previous error")
+            spawn = self.num_spawned < self.num_workers
+            if spawn:
+                self.num_spawned += 1
+        if not spawn:
+            return self.idle.get()
+        try:
+            return TvmcWorker(self.env)
+        except Exception:
+            with self.lock:
+                self.num_spawned -= 1
+                self.failed = True
+            raise
+
+    def _release(self, worker):
+        if worker.alive and worker.num_requests < MAX_REQUESTS_PER_WORKER:
+            self.idle.put(worker)
+            return
+        worker.stop()
+        with self.lock:
+            self.num_spawned -= 1
+
+    def invoke(self, args, cwd=None):
+        """Run tvmc with the given arguments on one of the workers and return (exit_code, output)."""
+        worker = self._acquire()
+        try:
+            ret = worker.request(args, cwd=cwd)
+        except TvmcServerUnavailable:
+            worker.stop()
+            with self.lock:
+                self.num_spawned -= 1
+            raise
+        self._release(worker)
+        return ret
+
+    def shutdown(self):
+        """Stop all idle workers."""
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self.lock:
+                self.num_spawned -= 1
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_tvmc_server(env, num_workers=None):
+    """Lookup (or create) the server for a given environment."""
+    key = tuple(sorted(env.items()))
+    with _servers_lock:
+        if key not in _servers:
+            _servers[key] = TvmcServer(env, num_workers=num_workers)
+        return _servers[key]
+
+
+@atexit.register
+def shutdown_tvmc_servers():
+    """Terminate all workers of all servers."""
+    with _servers_lock:
+        for server in _servers.values():
+            server.shutdown()
+        _servers.clear()
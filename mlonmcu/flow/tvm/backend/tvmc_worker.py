@@ -0,0 +1,92 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Standalone tvmc worker process used by the tvmc server.
+
+This script is executed with the Python environment of TVM and therefore must not depend on mlonmcu itself.
+It imports tvmc once and handles compile requests read as JSON lines from stdin. The responses (exit code and
+captured output) are written as JSON lines to the original stdout while the output of each invocation is
+redirected into a temporary file. Anything else written to stdout (i.e. while importing TVM or plugins) goes to
+stderr, so that it can not corrupt the protocol.
+"""
+import os
+import sys
+import json
+import tempfile
+import importlib
+import traceback
+
+
+def _run(func, args, cwd):
+    """Invoke tvmc with the given arguments while capturing everything written to stdout/stderr."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryFile() as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            if cwd:
+                os.chdir(cwd)
+            ret = func(args)
+            exit_code = ret if isinstance(ret, int) else 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:  # noqa: B902
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+            os.chdir(old_cwd)
+        log.seek(0)
+        output = log.read().decode(errors="replace")
+    return exit_code, output
+
+
+def main():
+    proto = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    def respond(**kwargs):
+        proto.write(json.dumps(kwargs) + "\n")
+        proto.flush()
+
+    try:
+        tvmc_main = importlib.import_module("tvm.driver.tvmc.main")
+        func = tvmc_main._main
+    except Exception as e:  # noqa: B902
+        respond(ready=False, error=str(e))
+        return 1
+    respond(ready=True)
+    for line in sys.stdin:
+        if len(line.strip()) == 0:
+            continue
+        request = json.loads(line)
+        exit_code, output = _run(func, request["args"], request.get("cwd"))
+        respond(exit_code=exit_code, output=output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
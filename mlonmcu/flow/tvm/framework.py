@@ -19,7 +19,6 @@
 """Definitions for TVMFramework."""
 
 import os
-import pkg_resources
 from pathlib import Path
 
 from mlonmcu.flow.framework import Framework
@@ -28,6 +27,8 @@ from mlonmcu.flow.framework import Framework
 
 
 def get_crt_config_dir():
+    import pkg_resources
+
     files = pkg_resources.resource_listdir(
         "mlonmcu", os.path.join("..", "resources", "frameworks", "tvm", "crt_config")
     )
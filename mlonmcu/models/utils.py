@@ -16,26 +16,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import io
 import os
-import numpy as np
+from functools import lru_cache
 from pathlib import Path
 
+from mlonmcu.utils import lazy_import
 
-def make_hex_array(filename, mode="bin"):
-    out = ""
+np = lazy_import("numpy")
+
+
+@lru_cache(maxsize=None)
+def _get_hex_table():
+    """Lookup table used to translate every byte into its C literal without a Python loop."""
+    return np.array(["0x{:02x}, ".format(x).encode() for x in range(256)], dtype="S6")
+
+
+# Number of bytes formatted at once when streaming large buffers to a file
+CHUNK_SIZE = 1 << 20
+DATA_SOURCE_MODES = ["array", "incbin"]
+
+
+def _resolve_mode(filename, mode):
     if mode == "auto":
         _, ext = os.path.splitext(filename)
         assert len(ext) > 1, "Could not detect format because of missing file extension"
         mode = ext[1:]
+    return mode
+
+
+def load_data_bytes(filename, mode="bin"):
+    """Read the raw bytes of a data file (.bin, .npy or .npz) as a flat uint8 array."""
+    mode = _resolve_mode(filename, mode)
     if mode == "bin":
-        with open(filename, "rb") as f:
-            data = f.read(1)
-            length = 0
-            while data:
-                length += 1
-                out += "0x" + data.hex() + ", "
-                data = f.read(1)
-            assert length > 0, "Data can not be empty"
+        data = np.fromfile(filename, dtype=np.uint8)
     elif mode in ["npy", "npz"]:
         data = np.load(filename)
         # TODO: figure out endianess
@@ -43,43 +57,63 @@ def make_hex_array(filename, mode="bin"):
             files = data.files
             assert len(files) == 1
             data = data[files[0]]
-        byte_data = data.tobytes()
-        assert len(byte_data) > 0, "Data can not be empty"
-        out = ", ".join(["0x{:02x}".format(x) for x in byte_data] + [""])
+        data = np.frombuffer(np.ascontiguousarray(data).tobytes(), dtype=np.uint8)
     else:
         raise RuntimeError(f"Unsupported mode: {mode}")
-    return out
+    assert len(data) > 0, "Data can not be empty"
+    return data
+
+
+def format_hex_array(data):
+    """Convert a buffer of bytes into the body of a C array initializer (including a trailing comma)."""
+    data = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    return _get_hex_table()[data].tobytes().decode()
+
+
+def make_hex_array(filename, mode="bin"):
+    return format_hex_array(load_data_bytes(filename, mode=mode))
+
+
+def _write_hex_array(handle, data):
+    for start in range(0, len(data), CHUNK_SIZE):
+        handle.write(format_hex_array(data[start : start + CHUNK_SIZE]))
+
+
+def _write_buffer_tables(handle, in_names, out_names):
+    handle.write("const unsigned char *const data_buffers_in[] = {" + "".join(f"{n}, " for n in in_names) + "};\n")
+    handle.write("const unsigned char *const data_buffers_out[] = {" + "".join(f"{n}, " for n in out_names) + "};\n")
+    handle.write("const size_t data_size_in[] = {" + "".join(f"sizeof({n}), " for n in in_names) + "};\n")
+    handle.write("const size_t data_size_out[] = {" + "".join(f"sizeof({n}), " for n in out_names) + "};\n")
+
+
+def _get_buffer_names(bufs, direction):
+    return [f"data_buffer_{direction}_{i}_{j}" for i, buf in enumerate(bufs) for j in range(len(buf))]
+
+
+def _write_data_source(handle, in_bufs, out_bufs, write_buffer):
+    in_names = _get_buffer_names(in_bufs, "in")
+    out_names = _get_buffer_names(out_bufs, "out")
+    handle.write('#include "ml_interface.h"\n')
+    handle.write("#include <stddef.h>\n")
+    handle.write(f"const int num_data_buffers_in = {len(in_names)};\n")
+    handle.write(f"const int num_data_buffers_out = {len(out_names)};\n")
+    buffers = [buf for bufs in in_bufs + out_bufs for buf in bufs]
+    for name, buf in zip(in_names + out_names, buffers):
+        write_buffer(handle, name, buf)
+    _write_buffer_tables(handle, in_names, out_names)
 
 
 def fill_data_source(in_bufs, out_bufs):
-    out = '#include "ml_interface.h"\n'
-    out += "#include <stddef.h>\n"
-    out += "const int num_data_buffers_in = " + str(sum([len(buf) for buf in in_bufs])) + ";\n"
-    out += "const int num_data_buffers_out = " + str(sum([len(buf) for buf in out_bufs])) + ";\n"
-    for i, buf in enumerate(in_bufs):
-        for j in range(len(buf)):
-            out += "const unsigned char data_buffer_in_" + str(i) + "_" + str(j) + "[] = {" + buf[j] + "};\n"
-    for i, buf in enumerate(out_bufs):
-        for j in range(len(buf)):
-            out += "const unsigned char data_buffer_out_" + str(i) + "_" + str(j) + "[] = {" + buf[j] + "};\n"
-
-    var_in = "const unsigned char *const data_buffers_in[] = {"
-    var_insz = "const size_t data_size_in[] = {"
-    for i, buf in enumerate(in_bufs):
-        for j in range(len(buf)):
-            var_in += "data_buffer_in_" + str(i) + "_" + str(j) + ", "
-            var_insz += "sizeof(data_buffer_in_" + str(i) + "_" + str(j) + "), "
-    var_out = "const unsigned char *const data_buffers_out[] = {"
-    var_outsz = "const size_t data_size_out[] = {"
-    for i, buf in enumerate(out_bufs):
-        for j in range(len(buf)):
-            var_out += "data_buffer_out_" + str(i) + "_" + str(j) + ", "
-            var_outsz += "sizeof(data_buffer_out_" + str(i) + "_" + str(j) + "), "
-    out += var_in + "};\n" + var_out + "};\n" + var_insz + "};\n" + var_outsz + "};\n"
-    return out
+    def write_buffer(handle, name, buf):
+        handle.write(f"const unsigned char {name}[] = {{{buf}}};\n")
 
+    output = io.StringIO()
+    _write_data_source(output, in_bufs, out_bufs, write_buffer)
+    return output.getvalue()
 
-def lookup_data_buffers(input_paths, output_paths):
+
+def lookup_data_files(input_paths, output_paths):
+    """Find the data files for every input and output tensor, grouped by data index."""
     assert len(input_paths) > 0
     legacy = False
     used_fmt = None
@@ -108,8 +142,7 @@ def lookup_data_buffers(input_paths, output_paths):
                     data_index, tensor_index = list(map(int, base.split("_")))[:2]
                 else:
                     data_index, tensor_index = int(base), 0
-                hex_data = make_hex_array(Path(path) / filename, mode=used_fmt)
-                data.append((data_index, tensor_index, hex_data))
+                data.append((data_index, tensor_index, Path(path) / filename))
         sorted_data = sorted(data, key=lambda x: (x[0], x[1]))
         # TODO: get rid of this dirty workaround
         ret = []
@@ -128,9 +161,72 @@ def lookup_data_buffers(input_paths, output_paths):
     return ins, outs
 
 
+def lookup_data_buffers(input_paths, output_paths):
+    ins, outs = lookup_data_files(input_paths, output_paths)
+
+    def to_hex(files):
+        return [[make_hex_array(f, mode="auto") for f in buf] for buf in files]
+
+    return to_hex(ins), to_hex(outs)
+
+
 def get_data_source(input_paths, output_paths):
     assert len(input_paths) == len(output_paths)
     if len(input_paths) == 0:
         return fill_data_source([], [])
     in_bufs, out_bufs = lookup_data_buffers(input_paths, output_paths)
     return fill_data_source(in_bufs, out_bufs)
+
+
+def _escape_asm_string(path):
+    return str(path).replace("\\", "\\\\\\\\").replace('"', '\\\\\\"')
+
+
+def make_incbin_asm(symbol, path, section=".rodata", align=16):
+    """Generate a top-level inline assembly statement which embeds a binary file as a global symbol."""
+    path = _escape_asm_string(Path(path).resolve())
+    return (
+        f'__asm__(".section {section}\\n.balign {align}\\n.global {symbol}\\n{symbol}:\\n"\n'
+        f'        ".incbin \\"{path}\\"\\n.previous\\n");\n'
+    )
+
+
+def write_data_source(input_paths, output_paths, dest, mode="array"):
+    """Generate the data source file for the given data files directly on the disk.
+
+    In the `array` mode every buffer is formatted to a C array chunk by chunk, while the `incbin` mode lets the
+    assembler embed the binary data, which keeps the compile time independent of the size of the dataset.
+    """
+    assert mode in DATA_SOURCE_MODES, f"Unsupported data source mode: {mode}"
+    assert len(input_paths) == len(output_paths)
+    dest = Path(dest)
+    if len(input_paths) == 0:
+        in_files, out_files = [], []
+    else:
+        in_files, out_files = lookup_data_files(input_paths, output_paths)
+    bin_dir = dest.parent / f"{dest.stem}_bin"
+
+    def write_array(handle, name, path):
+        data = load_data_bytes(path, mode="auto")
+        handle.write(f"const unsigned char {name}[] = {{")
+        _write_hex_array(handle, data)
+        handle.write("};\n")
+
+    def write_incbin(handle, name, path):
+        path = Path(path)
+        if path.suffix == ".bin":
+            size = path.stat().st_size
+            assert size > 0, "Data can not be empty"
+        else:  # Numpy files need to be converted to raw binaries first
+            data = load_data_bytes(path, mode="auto")
+            size = len(data)
+            bin_dir.mkdir(exist_ok=True)
+            path = bin_dir / f"{name}.bin"
+            data.tofile(path)
+        handle.write(make_incbin_asm(name, path))
+        # The known size allows the use of sizeof() in the lookup tables
+        handle.write(f"extern const unsigned char {name}[{size}];\n")
+
+    write_buffer = write_incbin if mode == "incbin" else write_array
+    with open(dest, "w") as handle:
+        _write_data_source(handle, in_files, out_files, write_buffer)
@@ -16,16 +16,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from .mlif import MlifPlatform
-from .espidf import EspIdfPlatform
-from .zephyr import ZephyrPlatform
-from .tvm import TvmPlatform
-from .microtvm import MicroTvmPlatform
+from mlonmcu.utils import LazyRegistry
 
 # from .arduino import ArduinoPlatform
 
 
-PLATFORM_REGISTRY = {}
+# The platform modules are only imported when a platform is actually used
+PLATFORM_REGISTRY = LazyRegistry()
 
 
 def register_platform(platform_name, p, override=False):
@@ -40,8 +37,8 @@ def get_platforms():
     return PLATFORM_REGISTRY
 
 
-register_platform("mlif", MlifPlatform)
-register_platform("espidf", EspIdfPlatform)
-register_platform("zephyr", ZephyrPlatform)
-register_platform("tvm", TvmPlatform)
-register_platform("microtvm", MicroTvmPlatform)
+register_platform("mlif", "mlonmcu.platform.mlif:MlifPlatform")
+register_platform("espidf", "mlonmcu.platform.espidf:EspIdfPlatform")
+register_platform("zephyr", "mlonmcu.platform.zephyr:ZephyrPlatform")
+register_platform("tvm", "mlonmcu.platform.tvm:TvmPlatform")
+register_platform("microtvm", "mlonmcu.platform.microtvm:MicroTvmPlatform")
@@ -24,8 +24,8 @@ import signal
 import shutil
 import tempfile
 import subprocess
+import threading
 from pathlib import Path
-import pkg_resources
 
 
 from mlonmcu.setup import utils
@@ -41,6 +41,8 @@ logger = get_logger()
 
 
 def get_project_template(name="project"):
+    import pkg_resources
+
     espidf_templates = pkg_resources.resource_listdir("mlonmcu", os.path.join("..", "resources", "platforms", "espidf"))
     if name not in espidf_templates:
         return None
@@ -312,7 +314,6 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
         # TODO: add alternative approach which allows passing elf instead
         if elf is not None:
             logger.debug("Ignoring ELF file for espidf platform")
-        # TODO: implement timeout
         # TODO: make sure that already compiled? -> error or just call compile routine?
         if self.wait_for_user:  # INTERACTIVE
             answer = input(
@@ -330,7 +331,7 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
             "flash",
             *self.get_idf_serial_args(),
         ]
-        self.invoke_idf_exe(*idfArgs, live=self.print_outputs)
+        self.invoke_idf_exe(*idfArgs, live=self.print_outputs, timeout=timeout)
 
     def monitor(self, target, timeout=60):
         if self.flash_only:
@@ -349,8 +350,6 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
 
             def _monitor_helper(*args, verbose=False, start_match=None, end_match=None, timeout=60):
                 # start_match and end_match are inclusive
-                if timeout:
-                    pass  # TODO: implement timeout
                 found_start = start_match is None
                 logger.debug("- Executing: %s", str(args))
                 outStr = ""
@@ -364,8 +363,26 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
                     + " ".join([str(arg) for arg in args])
                 )
                 process = subprocess.Popen(
-                    cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True, executable="/bin/bash", env=env
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    shell=True,
+                    executable="/bin/bash",
+                    env=env,
+                    start_new_session=bool(timeout),
                 )
+                expired = threading.Event()
+                timer = None
+                if timeout:
+
+                    def _expire():
+                        expired.set()
+                        _kill_monitor()
+                        utils.kill_process_group(process)
+
+                    timer = threading.Timer(timeout, _expire)
+                    timer.daemon = True
+                    timer.start()
                 try:
                     exit_code = None
                     for line in process.stdout:
@@ -382,8 +399,12 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
                                 _kill_monitor()
                                 process.terminate()
                                 exit_code = 0
-                    while exit_code is None:
-                        exit_code = process.poll()
+                    if exit_code is None:
+                        exit_code = process.wait()
+                    else:
+                        process.wait()
+                    if expired.is_set():
+                        raise utils.ProcessTimeout(cmd, timeout, output=outStr)
                     if not verbose and exit_code != 0:
                         logger.error(outStr)
                     assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
@@ -394,11 +415,13 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
                     _kill_monitor()
                     pid = process.pid
                     os.kill(pid, signal.SIGINT)
-                os.system("reset")
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+                    os.system("reset")
                 return outStr
 
             logger.debug("Monitoring target software")
-            # TODO: implement timeout
             idfArgs = [
                 "-C",
                 self.project_dir,
@@ -432,8 +455,7 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
                 # start_match and end_match are inclusive
                 found_start = start_match is None
                 outStr = ""
-                if timeout:
-                    pass  # TODO: implement timeout
+                deadline = time.time() + timeout if timeout else None
                 # The following is a custom initialization sequence inspired by
                 # (https://github.com/espressif/esp-idf/blob/master/tools/idf_monitor_base/serial_reader.py)
                 high = False
@@ -453,8 +475,12 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
                 time.sleep(0.002)
                 ser.rts = high
                 ser.dtr = ser.dtr
+                if deadline is not None:
+                    ser.timeout = 1  # Do not block forever in readline to be able to check the deadline
                 try:
                     while True:
+                        if deadline is not None and time.time() > deadline:
+                            raise utils.ProcessTimeout(port, timeout, output=outStr)
                         try:
                             ser_bytes = ser.readline()
                             new_line = ser_bytes.decode("utf-8", errors="replace")
@@ -475,7 +501,6 @@ class EspIdfPlatform(CompilePlatform, TargetPlatform):
                 return outStr
 
             logger.debug("Monitoring target software")
-            # TODO: implement timeout
             return _monitor_helper2(
                 port,
                 baud,
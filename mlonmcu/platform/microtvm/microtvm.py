@@ -20,7 +20,6 @@
 
 import re
 import tempfile
-import concurrent
 from pathlib import Path
 from typing import Tuple
 
@@ -37,6 +36,8 @@ from mlonmcu.flow.tvm.backend.tvmc_utils import (
     get_rpc_tvmc_args,
 )
 from mlonmcu.flow.tvm.backend.tuner import TVMTuner
+from mlonmcu.session.tuning_records import pick_best
+from mlonmcu.session.tuning_scheduler import TuningScheduler, parse_tune_tasks
 
 from ..platform import CompilePlatform, TargetPlatform, BuildPlatform, TunePlatform
 from .microtvm_target import create_microtvm_platform_target, get_microtvm_platform_targets
@@ -305,7 +306,7 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
             ret.append("--help")
         return ret
 
-    def invoke_tvmc(self, command, *args, target=None, prefix=""):
+    def invoke_tvmc(self, command, *args, target=None, prefix="", timeout=None):
         env = prepare_python_environment(self.tvm_pythonpath, self.tvm_build_dir, self.tvm_configs_dir)
         if target:
             target.update_environment(env)
@@ -313,7 +314,9 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
             pre = ["-m", "tvm.driver.tvmc"]
         else:
             pre = [self.tvmc_custom_script]
-        return utils.python(*pre, command, *args, live=self.print_outputs, print_output=False, env=env, prefix=prefix)
+        return utils.python(
+            *pre, command, *args, live=self.print_outputs, print_output=False, env=env, prefix=prefix, timeout=timeout
+        )
 
     def collect_available_project_options(self, command, path, mlf_path, template, micro=True, target=None):
         args = self.get_tvmc_micro_args(command, path, mlf_path, template, list_options=True)
@@ -321,7 +324,17 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
         return parse_project_options_from_stdout(out)
 
     def invoke_tvmc_micro(
-        self, command, path, mlf_path, template, target, extra_args=None, micro=True, tune_args=None, prefix=""
+        self,
+        command,
+        path,
+        mlf_path,
+        template,
+        target,
+        extra_args=None,
+        micro=True,
+        tune_args=None,
+        prefix="",
+        timeout=None,
     ):
         args = self.get_tvmc_micro_args(command, path, mlf_path, template, tune_args=tune_args)
         options = filter_project_options(
@@ -329,21 +342,21 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
             target.get_project_options(),
         )
         args += get_project_option_args(template, command, options)
-        return self.invoke_tvmc("micro", *args, target=target, prefix=prefix)
+        return self.invoke_tvmc("micro", *args, target=target, prefix=prefix, timeout=timeout)
 
     def collect_available_run_project_options(self, path, device):
         args = self.get_tvmc_run_args(path, device, list_options=True)
         out = self.invoke_tvmc("run", *args)
         return parse_project_options_from_stdout(out)
 
-    def invoke_tvmc_run(self, path, device, template, target, micro=True):
+    def invoke_tvmc_run(self, path, device, template, target, micro=True, timeout=None):
         args = self.get_tvmc_run_args(path, device)
         if micro:
             options = filter_project_options(
                 self.collect_available_run_project_options(path, device), target.get_project_options()
             )
             args.extend(get_project_option_args(template, "run", options))
-        return self.invoke_tvmc("run", *args, target=target)
+        return self.invoke_tvmc("run", *args, target=target, timeout=timeout)
 
     def close(self):
         if self.tempdir:
@@ -393,26 +406,28 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
         # TODO: add alternative approach which allows passing elf instead
         if elf is not None:
             logger.debug("Ignoring ELF file for microtvm platform")
-        # TODO: implement timeout
         logger.debug("Flashing target software using MicroTVM ProjectAPI")
-        output = self.invoke_tvmc_micro("flash", self.project_dir, None, self.get_template_args(target), target)
+        output = self.invoke_tvmc_micro(
+            "flash", self.project_dir, None, self.get_template_args(target), target, timeout=timeout
+        )
         return output
 
     def run(self, elf, target, timeout=120):
-        # TODO: implement timeout
-        output = self.flash(elf, target)
+        output = self.flash(elf, target, timeout=timeout)
         output += self.invoke_tvmc_run(
-            str(self.project_dir), "micro", self.get_template_args(target), target, micro=True
+            str(self.project_dir), "micro", self.get_template_args(target), target, micro=True, timeout=timeout
         )
         return output
 
-    def get_micro_tune_args(self, model, backend, out):
+    def get_micro_tune_args(self, model, backend, out, trials=None, early_stopping=None, task=None):
         tuner = self.config.get("autotuning_tuner", "ga")
         assert tuner in ["ga", "gridsearch", "random", "xgb", "xgb_knob", "xgb-rank"]
-        trials = self.config.get("autotuning_trials", 10)
+        if trials is None:
+            trials = self.config.get("autotuning_trials", 10)
         if not isinstance(trials, int):
             trials = int(trials)
-        early_stopping = self.config.get("autotuning_early_stopping", None)
+        if early_stopping is None:
+            early_stopping = self.config.get("autotuning_early_stopping", None)
         if early_stopping is None:
             early_stopping = max(trials, 10)  # Let's see if this default works out...
         early_stopping = int(early_stopping)
@@ -446,22 +461,68 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
                 self.experimental_tvmc_tune_tasks
             ), f"{self.name}.visualize_tuning requires experimental_autotvm_visualize"
             ret.append("--visualize")
-        if self.config["autotuning_tasks"]:
+        if task is not None:
+            # Single task (or list) as used by the tuning scheduler
+            assert self.experimental_tvmc_tune_tasks, "Tuning single tasks requires experimental_tvmc_tune_tasks"
+            ret.extend(["--tasks", str(task)])
+        elif self.config["autotuning_tasks"]:
             assert self.experimental_tvmc_tune_tasks, f"{self.name}.tune_tasks requires experimental_tvmc_tune_tasks"
             ret.extend(["--tasks", str(self.config["autotuning_tasks"])])
         ret.append(model)
         return ret
 
+    def get_tuning_target_args(self, backend):
+        return get_target_tvmc_args(
+            "c",
+            extra_target=backend.extra_target,
+            target_details=backend.get_target_details(),
+        )
+
+    def list_tune_tasks(self, model_path, backend, target):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_file = Path(tmp_dir) / "tuning_results.log.txt"
+            tune_args = self.get_micro_tune_args(model_path, backend, out_file, task="list")
+            out = self.invoke_tvmc_micro(
+                "tune",
+                self.project_dir,
+                None,
+                self.get_template_args(target),
+                target,
+                tune_args=tune_args,
+            )
+        return parse_tune_tasks(out)
+
+    def tune_task(self, model_path, backend, target, idx, prepend="", trials=None, early_stopping=None):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_file = Path(tmp_dir) / "tuning_results.log.txt"
+            with open(out_file, "w") as handle:
+                handle.write(prepend)
+            tune_args = self.get_micro_tune_args(
+                model_path, backend, out_file, trials=trials, early_stopping=early_stopping, task=idx
+            )
+            out = self.invoke_tvmc_micro(
+                "tune",
+                self.project_dir,
+                None,
+                self.get_template_args(target),
+                target,
+                tune_args=tune_args,
+                prefix=f"[worker-{idx}] ",
+            )
+            with open(out_file, "r") as handle:
+                content = handle.read()
+        return out, content[len(prepend) :]
+
     def _tune_model(self, model_path, backend, target):
         assert self.experimental_tvmc_micro_tune, "Microtvm tuning requires experimental_tvmc_micro_tune"
         enable = self.config["autotuning_enable"]
         results_file = self.config["autotuning_results_file"]
         append = self.config["autotuning_append"]
         num_workers = int(self.config["autotuning_num_workers"])
+        tuner = self.config["autotuning_tuner"]
+        database = self.tuning_database
+        model_key = self.get_tuning_key(model_path, backend) if database is not None else None
         artifacts = []
-        verbose = False
-        if self.print_outputs:
-            verbose = True
 
         content = ""
         if enable:
@@ -470,67 +531,21 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
                     with open(results_file, "r") as handle:
                         content = handle.read()
 
-            if num_workers > 1:
-                assert self.experimental_tvmc_tune_tasks, "num_workers>1 requires experimental_tvmc_tune_tasks=1"
-                # TODO: fix
-                assert self.config["autotuning_tasks"] is None, "tune_tasks not supported together with num_workers > 1"
-
-                def get_tune_tasks():
-                    with tempfile.TemporaryDirectory() as tmp_dir:
-                        out_file = Path(tmp_dir) / "tuning_results.log.txt"
-                        tune_args = self.get_micro_tune_args(model_path, backend, out_file)
-                        out = self.invoke_tvmc_micro(
-                            "tune",
-                            self.project_dir,
-                            None,
-                            self.get_template_args(target),
-                            target,
-                            tune_args=tune_args + ["--task", "list"],
-                        )
-                        lines = out.split("\n")
-                        for i, line in enumerate(lines):
-                            if "Available Tasks for tuning" in line:
-                                lines = lines[i + 1 :]
-                                break
-                        tasks = [line.split(". ", 1)[1] for line in lines if len(line.strip()) > 0]
-                        return tasks
-
-                num_tasks = len(get_tune_tasks())
-                workers = []
-                with concurrent.futures.ThreadPoolExecutor(num_workers) as executor:
-                    for i in range(num_tasks):
-                        print(f"Created worker for task {i}")
-
-                        def do_work(idx, prepend):
-                            with tempfile.TemporaryDirectory() as tmp_dir:
-                                out_file = Path(tmp_dir) / "tuning_results.log.txt"
-                                with open(out_file, "w") as handle:
-                                    handle.write(prepend)
-                                tune_args = self.get_micro_tune_args(model_path, backend, out_file)
-                                out = self.invoke_tvmc_micro(
-                                    "tune",
-                                    self.project_dir,
-                                    None,
-                                    self.get_template_args(target),
-                                    target,
-                                    tune_args=tune_args + ["--task", str(idx)],
-                                    prefix=f"[worker-{idx}] ",
-                                )
-                                with open(out_file, "r") as handle:
-                                    content = handle.read()
-                            return (out, content)
-
-                        workers.append(executor.submit(do_work, i, content))
-                all_out = ""
-                all_content = ""
-                for i, w in enumerate(workers):
-                    print(f"Worker {i}: done")
-                    ret = w.result()
-                    out, content = ret
-                    all_out += out
-                    all_content += content
-                out = all_out
-                content = all_content
+            if database is not None and database.is_model_tuned(model_key, tuner=tuner):
+                logger.info("All tasks were already tuned. Using the best records from the database.")
+                out = ""
+                content += database.get_model_records(model_key, tuner=tuner)
+            elif self.tuning_scheduler is not None or num_workers > 1:
+                # Tune the tasks individually using the scheduler of the session or a private one
+                scheduler = self.tuning_scheduler
+                if scheduler is None:
+                    scheduler = TuningScheduler(num_workers)
+                try:
+                    out, records = self.tune_tasks(scheduler, model_path, backend, target, prepend=content)
+                finally:
+                    if scheduler is not self.tuning_scheduler:
+                        scheduler.shutdown()
+                content += records
             else:
                 with tempfile.TemporaryDirectory() as tmp_dir:
                     out_file = Path(tmp_dir) / "tuning_results.log.txt"
@@ -540,35 +555,16 @@ class MicroTvmPlatform(CompilePlatform, TargetPlatform, BuildPlatform, TunePlatf
                     out = self.invoke_tvmc_micro(
                         "tune", self.project_dir, None, self.get_template_args(target), target, tune_args=tune_args
                     )
+                    prepend = content
                     with open(out_file, "r") as handle:
                         content = handle.read()
+                if database is not None:
+                    database.add(content[len(prepend) :], tuner, model=model_key)
 
         artifact = Artifact("tuning_results.log.txt", content=content, fmt=ArtifactFormat.TEXT)
         artifacts.append(artifact)
 
-        # pick best records
-        def _pick_best(backend, records, verbose=False):
-            content_best = ""
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                in_file = Path(tmp_dir) / "tuning_results.log.txt"
-                with open(in_file, "w") as handle:
-                    handle.write(records)
-                out_file = Path(tmp_dir) / "best_tuning_results.log.txt"
-                args = [
-                    "--mode",
-                    "pick",
-                    "--i",
-                    in_file,
-                    "--o",
-                    out_file,
-                ]
-                env = prepare_python_environment(self.tvm_pythonpath, self.tvm_build_dir, self.tvm_configs_dir)
-                utils.python("-m", "tvm.autotvm.record", *args, live=verbose, env=env)
-                with open(out_file, "r") as handle:
-                    content_best = handle.read()
-            return content_best
-
-        content_best = _pick_best(backend, content, verbose=verbose)
+        content_best = pick_best(content)
         if len(content_best) > 0:
             artifact_ = Artifact("best_tuning_results.log.txt", content=content_best, fmt=ArtifactFormat.TEXT)
             artifacts.append(artifact_)
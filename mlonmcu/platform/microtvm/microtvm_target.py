@@ -91,10 +91,7 @@ def create_microtvm_platform_target(name, platform, base=Target):
 
             assert self.platform is not None, "TVM targets need a platform to execute programs"
 
-            if self.timeout_sec > 0:
-                raise NotImplementedError
-
-            ret = self.platform.run(program, self)
+            ret = self.platform.run(program, self, timeout=self.timeout_sec)
             return ret
 
         def parse_stdout(self, out):
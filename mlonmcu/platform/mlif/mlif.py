@@ -17,6 +17,8 @@
 # limitations under the License.
 #
 """MLIF Platform"""
+import os
+import shutil
 import tempfile
 from typing import Tuple
 
@@ -28,7 +30,7 @@ from mlonmcu.artifact import Artifact, ArtifactFormat
 from mlonmcu.logging import get_logger
 from mlonmcu.target import get_targets
 from mlonmcu.target.target import Target
-from mlonmcu.models.utils import get_data_source
+from mlonmcu.models.utils import write_data_source, DATA_SOURCE_MODES
 
 from ..platform import CompilePlatform, TargetPlatform
 from .mlif_target import get_mlif_platform_targets, create_mlif_platform_target
@@ -69,9 +71,12 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         "optimize": None,  # values: 0,1,2,3,s
         "input_data_path": None,
         "output_data_path": None,
+        "data_mode": "array",  # values: array, incbin (embed the binary data files using the assembler)
         "mem_only": False,
         "debug_symbols": False,
         "verbose_makefile": False,
+        "ccache": False,  # Share compiled objects between runs using the same toolchain and flags
+        "ccache_dir": None,  # Defaults to <temp>/ccache
     }
 
     REQUIRED = ["mlif.src_dir"]
@@ -85,6 +90,8 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         )
         self.tempdir = None
         self.build_dir = None
+        self.default_ccache_dir = None
+        self.ccache_base_dir = None
         self.goal = "generic_mlif"
 
     def gen_data_artifact(self):
@@ -117,25 +124,34 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         if len(in_paths) == 0 or len(out_paths) == 0:
             logger.warning("TODO")
             return None
-        data_src = get_data_source(in_paths, out_paths)
-        return Artifact("data.c", content=data_src, fmt=ArtifactFormat.SOURCE)
+        data_file = self.build_dir / "data.c"
+        write_data_source(in_paths, out_paths, data_file, mode=self.data_mode)
+        return Artifact("data.c", path=data_file, fmt=ArtifactFormat.SOURCE)
 
     def init_directory(self, path=None, context=None):
+        if context:
+            assert "temp" in context.environment.paths
+            temp_dir = context.environment.paths["temp"].path
+            self.default_ccache_dir = temp_dir / "ccache"
+            self.ccache_base_dir = context.environment.home
+        if path is not None:
+            # Every run provides its own build directory, hence a copied platform must not reuse the old one
+            self.build_dir = Path(path)
+            self.build_dir.mkdir(parents=True, exist_ok=True)
+            return
         if self.build_dir is not None:
             self.build_dir.mkdir(exist_ok=True)
             logger.debug("Build directory already initialized")
             return
         dir_name = self.name
-        if path is not None:
-            self.build_dir = Path(path)
-        elif self.config["build_dir"]:
+        if self.config["build_dir"]:
             self.build_dir = Path(self.config["build_dir"])
         else:
             if context:
-                assert "temp" in context.environment.paths
-                self.build_dir = (
-                    context.environment.paths["temp"].path / dir_name
-                )  # TODO: Need to lock this for parallel builds
+                # Use a unique directory to allow parallel builds
+                parent = temp_dir / dir_name
+                parent.mkdir(parents=True, exist_ok=True)
+                self.build_dir = Path(tempfile.mkdtemp(dir=parent))
             else:
                 logger.debug(
                     "Creating temporary directory because no context was available "
@@ -201,6 +217,12 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
     def output_data_path(self):
         return self.config["output_data_path"]
 
+    @property
+    def data_mode(self):
+        value = self.config["data_mode"]
+        assert value in DATA_SOURCE_MODES, f"Unsupported value for mlif.data_mode: {value}"
+        return value
+
     @property
     def mem_only(self):
         value = self.config["mem_only"]
@@ -216,6 +238,27 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         value = self.config["verbose_makefile"]
         return str2bool(value) if not isinstance(value, (bool, int)) else value
 
+    @property
+    def ccache(self):
+        value = self.config["ccache"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def ccache_dir(self):
+        value = self.config["ccache_dir"]
+        return Path(value) if value is not None else self.default_ccache_dir
+
+    def get_ccache_env(self):
+        """Environment used for compiling with ccache enabled."""
+        env = os.environ.copy()
+        if self.ccache_dir is not None:
+            env["CCACHE_DIR"] = str(self.ccache_dir)
+        if self.ccache_base_dir is not None:
+            # Paths in the per-run build directories are rewritten relative to the cwd to get hits between runs
+            env["CCACHE_BASEDIR"] = str(self.ccache_base_dir)
+        env["CCACHE_NOHASHDIR"] = "1"
+        return env
+
     def get_supported_targets(self):
         target_names = get_mlif_platform_targets()
         return target_names
@@ -241,8 +284,20 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
             args.append(f"-DMODEL_SUPPORT_DIR={self.model_support_dir}")
         else:
             pass
+        if self.use_ccache:
+            args.append("-DCMAKE_C_COMPILER_LAUNCHER=ccache")
+            args.append("-DCMAKE_CXX_COMPILER_LAUNCHER=ccache")
         return args
 
+    @property
+    def use_ccache(self):
+        if not self.ccache:
+            return False
+        if shutil.which("ccache") is None:
+            logger.warning("Unable to find ccache executable. Compiling without ccache...")
+            return False
+        return True
+
     def prepare(self):
         self.init_directory()
 
@@ -269,10 +324,9 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
             cmakeArgs.append("-DDATA_SRC=")
             artifacts = []
         else:
+            utils.mkdirs(self.build_dir)
             data_artifact = self.gen_data_artifact()
-            data_file = self.build_dir / data_artifact.name
-            data_artifact.export(data_file)
-            cmakeArgs.append("-DDATA_SRC=" + str(data_file))
+            cmakeArgs.append("-DDATA_SRC=" + str(data_artifact.path))
             artifacts = [data_artifact]
         utils.mkdirs(self.build_dir)
         out = utils.cmake(
@@ -281,6 +335,7 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
             cwd=self.build_dir,
             debug=self.debug,
             live=self.print_outputs,
+            env=self.get_ccache_env() if self.use_ccache else None,
         )
         return out, artifacts
 
@@ -294,17 +349,16 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
             cwd=self.build_dir,
             threads=self.num_threads,
             live=self.print_outputs,
+            env=self.get_ccache_env() if self.use_ccache else None,
         )
         return out, artifacts
 
     def generate(self, src, target, model=None) -> Tuple[dict, dict]:
         out, artifacts = self.compile(target, src=src, model=model)
         elf_file = self.build_dir / "bin" / "generic_mlif"
-        # TODO: just use path instead of raw data?
-        with open(elf_file, "rb") as handle:
-            data = handle.read()
-            artifact = Artifact("generic_mlif", raw=data, fmt=ArtifactFormat.RAW)
-            artifacts.insert(0, artifact)  # First artifact should be the ELF
+        # The ELF is only referenced, it is mapped into memory on demand and linked into the run directory on export
+        artifact = Artifact("generic_mlif", path=elf_file, fmt=ArtifactFormat.RAW)
+        artifacts.insert(0, artifact)  # First artifact should be the ELF
         metrics = self.get_metrics(elf_file)
         stdout_artifact = Artifact(
             "mlif_out.log", content=out, fmt=ArtifactFormat.TEXT
@@ -34,6 +34,8 @@ from mlonmcu.target.elf import get_results as get_static_mem_usage
 from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool
 from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.session.tuning_records import get_model_tuning_key
+from mlonmcu.session.tuning_scheduler import parse_task_indices
 
 logger = get_logger()
 
@@ -143,10 +145,86 @@ class TunePlatform(Platform):
 
     REQUIRED = []
 
+    # Shared database of tuning records (see mlonmcu.session.tuning_records), set by the run if enabled
+    tuning_database = None
+    # Session-level scheduler for tuning tasks (see mlonmcu.session.tuning_scheduler), set by the run if enabled
+    tuning_scheduler = None
+
     @property
     def supports_tune(self):
         return True
 
+    def get_tuning_target_args(self, backend):
+        """Return the arguments describing the target to tune for."""
+        raise NotImplementedError
+
+    def get_tuning_key(self, model_path, backend):
+        return get_model_tuning_key(
+            model_path, self.get_tuning_target_args(backend), self.config.get("autotuning_mode", None)
+        )
+
+    def lookup_tuning_records(self, model_path, backend):
+        """Return the best known tuning records for the given model and backend from the database (if supported)."""
+        if self.tuning_database is None:
+            return None
+        return self.tuning_database.get_model_records(self.get_tuning_key(model_path, backend))
+
+    def list_tune_tasks(self, model_path, backend, target):
+        """Return the names of the tasks which can be tuned individually."""
+        raise NotImplementedError
+
+    def tune_task(self, model_path, backend, target, idx, prepend="", trials=None, early_stopping=None):
+        """Tune a single task and return the output as well as the new records."""
+        raise NotImplementedError
+
+    def tune_tasks(self, scheduler, model_path, backend, target, prepend=""):
+        """Tune the selected tasks of a model individually using the given scheduler.
+
+        Tasks which are already tuned according to the database are skipped and their best records are used instead.
+        The workloads of a task are only known to the database after the task was tuned for this model once, from then
+        on records found while tuning other models are reused as well. Returns the combined output and the new records.
+        """
+        database = self.tuning_database
+        model_key = self.get_tuning_key(model_path, backend)
+        tuner = self.config.get("autotuning_tuner", None)
+        tasks = database.get_model_tasks(model_key) if database is not None else None
+        if tasks is None:
+            tasks = scheduler.get_task_list(model_key, lambda: self.list_tune_tasks(model_path, backend, target))
+            if database is not None:
+                database.set_model_tasks(model_key, tasks)
+        selected = parse_task_indices(self.config.get("autotuning_tasks", None), len(tasks))
+        tuned = database.get_tuned_tasks(model_key, tuner=tuner) if database is not None else []
+        trials = int(self.config.get("autotuning_trials", 10))
+        futures = {}
+        for idx in selected:
+            if idx in tuned:
+                logger.debug("Skipping already tuned task %d", idx)
+                continue
+
+            def tune(trials_, early_stopping, idx=idx):
+                out, records = self.tune_task(
+                    model_path, backend, target, idx, prepend=prepend, trials=trials_, early_stopping=early_stopping
+                )
+                if database is not None:
+                    database.add(records, tuner)
+                return out, records
+
+            # The listed task names are truncated descriptions which do not identify a workload, hence tasks are only
+            # shared between runs of the same model (the model key covers target and tuning mode)
+            key = (model_key, tuner, idx)
+            futures[idx] = scheduler.submit(key, tune, trials)
+        out = ""
+        records = ""
+        for idx, future in futures.items():
+            out_, records_ = future.result()
+            if database is not None:
+                database.add_model(model_key, records_, task=idx)
+            out += out_
+            records += records_
+        if database is not None and len(tuned) > 0:
+            records += database.get_model_records(model_key, tuner=tuner)
+        return out, records
+
     def export_artifacts(self, path):
         assert len(self.artifacts) > 0, "No artifacts found, please run generate_artifacts() first"
 
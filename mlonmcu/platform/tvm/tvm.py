@@ -19,7 +19,6 @@
 """TVM Platform"""
 
 import tempfile
-import concurrent
 from pathlib import Path
 
 from mlonmcu.setup import utils
@@ -36,6 +35,8 @@ from mlonmcu.flow.tvm.backend.tvmc_utils import (
 )
 from mlonmcu.flow.tvm.backend.python_utils import prepare_python_environment
 from mlonmcu.flow.tvm.backend.tuner import TVMTuner
+from mlonmcu.session.tuning_records import pick_best
+from mlonmcu.session.tuning_scheduler import TuningScheduler, parse_tune_tasks
 
 from ..platform import TargetPlatform, BuildPlatform, TunePlatform
 from .tvm_target import create_tvm_platform_target
@@ -60,7 +61,7 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
         "profile": False,
         "repeat": 1,
         "number": 1,
-        "aggregate": "none",  # Allowed: avg, max, min, none, all
+        "aggregate": "none",  # Allowed: avg, median, max, min, stddev, none, all, stats or a comma-separated list
         "total_time": False,
         "use_rpc": False,
         "rpc_key": None,
@@ -123,7 +124,13 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
     @property
     def aggregate(self):
         value = self.config["aggregate"]
-        assert value in ["avg", "all", "max", "min", "none"]
+        if isinstance(value, str):
+            value = value.split(",")
+        value = [x.strip() for x in value if len(x.strip()) > 0]
+        # The confidence interval can not be determined from the summary printed by tvmc
+        value = [x for x in value if x != "ci"]
+        supported = ["avg", "mean", "median", "all", "max", "min", "stddev", "stats", "none"]
+        assert all(x in supported for x in value), f"Unsupported aggregate: {value}"
         return value
 
     @property
@@ -242,36 +249,37 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
             *get_rpc_tvmc_args(self.use_rpc, self.rpc_key, self.rpc_hostname, self.rpc_port),
         ]
 
-    def invoke_tvmc(self, command, *args):
+    def invoke_tvmc(self, command, *args, timeout=None):
         env = prepare_python_environment(self.tvm_pythonpath, self.tvm_build_dir, self.tvm_configs_dir)
         if self.tvmc_custom_script is None:
             pre = ["-m", "tvm.driver.tvmc"]
         else:
             pre = [self.tvmc_custom_script]
-        return utils.python(*pre, command, *args, live=self.print_outputs, print_output=False, env=env)
+        return utils.python(*pre, command, *args, live=self.print_outputs, print_output=False, env=env, timeout=timeout)
 
-    def invoke_tvmc_run(self, path, device):
+    def invoke_tvmc_run(self, path, device, timeout=None):
         args = self.get_tvmc_run_args(path, device)
-        return self.invoke_tvmc("run", *args)
+        return self.invoke_tvmc("run", *args, timeout=timeout)
 
     def run(self, elf, target, timeout=120):
-        # TODO: implement timeout
         # Here, elf is actually a directory
         # TODO: replace workaround with possibility to pass TAR directly
         tar_path = elf
-        output = self.invoke_tvmc_run(str(tar_path), target.device)
+        output = self.invoke_tvmc_run(str(tar_path), target.device, timeout=timeout)
 
         return output
 
-    def get_tune_args(self, model, backend, out):
+    def get_tune_args(self, model, backend, out, trials=None, early_stopping=None, task=None):
         tuner = self.config.get("autotuning_tuner", "ga")
         assert tuner in ["ga", "gridsearch", "random", "xgb", "xgb_knob", "xgb-rank"]
-        trials = self.config.get("autotuning_trials", 10)
+        if trials is None:
+            trials = self.config.get("autotuning_trials", 10)
         mode = self.config.get("autotuning_mode", "autotvm")
         assert mode in ["autotvm", "auto_scheduler"]
         if not isinstance(trials, int):
             trials = int(trials)
-        early_stopping = self.config.get("autotuning_early_stopping", None)
+        if early_stopping is None:
+            early_stopping = self.config.get("autotuning_early_stopping", None)
         if early_stopping is None:
             early_stopping = max(trials, 10)  # Let's see if this default works out...
         early_stopping = int(early_stopping)
@@ -303,7 +311,11 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
                 self.experimental_tvmc_tune_tasks
             ), f"{self.name}.visualize_tuning requires experimental_autotvm_visualize"
             ret.append("--visualize")
-        if self.config["autotuning_tasks"]:
+        if task is not None:
+            # Single task (or list) as used by the tuning scheduler
+            assert self.experimental_tvmc_tune_tasks, "Tuning single tasks requires experimental_tvmc_tune_tasks"
+            ret.extend(["--tasks", str(task)])
+        elif self.config["autotuning_tasks"]:
             assert self.experimental_tvmc_tune_tasks, f"{self.name}.tune_tasks requires experimental_tvmc_tune_tasks"
             ret.extend(["--tasks", str(self.config["autotuning_tasks"])])
         if mode == "auto_scheduler":
@@ -311,15 +323,42 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
         ret.append(model)
         return ret
 
+    def get_tuning_target_args(self, backend):
+        return get_target_tvmc_args(
+            backend.target,
+            extra_target=backend.extra_target,
+            target_details=backend.get_target_details(),
+        )
+
+    def list_tune_tasks(self, model_path, backend, target):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_file = Path(tmp_dir) / "tuning_results.log.txt"
+            tune_args = self.get_tune_args(model_path, backend, out_file, task="list")
+            out = self.invoke_tvmc("tune", *tune_args)
+        return parse_tune_tasks(out)
+
+    def tune_task(self, model_path, backend, target, idx, prepend="", trials=None, early_stopping=None):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_file = Path(tmp_dir) / "tuning_results.log.txt"
+            with open(out_file, "w") as handle:
+                handle.write(prepend)
+            tune_args = self.get_tune_args(
+                model_path, backend, out_file, trials=trials, early_stopping=early_stopping, task=idx
+            )
+            out = self.invoke_tvmc("tune", *tune_args)
+            with open(out_file, "r") as handle:
+                content = handle.read()
+        return out, content[len(prepend) :]
+
     def _tune_model(self, model_path, backend, target):
         enable = self.config["autotuning_enable"]
         results_file = self.config["autotuning_results_file"]
         append = self.config["autotuning_append"]
         num_workers = int(self.config["autotuning_num_workers"])
+        tuner = self.config["autotuning_tuner"]
+        database = self.tuning_database
+        model_key = self.get_tuning_key(model_path, backend) if database is not None else None
         artifacts = []
-        verbose = False
-        if self.print_outputs:
-            verbose = True
 
         content = ""
         if enable:
@@ -328,52 +367,21 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
                     with open(results_file, "r") as handle:
                         content = handle.read()
 
-            if num_workers > 1:
-                assert self.experimental_tvmc_tune_tasks, "num_workers>1 requires experimental_tvmc_tune_tasks=1"
-                # TODO: fix
-                assert self.config["autotuning_tasks"] is None, "tune_tasks not supported together with num_workers > 1"
-
-                def get_tune_tasks():
-                    with tempfile.TemporaryDirectory() as tmp_dir:
-                        out_file = Path(tmp_dir) / "tuning_results.log.txt"
-                        tune_args = self.get_tune_args(model_path, backend, out_file)
-                        out = self.invoke_tvmc("tune", *tune_args, "--task", "list")
-                        lines = out.split("\n")
-                        for i, line in enumerate(lines):
-                            if "Available Tasks for tuning" in line:
-                                lines = lines[i + 1 :]
-                                break
-                        tasks = [line.split(". ", 1)[1] for line in lines if len(line.strip()) > 0]
-                        return tasks
-
-                num_tasks = len(get_tune_tasks())
-                workers = []
-                with concurrent.futures.ThreadPoolExecutor(num_workers) as executor:
-                    for i in range(num_tasks):
-                        print(f"Created worker for task {i}")
-
-                        def do_work(idx, prepend):
-                            with tempfile.TemporaryDirectory() as tmp_dir:
-                                out_file = Path(tmp_dir) / "tuning_results.log.txt"
-                                with open(out_file, "w") as handle:
-                                    handle.write(prepend)
-                                tune_args = self.get_tune_args(model_path, backend, out_file)
-                                out = self.invoke_tvmc("tune", *tune_args, "--task", str(idx))
-                                with open(out_file, "r") as handle:
-                                    content = handle.read()
-                            return (out, content)
-
-                        workers.append(executor.submit(do_work, i, content))
-                all_out = ""
-                all_content = ""
-                for i, w in enumerate(workers):
-                    print(f"Worker {i}: done")
-                    ret = w.result()
-                    out, content = ret
-                    all_out += out
-                    all_content += content
-                out = all_out
-                content = all_content
+            if database is not None and database.is_model_tuned(model_key, tuner=tuner):
+                logger.info("All tasks were already tuned. Using the best records from the database.")
+                out = ""
+                content += database.get_model_records(model_key, tuner=tuner)
+            elif self.tuning_scheduler is not None or num_workers > 1:
+                # Tune the tasks individually using the scheduler of the session or a private one
+                scheduler = self.tuning_scheduler
+                if scheduler is None:
+                    scheduler = TuningScheduler(num_workers)
+                try:
+                    out, records = self.tune_tasks(scheduler, model_path, backend, target, prepend=content)
+                finally:
+                    if scheduler is not self.tuning_scheduler:
+                        scheduler.shutdown()
+                content += records
             else:
                 with tempfile.TemporaryDirectory() as tmp_dir:
                     out_file = Path(tmp_dir) / "tuning_results.log.txt"
@@ -381,8 +389,11 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
                         handle.write(content)
                     tune_args = self.get_tune_args(model_path, backend, out_file)
                     out = self.invoke_tvmc("tune", *tune_args)
+                    prepend = content
                     with open(out_file, "r") as handle:
                         content = handle.read()
+                if database is not None:
+                    database.add(content[len(prepend) :], tuner, model=model_key)
         else:
             if results_file is None:
                 return []
@@ -393,29 +404,7 @@ class TvmPlatform(BuildPlatform, TargetPlatform, TunePlatform):
         artifact = Artifact("tuning_results.log.txt", content=content, fmt=ArtifactFormat.TEXT)
         artifacts.append(artifact)
 
-        # pick best records
-        def _pick_best(backend, records, verbose=False):
-            content_best = ""
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                in_file = Path(tmp_dir) / "tuning_results.log.txt"
-                with open(in_file, "w") as handle:
-                    handle.write(records)
-                out_file = Path(tmp_dir) / "best_tuning_results.log.txt"
-                args = [
-                    "--mode",
-                    "pick",
-                    "--i",
-                    in_file,
-                    "--o",
-                    out_file,
-                ]
-                env = prepare_python_environment(backend.tvm_pythonpath, backend.tvm_build_dir, backend.tvm_configs_dir)
-                utils.python("-m", "tvm.autotvm.record", *args, live=verbose, env=env)
-                with open(out_file, "r") as handle:
-                    content_best = handle.read()
-            return content_best
-
-        content_best = _pick_best(backend, content, verbose=verbose)
+        content_best = pick_best(content)
         if len(content_best) > 0:
             artifact_ = Artifact("best_tuning_results.log.txt", content=content_best, fmt=ArtifactFormat.TEXT)
             artifacts.append(artifact_)
@@ -61,10 +61,7 @@ def create_tvm_platform_target(name, platform, base=Target):
 
             assert self.platform is not None, "TVM targets need a platform to execute programs"
 
-            if self.timeout_sec > 0:
-                raise NotImplementedError
-
-            ret = self.platform.run(program, self)
+            ret = self.platform.run(program, self, timeout=self.timeout_sec)
             return ret
 
         def parse_stdout(self, out):
@@ -104,31 +101,34 @@ def create_tvm_platform_target(name, platform, base=Target):
                     print_func=lambda *args, **kwargs: None,
                     handle_exit=handle_exit,
                 )
-            mean_ms, _, max_ms, min_ms, _ = self.parse_stdout(out)
+            mean_ms, median_ms, max_ms, min_ms, std_ms = self.parse_stdout(out)
 
             metrics = Metrics()
-            mean_s = mean_ms / 1e3 if mean_ms is not None else mean_ms
-            min_s = min_ms / 1e3 if min_ms is not None else min_ms
-            max_s = max_ms / 1e3 if max_ms is not None else max_ms
+
+            def to_s(value):
+                return value / 1e3 if value is not None else value
+
+            mean_s = to_s(mean_ms)
+            aggregate = self.platform.aggregate
             if (
                 self.platform.number == 1
                 and self.platform.repeat == 1
-                and (not self.platform.total_time or self.platform.aggregate != "none")
+                and (not self.platform.total_time or aggregate not in [[], ["none"]])
             ):
                 metrics.add("Runtime [s]", mean_s)
             else:
                 if self.platform.total_time:
                     metrics.add("Total Runtime [s]", mean_s * self.platform.number)
-                if self.platform.aggregate == "all":
-                    metrics.add("Average Runtime [s]", mean_s)
-                    metrics.add("Min Runtime [s]", min_s)
-                    metrics.add("Max Runtime [s]", max_s)
-                elif self.platform.aggregate in ["avg", "mean"]:
-                    metrics.add("Average Runtime [s]", mean_s)
-                elif self.platform.aggregate == "min":
-                    metrics.add("Min Runtime [s]", min_s)
-                elif self.platform.aggregate == "max":
-                    metrics.add("Max Runtime [s]", max_s)
+                values = {
+                    "Average": (["avg", "mean", "all"], mean_s),
+                    "Median": (["median", "stats"], to_s(median_ms)),
+                    "Min": (["min", "all", "stats"], to_s(min_ms)),
+                    "Max": (["max", "all", "stats"], to_s(max_ms)),
+                    "Stddev": (["stddev", "stats"], to_s(std_ms)),
+                }
+                for prefix, (names, value) in values.items():
+                    if any(name in aggregate for name in names):
+                        metrics.add(f"{prefix} Runtime [s]", value)
 
             if self.platform.profile:
                 headers = None
@@ -24,7 +24,6 @@ import time
 import shutil
 import tempfile
 from pathlib import Path
-import pkg_resources
 from typing import Tuple
 
 
@@ -42,6 +41,8 @@ logger = get_logger()
 
 
 def get_project_template(name="project2"):  # Workaround which only support tvmaot!!!
+    import pkg_resources
+
     zephyr_templates = pkg_resources.resource_listdir("mlonmcu", os.path.join("..", "resources", "platforms", "zephyr"))
     if name not in zephyr_templates:
         return None
@@ -355,7 +356,6 @@ project(ProjectName)
         # TODO: add alternative approach which allows passing elf instead
         if elf is not None:
             logger.debug("Ignoring ELF file for zephyr platform")
-        # TODO: implement timeout
         # TODO: make sure that already compiled? -> error or just call compile routine?
         if self.wait_for_user:  # INTERACTIVE
             answer = input(
@@ -377,7 +377,7 @@ project(ProjectName)
                 westArgs.extend(["--esp-device", port])
             if baud:
                 westArgs.extend(["--esp-baud-rate", baud])
-        self.invoke_west(*westArgs, live=self.print_outputs)
+        self.invoke_west(*westArgs, live=self.print_outputs, timeout=timeout)
 
     def monitor(self, target, timeout=60):
         if self.flash_only:
@@ -393,8 +393,7 @@ project(ProjectName)
             # start_match and end_match are inclusive
             found_start = start_match is None
             outStr = ""
-            if timeout:
-                pass  # TODO: implement timeout
+            deadline = time.time() + timeout if timeout else None
             # The following is a custom initialization sequence inspired by
             # (https://github.com/espressif/esp-idf/blob/master/tools/idf_monitor_base/serial_reader.py)
             # Required for esp32c3!
@@ -415,8 +414,12 @@ project(ProjectName)
             time.sleep(0.002)
             ser.rts = high
             ser.dtr = ser.dtr
+            if deadline is not None:
+                ser.timeout = 1  # Do not block forever in readline to be able to check the deadline
             try:
                 while True:
+                    if deadline is not None and time.time() > deadline:
+                        raise utils.ProcessTimeout(port, timeout, output=outStr)
                     try:
                         ser_bytes = ser.readline()
                         new_line = ser_bytes.decode("utf-8", errors="replace")
@@ -437,7 +440,6 @@ project(ProjectName)
             return outStr
 
         logger.debug("Monitoring target software")
-        # TODO: implement timeout
         return _monitor_helper(
             port,
             baud,
@@ -62,13 +62,10 @@ def create_zephyr_platform_target(name, platform, base=Target):
 
             assert self.platform is not None, "Zephyr targets need a platform to execute programs"
 
-            if self.timeout_sec > 0:
-                raise NotImplementedError
-
             # Zephyr actually wants a project directory, but we only get the elf now. As a workaround we
             # assume the elf is right in the build directory inside the project directory
 
-            ret = self.platform.run(program, self)
+            ret = self.platform.run(program, self, timeout=self.timeout_sec)
             return ret
 
         def parse_stdout(self, out):
@@ -17,24 +17,83 @@
 # limitations under the License.
 #
 """Definitions of the Report class used by MLonMCU sessions and runs."""
+import os
+import json
+import threading
 from pathlib import Path
-import pandas as pd
 
+from mlonmcu.utils import lazy_import
+from mlonmcu.logging import get_logger
 
-pd.set_option("display.max_columns", None)
-pd.set_option("display.max_rows", None)
-pd.set_option("display.width", 0)
+logger = get_logger()
+
+
+def _set_display_options(pd):
+    pd.set_option("display.max_columns", None)
+    pd.set_option("display.max_rows", None)
+    pd.set_option("display.width", 0)
+
+
+pd = lazy_import("pandas", callback=_set_display_options)
 
 SUPPORTED_FMTS = ["csv", "xlsx"]
 
 
+def _build_df(chunks):
+    """Combine a list of dataframes and/or lists of records into a single dataframe.
+
+    Consecutive record lists are merged before creating a dataframe, so that the number of
+    (expensive) pandas operations does not grow with the number of rows.
+    """
+    frames = []
+    records = []
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            if len(records) > 0:
+                frames.append(pd.DataFrame.from_records(records))
+                records = []
+            if chunk.empty and len(chunk.columns) == 0:
+                continue
+            frames.append(chunk)
+        else:
+            records.extend(chunk)
+    if len(records) > 0:
+        frames.append(pd.DataFrame.from_records(records))
+    if len(frames) == 0:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    return pd.concat(frames, axis=0).reset_index(drop=True)
+
+
+def _report_part(name, doc):
+    """Create a property for one of the three report parts which is only turned into a dataframe on access."""
+
+    def getter(self):
+        chunks = self._chunks[name]
+        if len(chunks) != 1 or not isinstance(chunks[0], pd.DataFrame):
+            self._chunks[name] = [_build_df(chunks)]
+        return self._chunks[name][0]
+
+    def setter(self, df):
+        self._chunks[name] = [df]
+
+    return property(getter, setter, doc=doc)
+
+
 class Report:
-    """Report class wrapped around multiple pandas dataframes."""
+    """Report class wrapped around multiple pandas dataframes.
+
+    The rows are stored as plain records until one of the dataframes is accessed for the first time.
+    This allows to merge many reports (i.e. one per run) with a single pandas operation.
+    """
 
     def __init__(self):
-        self.pre_df = pd.DataFrame()
-        self.main_df = pd.DataFrame()
-        self.post_df = pd.DataFrame()
+        self._chunks = {"pre": [], "main": [], "post": []}
+
+    pre_df = _report_part("pre", "Left third of the dataframe.")
+    main_df = _report_part("main", "Center part of the dataframe.")
+    post_df = _report_part("post", "Right third of the dataframe.")
 
     @property
     def df(self):
@@ -66,17 +125,23 @@ class Report:
     # def append(self, *args, **kwargs):
     #     self.df = self.df.append(*args, **kwargs, ignore_index=True)
 
+    def _set_part(self, name, data):
+        if isinstance(data, list):
+            self._chunks[name] = [list(data)]  # Converted lazily
+        else:
+            self._chunks[name] = [pd.DataFrame.from_records(data).reset_index(drop=True)]
+
     def set_pre(self, data):
         """Setter for the left third of the dataframe."""
-        self.pre_df = pd.DataFrame.from_records(data).reset_index(drop=True)
+        self._set_part("pre", data)
 
     def set_post(self, data):
         """Setter for the right third of the dataframe."""
-        self.post_df = pd.DataFrame.from_records(data).reset_index(drop=True)
+        self._set_part("post", data)
 
     def set_main(self, data):
         """Setter for the center part of the dataframe."""
-        self.main_df = pd.DataFrame.from_records(data).reset_index(drop=True)
+        self._set_part("main", data)
 
     def set(self, pre=None, main=None, post=None):
         """Setter for the dataframe."""
@@ -89,11 +154,115 @@ class Report:
             self.set_main(main if main is not None else {})
         self.set_post(post if post is not None else {})
 
+    def get_records(self, name):
+        """Return the rows of one of the three report parts as a list of records."""
+        chunks = self._chunks[name]
+        if all(isinstance(chunk, list) for chunk in chunks):
+            return [record for chunk in chunks for record in chunk]
+        return getattr(self, f"{name}_df").to_dict("records")
+
     def add(self, reports):
-        """Helper function to append a line to an existing report."""
+        """Helper function to append lines to an existing report.
+
+        The actual merging is deferred until the dataframes are accessed, hence adding the reports
+        of N runs takes linear time.
+        """
         if not isinstance(reports, list):
             reports = [reports]
-        for report in reports:
-            self.pre_df = pd.concat([self.pre_df, report.pre_df], axis=0).reset_index(drop=True)
-            self.main_df = pd.concat([self.main_df, report.main_df], axis=0).reset_index(drop=True)
-            self.post_df = pd.concat([self.post_df, report.post_df], axis=0).reset_index(drop=True)
+        for name, chunks in self._chunks.items():
+            for report in reports:
+                chunks.extend(report._chunks[name])
+
+
+def _to_json(value):
+    """Fallback for values which are not natively supported by json (i.e. numpy scalars or paths)."""
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+class IncrementalReport:
+    """Append-only journal of report rows in the newline-delimited JSON format.
+
+    Every entry holds the rows of a single (run) report and is written using a single append followed by an fsync,
+    hence a session which gets killed loses at most the entry which was written at that moment. A truncated last line
+    is ignored when the journal is loaded. If an entry with the same key is appended again (i.e. because a run was
+    processed another time), the latest one wins.
+
+    Parameters
+    ----------
+    path : str or Path
+        Location of the journal file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+
+    @property
+    def exists(self):
+        return self.path.is_file()
+
+    def append(self, report, key=None, timestamp=None):
+        """Write the rows of the given report (and optionally the start time of the session) to the journal."""
+        entry = {"key": key, **{name: report.get_records(name) for name in ["pre", "main", "post"]}}
+        if timestamp is not None:
+            entry["timestamp"] = timestamp
+        line = (json.dumps(entry, default=_to_json) + "\n").encode("utf-8")
+        with self.lock:
+            with open(self.path, "a+b") as handle:
+                # Start a new line if the last write was interrupted, else the entry would be lost as well
+                if handle.seek(0, os.SEEK_END) > 0:
+                    handle.seek(-1, os.SEEK_END)
+                    if handle.read(1) != b"\n":
+                        line = b"\n" + line
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def load_entries(self):
+        """Parse the journal and return the latest entry per key."""
+        entries = {}
+        if not self.exists:
+            return entries
+        with open(self.path, "r", encoding="utf-8") as handle:
+            for i, line in enumerate(handle):
+                if len(line.strip()) == 0:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping incomplete line %d of incremental report: %s", i + 1, self.path)
+                    continue
+                key = entry.get("key")
+                key = ("line", i) if key is None else key
+                entries.pop(key, None)  # Keep the order in which the entries were last written
+                entries[key] = entry
+        return entries
+
+    def load_timestamp(self):
+        """Return the start time of the session stored in the journal (None if unknown)."""
+        for entry in self.load_entries().values():
+            if entry.get("timestamp") is not None:
+                return entry["timestamp"]
+        return None
+
+    def load(self):
+        """Rebuild a report from all entries of the journal."""
+        report = Report()
+        entries = list(self.load_entries().values())
+        if all(isinstance(entry.get("key"), int) for entry in entries):
+            entries = sorted(entries, key=lambda entry: entry["key"])
+        for entry in entries:
+            temp = Report()
+            temp.set(pre=entry["pre"], main=entry["main"], post=entry["post"])
+            report.add(temp)
+        return report
+
+    def compact(self, path):
+        """Export the rows of the journal to a regular report file (i.e. CSV or XLSX) and return the report."""
+        report = self.load()
+        report.export(path)
+        return report
@@ -0,0 +1,138 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Content-addressed cache for the artifacts generated in the BUILD stage."""
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+from mlonmcu.logging import get_logger
+from mlonmcu.utils import hash_file, fingerprint_path
+
+logger = get_logger()
+
+
+def _fingerprint_config(config):
+    ret = {}
+    for key, value in config.items():
+        if isinstance(value, (str, Path)) and len(str(value)) > 0 and os.path.isabs(value) and os.path.exists(value):
+            value = fingerprint_path(value)
+        ret[key] = value
+    return ret
+
+
+def get_build_cache_key(model_path, backend, framework=None, tuning_records=None):
+    """Compute the cache key for a given model/backend combination.
+
+    The key depends on the model contents, the backend name and config (which already includes the config derived
+    from the target if `run.target_to_backend` is used), the contents of the tuning records and the version of
+    the used framework, which is determined based on the paths found in the configuration.
+    """
+    data = {
+        "model": hash_file(model_path),
+        "backend": backend.name,
+        "backend_config": _fingerprint_config(backend.config),
+        "framework": framework.name if framework else None,
+        "framework_config": _fingerprint_config(framework.config) if framework else None,
+        "tuning_records": hash_file(tuning_records) if tuning_records else None,
+    }
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class BuildCache:
+    """Directory-based artifact cache with size-based LRU eviction.
+
+    Each entry is a single pickle file named after its key. The modification time of an entry is updated on every
+    hit, hence the least recently used entries are removed first if the total size exceeds the limit.
+    """
+
+    def __init__(self, directory, max_size=None):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key):
+        return self.directory / f"{key}.pkl"
+
+    def lookup(self, key):
+        """Return the cached artifacts for a key or None."""
+        entry = self._entry(key)
+        try:
+            with open(entry, "rb") as handle:
+                artifacts = pickle.load(handle)
+            os.utime(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return artifacts
+
+    def store(self, key, artifacts):
+        """Add an entry to the cache and evict old entries if required."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            pickle.dump(artifacts, handle)
+        os.replace(tmp_name, self._entry(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the size limit is met."""
+        if self.max_size is None:
+            return
+        entries = []
+        for entry in self.directory.glob("*.pkl"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            logger.debug("Evicting build cache entry: %s", entry.name)
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_build_cache(directory, max_size=None):
+    """Lookup (or create) the cache instance for a given directory, so that counters are shared between runs."""
+    directory = Path(directory)
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = BuildCache(directory, max_size=max_size)
+        cache = _caches[directory]
+        cache.max_size = max_size
+        return cache
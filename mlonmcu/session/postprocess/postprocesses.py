@@ -22,17 +22,21 @@ import re
 import ast
 import tempfile
 from pathlib import Path
-
-import pandas as pd
+from functools import lru_cache
+from collections import Counter
 
 from mlonmcu.artifact import Artifact, ArtifactFormat, lookup_artifacts
 from mlonmcu.config import str2dict, str2bool, str2list
 from mlonmcu.logging import get_logger
+from mlonmcu.utils import lazy_import
 
 from .postprocess import SessionPostprocess, RunPostprocess
 
 logger = get_logger()
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
 
 def match_rows(df, cols):
     """Helper function to group similar rows in a dataframe."""
@@ -328,10 +332,115 @@ class Artifact2ColumnPostprocess(RunPostprocess):
             report.main_df[colname] = matches[0].content
 
 
+_MAJOR_OPCODES = {
+    0b0010011: "OP-IMM",
+    0b0110111: "LUI",
+    0b0010111: "AUIPC",
+    0b0110011: "OP",
+    0b1101111: "JAL",
+    0b1100111: "JALR",
+    0b1100011: "BRANCH",
+    0b0000011: "LOAD",
+    0b0100011: "STORE",
+    0b0001111: "MISC-MEM",
+    0b1110011: "SYSTEM",
+    0b1000011: "MADD",
+    0b1000111: "MSUB",
+    0b1001011: "MNSUB",
+    0b1001111: "MNADD",
+    0b0000111: "LOAD-FP",
+    0b0100111: "STORE-FP",
+    0b0001011: "custom-0",
+    0b0101011: "custom-1",
+    0b1011011: "custom-2/rv128",
+    0b1111011: "custom-3/rv128",
+    0b1101011: "reserved",
+    0b0101111: "AMO",
+    0b1010011: "OP-FP",
+    0b1010111: "OP-V",
+    0b1110111: "OP-P",
+    0b0011011: "OP-IMM-32",
+    0b0111011: "OP-32",
+}
+
+# Indexed by the 3 MSBs and the 2 LSBs of a 16-bit instruction
+_RVC_OPCODES = {
+    0b00000: "OP-IMM",
+    0b00001: "OP-IMM",
+    0b00010: "OP-IMM",
+    0b00100: "LOAD",
+    0b00101: "JAL",
+    0b00110: "LOAD-FP",
+    0b01000: "LOAD",
+    0b01001: "OP-IMM",
+    0b01010: "LOAD",
+    0b01100: "LOAD-FP",
+    0b01101: "OP-IMM",
+    0b01110: "LOAD-FP",
+    0b10000: "reserved",
+    0b10001: "MISC-ALU",
+    0b10010: "JALR",
+    0b10100: "STORE-FP",
+    0b10101: "JAL",
+    0b10110: "STORE-FP",
+    0b11000: "STORE",
+    0b11001: "BRANCH",
+    0b11010: "STORE",
+    0b11100: "STORE-FP",
+    0b11101: "BRANCH",
+    0b11110: "STORE-FP",
+}
+
+_MAJOR_NAMES = list(dict.fromkeys(_MAJOR_OPCODES.values())) + ["UNKNOWN"]
+_MAJOR_NAMES += [f"{name} (Compressed)" for name in dict.fromkeys(_RVC_OPCODES.values())]
+
+
+@lru_cache(maxsize=None)
+def _get_major_luts():
+    """Lookup tables from the (compressed) opcode to the index in _MAJOR_NAMES."""
+    major_lut = np.full(128, _MAJOR_NAMES.index("UNKNOWN"), dtype=np.int64)
+    for opcode, name in _MAJOR_OPCODES.items():
+        major_lut[opcode] = _MAJOR_NAMES.index(name)
+    rvc_lut = np.full(32, _MAJOR_NAMES.index("UNKNOWN"), dtype=np.int64)
+    for opcode, name in _RVC_OPCODES.items():
+        rvc_lut[opcode] = _MAJOR_NAMES.index(f"{name} (Compressed)")
+    return major_lut, rvc_lut
+
+
+# Instruction names are mapped to integers < _SEQ_BASE to encode sequences as a single number
+_SEQ_BASE = 2**16
+
+
+def _decode_major_opcodes(encodings):
+    """Map an array of RISC-V instruction encodings to indices of _MAJOR_NAMES."""
+    opcodes = encodings & 0b1111111
+    lsbs = opcodes & 0b11
+    msbs = (encodings & 0b1110000000000000) >> 13
+    major_lut, rvc_lut = _get_major_luts()
+    return np.where(lsbs == 0b11, major_lut[opcodes], rvc_lut[(msbs << 2) | lsbs])
+
+
+def _get_sequence_codes(ids, length):
+    """Encode every sequence of the given length in an array of instruction ids as a number (rolling hash)."""
+    num = len(ids) - length + 1
+    if num <= 0:
+        return np.zeros(0, dtype=np.int64)
+    codes = ids[:num].copy()
+    for i in range(1, length):
+        codes = codes * _SEQ_BASE + ids[i : i + num]
+    return codes
+
+
 class AnalyseInstructionsPostprocess(RunPostprocess):
     """Counting specific types of instructions."""
 
-    DEFAULTS = {**RunPostprocess.DEFAULTS, "groups": True, "sequences": True, "top": 10}
+    DEFAULTS = {
+        **RunPostprocess.DEFAULTS,
+        "groups": True,
+        "sequences": True,
+        "top": 10,
+        "chunk_size": 2**26,  # Number of bytes of the trace processed at once
+    }
 
     def __init__(self, features=None, config=None):
         super().__init__("analyse_instructions", features=features, config=config)
@@ -353,6 +462,11 @@ class AnalyseInstructionsPostprocess(RunPostprocess):
         """get sequences property."""
         return int(self.config["top"])
 
+    @property
+    def chunk_size(self):
+        """Get chunk_size property."""
+        return int(self.config["chunk_size"])
+
     def post_run(self, report, artifacts):
         """Called at the end of a run."""
         ret_artifacts = []
@@ -364,36 +478,62 @@ class AnalyseInstructionsPostprocess(RunPostprocess):
         is_ovpsim = "ovpsim" in log_artifact.flags
         is_riscv = is_spike or is_etiss or is_ovpsim
         if is_spike:
-            content = log_artifact.content
-            if self.groups:
-                encodings = re.compile(r"\((0x[0-9abcdef]+)\)").findall(content)
-            if self.sequences:
-                names = re.compile(r"core\s+\d+:\s0x[0-9abcdef]+\s\(0x[0-9abcdef]+\)\s([\w.]+).*").findall(content)
+            encoding_regex = re.compile(r"\((0x[0-9abcdef]+)\)")
+            encoding_base = 16
+            name_regex = re.compile(r"core\s+\d+:\s0x[0-9abcdef]+\s\(0x[0-9abcdef]+\)\s([\w.]+).*")
         elif is_etiss:
-            content = log_artifact.content
-            if self.groups:
-                encodings = re.compile(r"0x[0-9abcdef]+:\s\w+\s#\s([01]+)\s.*").findall(content)
-                encodings = [f"0b{enc}" for enc in encodings]
-            if self.sequences:
-                names = re.compile(r"0x[0-9abcdef]+:\s(\w+)\s#\s[01]+\s.*").findall(content)
+            encoding_regex = re.compile(r"0x[0-9abcdef]+:\s\w+\s#\s([01]+)\s.*")
+            encoding_base = 2
+            name_regex = re.compile(r"0x[0-9abcdef]+:\s(\w+)\s#\s[01]+\s.*")
         elif is_ovpsim:
-            content = log_artifact.content
-            if self.groups:
-                encodings = re.compile(r"riscvOVPsim\/cpu',\s0x[0-9abcdef]+\(.*\):\s([0-9abcdef]+)\s+\w+\s+.*").findall(
-                    content
-                )
-                encodings = [f"0x{enc}" for enc in encodings]
-            if self.sequences:
-                names = re.compile(r"riscvOVPsim\/cpu',\s0x[0-9abcdef]+\(.*\):\s[0-9abcdef]+\s+(\w+)\s+.*").findall(
-                    content
-                )
+            encoding_regex = re.compile(r"riscvOVPsim\/cpu',\s0x[0-9abcdef]+\(.*\):\s([0-9abcdef]+)\s+\w+\s+.*")
+            encoding_base = 16
+            name_regex = re.compile(r"riscvOVPsim\/cpu',\s0x[0-9abcdef]+\(.*\):\s[0-9abcdef]+\s+(\w+)\s+.*")
         else:
             raise RuntimeError("Uable to determine the used target.")
+        if self.groups:
+            assert is_riscv, "Currently only riscv instrcutions can be analysed by groups"
 
-        def _helper(x, top=100):
-            counts = pd.Series(x).value_counts()
-            probs = counts / len(x)
-            return dict(counts.head(top)), dict(probs.head(top))
+        max_len = 3
+        major_counts = np.zeros(len(_MAJOR_NAMES), dtype=np.int64)
+        sequence_counts = [Counter() for _ in range(max_len)]
+        num_names = 0
+        vocab = {}
+        prev_ids = np.zeros(0, dtype=np.int64)
+        # The trace is processed in chunks of lines to keep the memory usage bounded
+        with log_artifact.open() as handle:
+            while True:
+                lines = handle.readlines(self.chunk_size)
+                if len(lines) == 0:
+                    break
+                chunk = "".join(lines)
+                del lines
+                if self.groups:
+                    encodings = encoding_regex.findall(chunk)
+                    encodings = np.fromiter(
+                        (int(enc, encoding_base) for enc in encodings), dtype=np.int64, count=len(encodings)
+                    )
+                    major_counts += np.bincount(_decode_major_opcodes(encodings), minlength=len(_MAJOR_NAMES))
+                if self.sequences:
+                    names = name_regex.findall(chunk)
+                    num_names += len(names)
+                    ids = np.fromiter(
+                        (vocab.setdefault(name, len(vocab)) for name in names), dtype=np.int64, count=len(names)
+                    )
+                    assert len(vocab) < _SEQ_BASE, "Too many different instructions"
+                    # Keep the tail of the previous chunk to count the sequences crossing the chunk boundary
+                    ids = np.concatenate([prev_ids, ids])
+                    for length in range(1, max_len + 1):
+                        start = max(0, len(prev_ids) - length + 1)
+                        codes = _get_sequence_codes(ids[start:], length)
+                        values, counts = np.unique(codes, return_counts=True)
+                        sequence_counts[length - 1].update(dict(zip(values.tolist(), counts.tolist())))
+                    prev_ids = ids[-(max_len - 1) :]
+
+        def _helper(counts, total, top=100):
+            top_counts = dict(sorted(counts.items(), key=lambda x: x[1], reverse=True)[:top])
+            probs = {key: value / total for key, value in top_counts.items()}
+            return top_counts, probs
 
         def _gen_csv(label, counts, probs):
             lines = [f"{label},Count,Probablity"]
@@ -403,96 +543,23 @@ class AnalyseInstructionsPostprocess(RunPostprocess):
             return "\n".join(lines)
 
         if self.groups:
-            assert is_riscv, "Currently only riscv instrcutions can be analysed by groups"
-
-            def _extract_major_opcode(enc):
-                mapping = {
-                    0b0010011: "OP-IMM",
-                    0b0110111: "LUI",
-                    0b0010111: "AUIPC",
-                    0b0110011: "OP",
-                    0b1101111: "JAL",
-                    0b1100111: "JALR",
-                    0b1100011: "BRANCH",
-                    0b0000011: "LOAD",
-                    0b0100011: "STORE",
-                    0b0001111: "MISC-MEM",
-                    0b1110011: "SYSTEM",
-                    0b1000011: "MADD",
-                    0b1000111: "MSUB",
-                    0b1001011: "MNSUB",
-                    0b1001111: "MNADD",
-                    0b0000111: "LOAD-FP",
-                    0b0100111: "STORE-FP",
-                    0b0001011: "custom-0",
-                    0b0101011: "custom-1",
-                    0b1011011: "custom-2/rv128",
-                    0b1111011: "custom-3/rv128",
-                    0b1101011: "reserved",
-                    0b0101111: "AMO",
-                    0b1010011: "OP-FP",
-                    0b1010111: "OP-V",
-                    0b1110111: "OP-P",
-                    0b0011011: "OP-IMM-32",
-                    0b0111011: "OP-32",
-                }
-                enc = int(enc, 0)  # Convert from hexadecimal
-                opcode = enc & 0b1111111
-                lsbs = opcode & 0b11
-                if lsbs == 0b11:
-                    major = mapping.get(opcode, "UNKNOWN")
-                else:
-                    # 16-bit instruction
-                    msbs = (enc & 0b1110000000000000) >> 13
-                    rvc_mapping = {
-                        0b00000: "OP-IMM",
-                        0b00001: "OP-IMM",
-                        0b00010: "OP-IMM",
-                        0b00100: "LOAD",
-                        0b00101: "JAL",
-                        0b00110: "LOAD-FP",
-                        0b01000: "LOAD",
-                        0b01001: "OP-IMM",
-                        0b01010: "LOAD",
-                        0b01100: "LOAD-FP",
-                        0b01101: "OP-IMM",
-                        0b01110: "LOAD-FP",
-                        0b10000: "reserved",
-                        0b10001: "MISC-ALU",
-                        0b10010: "JALR",
-                        0b10100: "STORE-FP",
-                        0b10101: "JAL",
-                        0b10110: "STORE-FP",
-                        0b11000: "STORE",
-                        0b11001: "BRANCH",
-                        0b11010: "STORE",
-                        0b11100: "STORE-FP",
-                        0b11101: "BRANCH",
-                        0b11110: "STORE-FP",
-                    }
-                    combined = msbs << 2 | lsbs
-                    assert combined in rvc_mapping.keys()
-                    return f"{rvc_mapping[combined]} (Compressed)"
-                return major
-
-            majors = list(map(_extract_major_opcode, encodings))
-            major_counts, major_probs = _helper(majors, top=self.top)
+            counts = {_MAJOR_NAMES[i]: int(count) for i, count in enumerate(major_counts) if count > 0}
+            major_counts, major_probs = _helper(counts, int(major_counts.sum()), top=self.top)
             majors_csv = _gen_csv("Major", major_counts, major_probs)
             artifact = Artifact("analyse_instructions_majors.csv", content=majors_csv, fmt=ArtifactFormat.TEXT)
             ret_artifacts.append(artifact)
         if self.sequences:
-            max_len = 3
+            id2name = {value: key for key, value in vocab.items()}
 
-            def _get_sublists(lst, length):
-                ret = []
-                for i in range(len(lst) - length + 1):
-                    lst_ = lst[i : i + length]
-                    ret.append(";".join(lst_))
-                return ret
+            def _decode_sequence(code, length):
+                ids = [(code // (_SEQ_BASE**i)) % _SEQ_BASE for i in reversed(range(length))]
+                return ";".join(id2name[i] for i in ids)
 
             for length in range(1, max_len + 1):
-                names_ = _get_sublists(names, length)
-                counts, probs = _helper(names_, top=self.top)
+                total = max(0, num_names - length + 1)
+                counts, probs = _helper(sequence_counts[length - 1], total, top=self.top)
+                counts = {_decode_sequence(code, length): count for code, count in counts.items()}
+                probs = {_decode_sequence(code, length): prob for code, prob in probs.items()}
                 sequence_csv = _gen_csv("Sequence", counts, probs)
                 artifact = Artifact(
                     f"analyse_instructions_seq{length}.csv", content=sequence_csv, fmt=ArtifactFormat.TEXT
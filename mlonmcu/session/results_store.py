@@ -0,0 +1,320 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Append-only store for the results of all sessions of an environment based on SQLite.
+
+Every row of a session report is stored as a run with indexed columns for the model, backend, target, etc. The
+metrics are stored in a separate table with one row per run and metric, where numeric values are kept in a REAL
+column, so that they can be filtered and aggregated without parsing the reports of all sessions.
+"""
+
+import json
+import numbers
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+RESULTS_DB_NAME = "results.db"
+
+SCHEMA_VERSION = 1
+
+# Report columns which are stored in the runs table (the remaining ones are metrics)
+RUN_COLUMNS = {
+    "Session": "session",
+    "Run": "run",
+    "Model": "model",
+    "Frontend": "frontend",
+    "Framework": "framework",
+    "Backend": "backend",
+    "Platform": "platform",
+    "Target": "target",
+    "Features": "features",
+    "Config": "config",
+    "Postprocesses": "postprocesses",
+    "Comment": "comment",
+    "Failing": "failing",
+    "Timeout": "timeout",
+}
+
+# Columns which can be used for filtering and grouping
+KEY_COLUMNS = [
+    "label",
+    "session",
+    "run",
+    "timestamp",
+    "model",
+    "frontend",
+    "framework",
+    "backend",
+    "platform",
+    "target",
+]
+
+AGGREGATES = ["avg", "min", "max", "sum", "count"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    label TEXT,
+    session INTEGER,
+    run INTEGER,
+    timestamp TEXT,
+    model TEXT,
+    frontend TEXT,
+    framework TEXT,
+    backend TEXT,
+    platform TEXT,
+    target TEXT,
+    features TEXT,
+    config TEXT,
+    postprocesses TEXT,
+    comment TEXT,
+    failing INTEGER,
+    timeout INTEGER
+);
+CREATE TABLE IF NOT EXISTS features (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    feature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    value REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs(model);
+CREATE INDEX IF NOT EXISTS runs_backend ON runs(backend);
+CREATE INDEX IF NOT EXISTS runs_target ON runs(target);
+CREATE INDEX IF NOT EXISTS runs_label ON runs(label);
+CREATE INDEX IF NOT EXISTS features_feature ON features(feature, run_id);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics(run_id, name);
+CREATE INDEX IF NOT EXISTS metrics_name ON metrics(name);
+"""
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)  # NaN
+
+
+def _to_text(value):
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(x) for x in value)
+    return str(value)
+
+
+def _parse_list(value):
+    """Features and postprocesses are lists, but become strings when a report was written to a CSV file."""
+    if _is_missing(value):
+        return []
+    if isinstance(value, str):
+        value = value.strip("[]")
+        return [x.strip().strip("'\"") for x in value.split(",") if len(x.strip()) > 0]
+    return list(value)
+
+
+class ResultsStore:
+    """SQLite database with the results of all sessions.
+
+    Rows are only ever appended. Writers of concurrent sessions are serialized by SQLite.
+
+    Parameters
+    ----------
+    path : str or Path
+        Location of the database file.
+    timeout : float
+        Number of seconds to wait for other writers.
+    """
+
+    def __init__(self, path, timeout=60):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self.connect()) as con:
+            version = con.execute("PRAGMA user_version").fetchone()[0]
+            assert version in [0, SCHEMA_VERSION], f"Unsupported version of results database: {version}"
+            with con:
+                con.executescript(SCHEMA)
+                con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def add_records(self, records, label=None, timestamp=None):
+        """Append the rows of a report (a list of dicts) in a single transaction.
+
+        Returns
+        -------
+        int
+            Number of added runs.
+        """
+        with closing(self.connect()) as con:
+            with con:
+                for record in records:
+                    values = {column: None for column in RUN_COLUMNS.values()}
+                    metrics = []
+                    for key, value in record.items():
+                        if key in RUN_COLUMNS:
+                            values[RUN_COLUMNS[key]] = value
+                        elif not _is_missing(value):
+                            metrics.append((key, value))
+                    features = _parse_list(values["features"])
+                    for key in ["session", "run", "failing", "timeout"]:
+                        values[key] = None if _is_missing(values[key]) else int(values[key])
+                    for key in ["model", "frontend", "framework", "backend", "platform", "target", "comment"]:
+                        values[key] = None if _is_missing(values[key]) else _to_text(values[key])
+                    values["features"] = ",".join(features)
+                    values["postprocesses"] = ",".join(_parse_list(values["postprocesses"]))
+                    config = values["config"]
+                    if not _is_missing(config) and not isinstance(config, str):
+                        config = json.dumps(config, default=str, sort_keys=True)
+                    values["config"] = None if _is_missing(config) else config
+                    cursor = con.execute(
+                        "INSERT INTO runs (label, timestamp, "
+                        + ", ".join(values.keys())
+                        + ") VALUES (?, ?, "
+                        + ", ".join("?" for _ in values)
+                        + ")",
+                        [label, timestamp, *values.values()],
+                    )
+                    run_id = cursor.lastrowid
+                    con.executemany(
+                        "INSERT INTO features (run_id, feature) VALUES (?, ?)",
+                        [(run_id, feature) for feature in features],
+                    )
+                    con.executemany(
+                        "INSERT INTO metrics (run_id, name, value, text) VALUES (?, ?, ?, ?)",
+                        [
+                            (
+                                (run_id, name, float(value), None)
+                                if isinstance(value, numbers.Number)
+                                else (run_id, name, None, _to_text(value))
+                            )
+                            for name, value in metrics
+                        ],
+                    )
+        return len(records)
+
+    def add_report(self, report, label=None, timestamp=None):
+        """Append all rows of a session report."""
+        return self.add_records(report.df.to_dict(orient="records"), label=label, timestamp=timestamp)
+
+    def has_session(self, label, session=None):
+        """Check whether rows of the given session were already added."""
+        with closing(self.connect()) as con:
+            row = con.execute(
+                "SELECT 1 FROM runs WHERE label = ? AND session IS ? LIMIT 1", [label, session]
+            ).fetchone()
+        return row is not None
+
+    def get_metric_names(self):
+        with closing(self.connect()) as con:
+            return [row[0] for row in con.execute("SELECT DISTINCT name FROM metrics ORDER BY name")]
+
+    def query(self, filters=None, features=None, metrics=None, group_by=None, aggregate="avg", since=None, limit=None):
+        """Select (and aggregate) the stored results.
+
+        Arguments
+        ---------
+        filters : dict
+            Maps key columns (see KEY_COLUMNS) to lists of allowed values.
+        features : list
+            Only runs which used all of the given features are selected.
+        metrics : list
+            Names of the metrics to be returned (default: all metrics of the selected runs).
+        group_by : list
+            Key columns used to group the runs. The metrics are aggregated per group.
+        aggregate : str
+            Aggregation function for the metrics (see AGGREGATES).
+        since : str
+            Only consider runs of sessions started at or after the given (ISO) timestamp.
+        limit : int
+            Maximum number of returned rows.
+
+        Returns
+        -------
+        tuple
+            The column names and a list of rows.
+        """
+        filters = filters if filters else {}
+        features = features if features else []
+        group_by = group_by if group_by else []
+        conditions = []
+        params = []
+        for column, values in filters.items():
+            assert column in KEY_COLUMNS, f"Unsupported filter: {column}"
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            conditions.append(f"r.{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        for feature in features:
+            conditions.append("EXISTS (SELECT 1 FROM features f WHERE f.run_id = r.id AND f.feature = ?)")
+            params.append(feature)
+        if since is not None:
+            conditions.append("r.timestamp >= ?")
+            params.append(since)
+        where = (" WHERE " + " AND ".join(conditions)) if len(conditions) > 0 else ""
+        with closing(self.connect()) as con:
+            if metrics is None:
+                metrics = [
+                    row[0]
+                    for row in con.execute(
+                        f"SELECT DISTINCT m.name FROM metrics m WHERE m.run_id IN (SELECT r.id FROM runs r{where})"
+                        " ORDER BY m.name",
+                        params,
+                    )
+                ]
+            selects = []
+            select_params = []
+            if len(group_by) > 0:
+                assert aggregate in AGGREGATES, f"Unsupported aggregate: {aggregate}"
+                for column in group_by:
+                    assert column in KEY_COLUMNS, f"Unsupported group: {column}"
+                columns = [*group_by, "Runs", *[f"{aggregate.capitalize()} {name}" for name in metrics]]
+                selects.extend(f"r.{column}" for column in group_by)
+                selects.append("COUNT(*)")
+                for name in metrics:
+                    selects.append(
+                        f"{aggregate.upper()}((SELECT m.value FROM metrics m WHERE m.run_id = r.id AND m.name = ?))"
+                    )
+                    select_params.append(name)
+                tail = " GROUP BY " + ", ".join(f"r.{column}" for column in group_by)
+                tail += " ORDER BY " + ", ".join(f"r.{column}" for column in group_by)
+            else:
+                columns = [*KEY_COLUMNS, "features", *metrics]
+                selects.extend(f"r.{column}" for column in KEY_COLUMNS)
+                selects.append("r.features")
+                for name in metrics:
+                    selects.append(
+                        "(SELECT COALESCE(m.value, m.text) FROM metrics m WHERE m.run_id = r.id AND m.name = ?)"
+                    )
+                    select_params.append(name)
+                tail = " ORDER BY r.id"
+            if limit is not None:
+                tail += f" LIMIT {int(limit)}"
+            sql = f"SELECT {', '.join(selects)} FROM runs r{where}{tail}"
+            rows = con.execute(sql, [*select_params, *params]).fetchall()
+        return columns, rows
+
+
+def get_results_store(directory):
+    """Return the results store located in the given (results) directory."""
+    return ResultsStore(Path(directory) / RESULTS_DB_NAME)
@@ -19,6 +19,8 @@
 """Definition of a MLonMCU Run which represents a single benchmark instance for a given set of options."""
 import itertools
 import os
+import time
+import json
 import copy
 import tempfile
 from pathlib import Path
@@ -26,7 +28,7 @@ from enum import IntEnum
 from collections import defaultdict
 
 from mlonmcu.logging import get_logger
-from mlonmcu.artifact import ArtifactFormat, lookup_artifacts
+from mlonmcu.artifact import Artifact, ArtifactFormat, lookup_artifacts
 from mlonmcu.config import str2bool
 from mlonmcu.platform.platform import CompilePlatform, TargetPlatform, BuildPlatform, TunePlatform
 from mlonmcu.report import Report  # TODO: move to mlonmcu.session.report
@@ -36,11 +38,14 @@ from mlonmcu.feature.type import FeatureType
 from mlonmcu.feature.features import get_matching_features, get_available_features
 from mlonmcu.target.metrics import Metrics
 from mlonmcu.models import SUPPORTED_FRONTENDS
+from mlonmcu.setup.utils import ProcessTimeout
 from mlonmcu.platform import get_platforms
 from mlonmcu.flow import SUPPORTED_FRAMEWORKS, SUPPORTED_BACKENDS
 
 from .postprocess import SUPPORTED_POSTPROCESSES
 from .postprocess.postprocess import RunPostprocess
+from .build_cache import get_build_cache, get_build_cache_key
+from .tuning_records import get_tuning_record_store
 
 logger = get_logger()
 
@@ -68,15 +73,48 @@ class Run:
         "tune_enabled": False,
         "target_to_backend": False,
         "stage_subdirs": False,
+        "build_cache": False,
+        "build_cache_size": 4096,  # in MB
+        "tuning_database": False,  # Share tuning records between runs and sessions
+        # Write the state of the run to its directory after every stage if the run is exported (see --resume)
+        "checkpoint": True,
     }
 
     REQUIRED = []
     OPTIONAL = []
 
+    CHECKPOINT_FILE = "run.pkl"
+    MANIFEST_FILE = "state.json"
+
     @classmethod
-    def from_file(cls, path):
-        """Restore a run object which was written to the disk."""
-        raise NotImplementedError
+    def from_file(cls, path, session=None):
+        """Restore a run object from the checkpoint which was written to its directory.
+
+        Stages whose (non-optional) artifacts are missing on the disk are marked as not completed, so that they are
+        processed again.
+        """
+        from .session import load_run  # The session module depends on this one
+
+        path = Path(path)
+        if path.is_dir():
+            path = path / cls.CHECKPOINT_FILE
+        with open(path, "rb") as handle:
+            run = load_run(handle.read(), session)
+        run.dir = path.parent
+        run.archived = False
+        run.resumed = True
+        run.locked = False
+        run.failing = False
+        run.timed_out = False
+        for stage in RunStage:
+            if stage == RunStage.NOP or not run.completed[stage]:
+                continue
+            missing = run.get_missing_artifacts(stage)
+            if len(missing) > 0:
+                logger.warning("%s Artifacts of stage %s are missing: %s", run.prefix, stage.name, missing)
+                run.rewind(stage)
+                break
+        return run
 
     def __init__(
         self,
@@ -120,9 +158,13 @@ class Run:
         self.sub_parents = {}
         self.result = None
         self.failing = False  # -> RunStatus
+        self.timed_out = False
         # self.lock = threading.Lock()  # FIXME: use mutex instead of boolean
         self.locked = False
         self.report = None
+        # Components which are only instantiated once the run is processed
+        self.pending_components = []
+        self.resumed = False  # Restored from a checkpoint
 
     def process_features(self, features):
         """Utility which handles postprocess_features."""
@@ -160,6 +202,30 @@ class Run:
         value = self.run_config["stage_subdirs"]
         return str2bool(value) if not isinstance(value, (bool, int)) else value
 
+    @property
+    def build_cache(self):
+        """Get build_cache property."""
+        value = self.run_config["build_cache"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def build_cache_size(self):
+        """Get build_cache_size property (in bytes)."""
+        value = self.run_config["build_cache_size"]
+        return int(float(value) * 1024 * 1024) if value is not None else None
+
+    @property
+    def checkpoint(self):
+        """Get checkpoint property."""
+        value = self.run_config["checkpoint"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def tuning_database(self):
+        """Get tuning_database property."""
+        value = self.run_config["tuning_database"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
     @property
     def build_platform(self):
         """Get platform for build stage."""
@@ -205,6 +271,15 @@ class Run:
                 return platform
         return None
 
+    def is_pending(self, kind):
+        """Returns true if a component of the given kind will be added when the run is processed."""
+        return any(kind_ == kind for kind_, _, _ in self.pending_components)
+
+    def get_pending_name(self, kind):
+        """Return the (first candidate) name of the latest pending component of the given kind."""
+        names = [names[0] for kind_, names, _ in self.pending_components if kind_ == kind]
+        return names[-1] if len(names) > 0 else None
+
     def has_stage(self, stage):
         """Returns true if the given stage is available for this run."""
         if stage == RunStage.NOP:
@@ -212,9 +287,19 @@ class Run:
         if stage == RunStage.LOAD:
             return self.model is not None and len(self.frontends) > 0
         if stage == RunStage.TUNE:
-            return self.tune_enabled and self.backend is not None
+            return self.tune_enabled and (self.backend is not None or self.is_pending("backend"))
         if stage == RunStage.BUILD:
-            return self.backend is not None and self.framework is not None
+            return (self.backend is not None and self.framework is not None) or self.is_pending("backend")
+        if stage in [RunStage.COMPILE, RunStage.RUN] and self.is_pending("target"):
+            # Targets are created by the platform added before them
+            platform_name = self.get_pending_name("platform")
+            if platform_name is not None:
+                platform_cls = get_platforms()[platform_name]
+            elif len(self.platforms) > 0:
+                platform_cls = type(self.platforms[-1])
+            else:
+                return False
+            return issubclass(platform_cls, CompilePlatform if stage == RunStage.COMPILE else TargetPlatform)
         if stage == RunStage.COMPILE:
             return self.target is not None and len(self.platforms) > 0 and self.compile_platform is not None
         if stage == RunStage.RUN:
@@ -257,7 +342,7 @@ class Run:
         # self.lock.release()
         self.locked = False
 
-    def init_directory(self):
+    def init_directory(self, context=None):
         """Initialize the temporary directory for this run."""
         if self.session is None:
             assert not self.archived
@@ -272,17 +357,79 @@ class Run:
             # A solution would be to split up the framework runtime libs from the mlif...
             for platform in self.platforms:  # TODO: only do this if needed! (not for every platform)
                 # The stage_subdirs setting is ignored here because platforms can be multi-stage!
-                platform.init_directory(path=Path(self.dir) / platform.name)
+                platform.init_directory(path=Path(self.dir) / platform.name, context=context)
 
     def copy(self):
-        """Create a new run based on this instance."""
-        new = copy.deepcopy(self)
+        """Create a new run based on this instance.
+
+        The model, frontends, features and postprocesses are not modified after they were added, hence they are
+        shared with the new run instead of being copied. Only the configuration and the already instantiated
+        platforms, backend, framework and target are copied.
+        """
+        new = copy.copy(self)
+        shared = [self.model, *self.frontends, *self.features, *self.postprocesses]
+        memo = {id(obj): obj for obj in shared}
+        (
+            new.backend,
+            new.framework,
+            new.target,
+            new.platforms,
+            new.artifacts_per_stage,
+            new.report,
+        ) = copy.deepcopy(
+            (self.backend, self.framework, self.target, self.platforms, self.artifacts_per_stage, self.report), memo
+        )
+        new.frontends = list(self.frontends)
+        new.features = list(self.features)
+        new.run_features = list(self.run_features)
+        new.postprocesses = list(self.postprocesses)
+        new.config = self.config.copy()
+        new.run_config = self.run_config.copy()
+        new.cache_hints = list(self.cache_hints)
+        new.completed = self.completed.copy()
+        new.sub_names = list(self.sub_names)
+        new.sub_parents = self.sub_parents.copy()
+        new.pending_components = list(self.pending_components)
         if self.session:
             new_idx = self.session.request_run_idx()
             new.idx = new_idx
-            self.init_directory()
+        else:
+            new.init_directory()
         return new
 
+    def defer_component(self, kind, *names, optional=False):
+        """Add a platform, backend or target by name once the run is processed instead of now.
+
+        Arguments
+        ---------
+        kind : str
+            Kind of the component (platform, backend or target).
+        names : str
+            Candidates which are tried in the given order until one of them can be added.
+        optional : bool
+            If true, it is no error if none of the candidates can be added.
+        """
+        assert kind in ["platform", "backend", "target"], f"Unsupported component: {kind}"
+        assert len(names) > 0
+        self.pending_components.append((kind, names, optional))
+
+    def resolve_components(self, context=None):
+        """Instantiate the deferred components in the order they were added."""
+        if len(self.pending_components) == 0:
+            return
+        pending, self.pending_components = self.pending_components, []
+        for kind, names, optional in pending:
+            func = getattr(self, f"add_{kind}_by_name")
+            for i, name in enumerate(names):
+                try:
+                    func(name, context=context)
+                    break
+                except AssertionError:  # TODO: replace with incompatble error
+                    if i == len(names) - 1 and not optional:
+                        raise
+        if self.session is not None:
+            self.init_directory(context=context)
+
     def init_component(self, component_cls, context=None):
         """Helper function to create and configure a MLonMCU component instance for this run."""
         required_keys = component_cls.REQUIRED
@@ -448,7 +595,10 @@ class Run:
         #     target_name
         # ), f"The target '{target_name}' is not enabled for this environment"
         assert len(self.platforms) > 0, "Please add a platform to the run before adding the target"
-        self.add_target(self.init_component(self.target_platform.create_target(target_name), context=context))
+        target = self.init_component(self.target_platform.create_target(target_name), context=context)
+        if context is not None:
+            target.temp_dir = context.environment.paths["temp"].path
+        self.add_target(target)
 
     def add_platform_by_name(self, platform_name, context=None):
         """Helper function to initialize and configure a platform by its name."""
@@ -561,7 +711,107 @@ class Run:
                         if extract:
                             artifact.export(dest, extract=True)
 
-    def postprocess(self):
+    def get_artifact_memory(self):
+        """Return the number of bytes held in memory by the artifacts of this run."""
+        return sum(
+            artifact.memory_size
+            for subs in self.artifacts_per_stage.values()
+            for artifacts in subs.values()
+            for artifact in artifacts
+        )
+
+    def spill_artifacts(self):
+        """Export the artifacts of the completed stages and drop their data from memory."""
+        for stage, subs in self.artifacts_per_stage.items():
+            if not self.completed[stage]:
+                continue
+            self.export_stage(stage, optional=self.export_optional)
+            for artifacts in subs.values():
+                for artifact in artifacts:
+                    artifact.unload()
+
+    def get_manifest(self):
+        """Describe the completed stages, sub parents and artifacts of the run."""
+
+        def _stage_name(stage):
+            return RunStage(stage).name if stage is not None else None
+
+        artifacts = {}
+        for stage, subs in self.artifacts_per_stage.items():
+            artifacts[_stage_name(stage)] = {
+                sub: [
+                    {
+                        "name": artifact.name,
+                        "fmt": artifact.fmt.name,
+                        "path": str(artifact.path) if artifact.path is not None else None,
+                        "optional": artifact.optional,
+                    }
+                    for artifact in subs_artifacts
+                ]
+                for sub, subs_artifacts in subs.items()
+            }
+        return {
+            "idx": self.idx,
+            "completed": [stage.name for stage in RunStage if self.completed[stage]],
+            "next_stage": RunStage(self.next_stage).name,
+            "failing": self.failing,
+            "sub_parents": [
+                [_stage_name(stage), sub, _stage_name(parent_stage), parent_sub]
+                for (stage, sub), (parent_stage, parent_sub) in self.sub_parents.items()
+            ],
+            "artifacts": artifacts,
+        }
+
+    def get_missing_artifacts(self, stage):
+        """Return the names of the artifacts of a stage which are neither held in memory nor found on the disk."""
+        missing = []
+        for subs_artifacts in self.artifacts_per_stage.get(stage, {}).values():
+            for artifact in subs_artifacts:
+                if artifact.optional or artifact.in_memory:
+                    continue
+                if artifact.path is None or not Path(artifact.path).exists():
+                    missing.append(artifact.name)
+        return missing
+
+    def rewind(self, stage):
+        """Mark the given stage and all following stages as not completed."""
+        for stage_ in RunStage:
+            if stage_ < stage:
+                continue
+            self.completed[stage_] = False
+            self.artifacts_per_stage.pop(stage_, None)
+        self.sub_parents = {key: value for key, value in self.sub_parents.items() if key[0] < stage}
+        self.report = None
+
+    def save_checkpoint(self, stage=None):
+        """Write the state of the run to its directory.
+
+        The artifacts of the given (just completed) stage are exported and unloaded first, the ones of earlier stages
+        were already handled by their own checkpoints. Files are replaced atomically, hence an interrupted checkpoint
+        leaves the previous one intact.
+        """
+        from .session import dump_run  # The session module depends on this one
+
+        if stage is not None and stage in self.artifacts_per_stage:
+            self.export_stage(stage, optional=self.export_optional)
+            for artifacts in self.artifacts_per_stage[stage].values():
+                for artifact in artifacts:
+                    artifact.unload()
+        files = {
+            self.CHECKPOINT_FILE: dump_run(self),
+            self.MANIFEST_FILE: json.dumps(self.get_manifest(), indent=2).encode("utf-8"),
+        }
+        for name, data in files.items():
+            fd, tmp_name = tempfile.mkstemp(dir=self.dir, prefix=f".{name}", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(data)
+                os.replace(tmp_name, self.dir / name)
+            except BaseException:
+                os.remove(tmp_name)
+                raise
+
+    def postprocess(self, context=None):
         """Postprocess the 'run'."""
         logger.debug("%s Processing stage POSTPROCESS", self.prefix)
         self.lock()
@@ -618,7 +868,7 @@ class Run:
         self.completed[RunStage.POSTPROCESS] = True
         self.unlock()
 
-    def run(self):
+    def run(self, context=None):
         """Run the 'run' using the defined target."""
         logger.debug("%s Processing stage RUN", self.prefix)
         self.lock()
@@ -668,7 +918,7 @@ class Run:
         self.completed[RunStage.RUN] = True
         self.unlock()
 
-    def compile(self):
+    def compile(self, context=None):
         """Compile the target software for the run."""
         logger.debug("%s Processing stage COMPILE", self.prefix)
         self.lock()
@@ -700,7 +950,7 @@ class Run:
         self.completed[RunStage.COMPILE] = True
         self.unlock()
 
-    def build(self):
+    def build(self, context=None):
         """Process the run using the choosen backend."""
         logger.debug("%s Processing stage BUILD", self.prefix)
         self.lock()
@@ -731,9 +981,11 @@ class Run:
                     if not tuning_artifact.exported:
                         tuning_artifact.export(self.dir)
                     self.backend.tuning_records = tuning_artifact.path
+            elif hasattr(self.backend, "tuning_records") and self.backend.tuning_records is None:
+                self.use_database_tuning_records(model_artifact.path, context=context)
 
             # TODO: allow raw data as well as filepath in backends
-            artifacts = self.backend.generate_artifacts()
+            artifacts = self.generate_build_artifacts(model_artifact.path, context=context)
             if isinstance(artifacts, dict):
                 new = {
                     key if name in ["", "default"] else (f"{name}_{key}" if key not in ["", "default"] else name): value
@@ -749,7 +1001,72 @@ class Run:
         self.completed[RunStage.BUILD] = True
         self.unlock()
 
-    def tune(self):
+    def get_build_cache(self, context=None):
+        """Return the build cache of the environment if enabled."""
+        if not self.build_cache or context is None:
+            return None
+        cache_dir = context.environment.paths["temp"].path / "build_cache"
+        return get_build_cache(cache_dir, max_size=self.build_cache_size)
+
+    def get_tuning_database(self, context=None):
+        """Return the shared tuning records of the environment if enabled."""
+        if not self.tuning_database or context is None:
+            return None
+        return get_tuning_record_store(context.environment.paths["temp"].path / "tuning_records")
+
+    def use_database_tuning_records(self, model_path, context=None):
+        """Let the backend pick up the best known tuning records of the model if the TUNE stage was skipped."""
+        database = self.get_tuning_database(context=context)
+        if database is None or self.tune_platform is None:
+            return
+        self.tune_platform.tuning_database = database
+        content = self.tune_platform.lookup_tuning_records(model_path, self.backend)
+        if not content:
+            return
+        logger.debug("%s Using %d tuning records from database", self.prefix, len(content.splitlines()))
+        path = Path(self.dir) / "best_tuning_results.log.txt"
+        with open(path, "w") as handle:
+            handle.write(content)
+        self.backend.tuning_records = path
+        self.backend.config["use_tuning_results"] = True
+
+    def generate_build_artifacts(self, model_path, context=None):
+        """Invoke the backend or reuse the artifacts of an identical build from the cache."""
+        cache = self.get_build_cache(context=context)
+        if cache is None or not self.backend.cacheable:
+            return self.backend.generate_artifacts()
+        tuning_records = self.backend.tuning_records if hasattr(self.backend, "tuning_records") else None
+        start_time = time.time()
+        key = get_build_cache_key(model_path, self.backend, framework=self.framework, tuning_records=tuning_records)
+        artifacts = cache.lookup(key)
+        hit = artifacts is not None
+        if hit:
+            logger.debug("%s Using cached build artifacts (%s)", self.prefix, key)
+        else:
+            artifacts = self.backend.generate_artifacts()
+            cacheable = all(
+                artifact.fmt != ArtifactFormat.PATH for artifacts_ in artifacts.values() for artifact in artifacts_
+            )
+            if cacheable:
+                cache.store(key, artifacts)
+        for name, artifacts_ in artifacts.items():
+            for i, artifact in enumerate(artifacts_):
+                artifact.path = None  # Not exported yet
+                if artifact.name == "build_metrics.csv":
+                    metrics = Metrics.from_csv(artifact.content)
+                    metrics.add("Build Cache Hit", hit, overwrite=True)
+                    if hit and metrics.has("Build Stage Time [s]"):
+                        # The cached metrics hold the time of the original build
+                        metrics.add("Build Stage Time [s]", time.time() - start_time, True, overwrite=True)
+                    artifacts_[i] = Artifact(
+                        artifact.name,
+                        content=metrics.to_csv(include_optional=True),
+                        fmt=artifact.fmt,
+                        flags=artifact.flags,
+                    )
+        return artifacts
+
+    def tune(self, context=None):
         """Tune the run using the choosen backend (if supported)."""
         logger.debug("%s Processing stage TUNE", self.prefix)
         self.lock()
@@ -771,7 +1088,13 @@ class Run:
 
             # TODO: allow raw data as well as filepath in backends
             assert self.tune_platform, "Autotuning requires a TunePlatform"
-            res = self.tune_platform.tune_model(model_artifact.path, self.backend, self.target)
+            self.tune_platform.tuning_database = self.get_tuning_database(context=context)
+            # The scheduler is only valid while the session processes the runs and can not be pickled
+            self.tune_platform.tuning_scheduler = getattr(self.session, "tuning_scheduler", None)
+            try:
+                res = self.tune_platform.tune_model(model_artifact.path, self.backend, self.target)
+            finally:
+                self.tune_platform.tuning_scheduler = None
             new = {f"{name}": []}
             if res:
                 if isinstance(res, dict):
@@ -786,7 +1109,7 @@ class Run:
         self.completed[RunStage.TUNE] = True
         self.unlock()
 
-    def load(self):
+    def load(self, context=None):
         """Load the model using the given frontend."""
         logger.debug("%s Processing stage LOAD", self.prefix)
         self.lock()
@@ -819,7 +1142,7 @@ class Run:
         self.completed[RunStage.LOAD] = True
         self.unlock()
 
-    def process(self, until=RunStage.RUN, skip=None, export=False):
+    def process(self, until=RunStage.RUN, skip=None, export=False, context=None):
         """Process the run until a given stage."""
         skip = skip if skip is not None else []
         if until == RunStage.DONE:
@@ -846,7 +1169,15 @@ class Run:
                 str(RunStage(until).name),
                 # str(self),
             )
-        for stage in range(start, until + 1):
+        stages = range(start, until + 1)
+        try:
+            self.resolve_components(context=context)
+        except Exception as e:
+            self.failing = True
+            logger.exception(e)
+            logger.error("%s Unable to initialize the components of the run, aborting...", self.prefix)
+            stages = []
+        for stage in stages:
             if not self.has_stage(stage):
                 continue
             if stage in skip:
@@ -866,8 +1197,18 @@ class Run:
             func = stage_funcs[stage]
             if func:
                 self.failing = False
+                self.timed_out = False
                 try:
-                    func()
+                    func(context=context)
+                except ProcessTimeout as e:
+                    self.failing = True
+                    self.timed_out = True
+                    if self.locked:
+                        self.unlock()
+                    logger.error("%s %s", self.prefix, e)
+                    run_stage = RunStage(stage).name
+                    logger.error("%s Run timed out at stage '%s', aborting...", self.prefix, run_stage)
+                    break
                 except Exception as e:
                     self.failing = True
                     if self.locked:
@@ -876,6 +1217,11 @@ class Run:
                     run_stage = RunStage(stage).name
                     logger.error("%s Run failed at stage '%s', aborting...", self.prefix, run_stage)
                     break
+                if export and self.checkpoint and self.session is not None:
+                    try:
+                        self.save_checkpoint(stage=stage)
+                    except Exception as e:  # Only affects --resume
+                        logger.error("%s Unable to write checkpoint, the run can not be resumed: %s", self.prefix, e)
             # self.stage = stage  # FIXME: The stage_func should update the stage intead?
         report = self.get_report()
         if export:
@@ -999,6 +1345,9 @@ class Run:
             pre["Platform"] = self.get_platform_name()
         if self.target:
             pre["Target"] = self.target.name
+        for kind in ["backend", "platform", "target"]:
+            if self.is_pending(kind):  # The run failed before its components were created
+                pre[kind.capitalize()] = self.get_pending_name(kind)
         post = {}
         post["Features"] = self.get_all_feature_names()
         # post["Config"] = self.get_all_configs(omit_paths=True, omit_defaults=True, omit_globals=True)
@@ -1007,6 +1356,8 @@ class Run:
         post["Comment"] = self.comment if len(self.comment) > 0 else "-"
         if self.failing:
             post["Failing"] = True
+        if self.timed_out:
+            post["Timeout"] = True
 
         self.export_stage(RunStage.RUN, optional=self.export_optional)
 
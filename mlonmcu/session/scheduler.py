@@ -0,0 +1,61 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Admission control used to process the stages of multiple runs in a pipelined fashion."""
+import multiprocessing
+
+from .run import RunStage
+
+
+class StageScheduler:
+    """Keeps track of the resources used by the currently processed stages.
+
+    Every stage can have its own concurrency limit (i.e. the number of parallel BUILD or RUN jobs) and all jobs
+    share a global CPU budget. Jobs which use multiple threads (i.e. COMPILE stages using `mlif.num_threads`) are
+    weighted accordingly.
+    """
+
+    def __init__(self, stage_limits=None, cpu_budget=None):
+        self.stage_limits = stage_limits if stage_limits is not None else {}
+        self.cpu_budget = cpu_budget if cpu_budget is not None else 2 * multiprocessing.cpu_count()
+        self.running = {}
+        self.cpu_used = 0
+
+    def get_cost(self, run, stage):
+        """Returns the number of CPUs expected to be used by the given stage of a run."""
+        cost = 1
+        if stage == RunStage.COMPILE and run.compile_platform is not None:
+            cost = getattr(run.compile_platform, "num_threads", 1)
+        return max(1, min(int(cost), self.cpu_budget))
+
+    def can_admit(self, stage, cost):
+        """Check if a job for the given stage can be started without exceeding the limits."""
+        limit = self.stage_limits.get(stage)
+        if limit is not None and self.running.get(stage, 0) >= limit:
+            return False
+        return self.cpu_used + cost <= self.cpu_budget
+
+    def acquire(self, stage, cost):
+        """Register a started job."""
+        self.running[stage] = self.running.get(stage, 0) + 1
+        self.cpu_used += cost
+
+    def release(self, stage, cost):
+        """Register a finished job."""
+        self.running[stage] -= 1
+        self.cpu_used -= cost
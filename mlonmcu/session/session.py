@@ -17,24 +17,30 @@
 # limitations under the License.
 #
 """Definition of a MLonMCU Run which represents a set of benchmarks in a session."""
+import io
 import os
+import contextlib
+import pickle
 import shutil
 import tempfile
+import threading
 import multiprocessing
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 import concurrent.futures
 
-from tqdm import tqdm
 
 from mlonmcu.session.run import Run
 from mlonmcu.logging import get_logger
-from mlonmcu.report import Report
-from mlonmcu.config import filter_config
+from mlonmcu.report import Report, IncrementalReport
+from mlonmcu.config import filter_config, str2bool
 
 from .postprocess.postprocess import SessionPostprocess
 from .run import RunStage
+from .scheduler import StageScheduler
+from .tuning_scheduler import TuningScheduler
+from .results_store import get_results_store
 
 logger = get_logger()  # TODO: rename to get_mlonmcu_logger
 
@@ -48,11 +54,95 @@ class SessionStatus(Enum):  # TODO: remove?
     ERROR = 3
 
 
+class DetachedSession:
+    """Lightweight stand-in for a session which is used while a run is processed in a worker process."""
+
+    def __init__(self, session):
+        self.idx = session.idx
+        self.label = session.label
+        self.dir = session.dir
+        self.runs_dir = session.runs_dir
+
+
+class WorkerContext:
+    """Picklable subset of the context which is passed to runs processed in a worker process."""
+
+    def __init__(self, context):
+        self.environment = context.environment
+        self.cache = context.cache
+
+
+class _RunPickler(pickle.Pickler):
+    """Pickler which does not serialize the session of a run (and hence all other runs) along with the run."""
+
+    def persistent_id(self, obj):
+        if isinstance(obj, (Session, DetachedSession)):
+            return "session"
+        return None
+
+
+class _RunUnpickler(pickle.Unpickler):
+    def __init__(self, file, session):
+        super().__init__(file)
+        self.session = session
+
+    def persistent_load(self, pid):
+        assert pid == "session"
+        return self.session
+
+
+def dump_run(run):
+    """Serialize a run without its session."""
+    buffer = io.BytesIO()
+    _RunPickler(buffer).dump(run)
+    return buffer.getvalue()
+
+
+def load_run(data, session):
+    """Deserialize a run which was serialized using dump_run and attach it to the given session."""
+    return _RunUnpickler(io.BytesIO(data), session).load()
+
+
+def _process_run_in_worker(data, session, until, skip, context):
+    """Process a serialized run in a worker process.
+
+    All artifacts are written to the run directory and unloaded before the run is sent back, so that only the
+    report and the artifact metadata need to be transferred to the main process.
+    """
+    run = load_run(data, session)
+    run.process(until=until, skip=skip, export=True, context=context)
+    for stage_artifacts in run.artifacts_per_stage.values():
+        for artifacts in stage_artifacts.values():
+            for artifact in artifacts:
+                artifact.unload()
+    return dump_run(run)
+
+
 class Session:
     """A session which wraps around multiple runs in a context."""
 
     DEFAULTS = {
         "report_fmt": "csv",
+        "executor": "thread",  # values: thread, process
+        "cpu_budget": None,  # Defaults to 2 * cpu_count (only used for per_stage processing)
+        # Maximum number of concurrent jobs per stage (only used for per_stage processing)
+        "load_workers": None,
+        "tune_workers": None,
+        "build_workers": None,
+        "compile_workers": None,
+        "run_workers": None,
+        "postprocess_workers": None,
+        # Tune the tasks of all runs on a shared pool of workers (requires tvm.experimental_tvmc_tune_tasks)
+        "tune_scheduler": False,
+        "tune_scheduler_workers": None,  # Defaults to the number of workers used for processing the runs
+        "tune_budget": None,  # Maximum number of trials for all tasks of the session
+        "tune_early_stopping": None,  # Overrides the early stopping of every task
+        # Maximum size of the artifact data kept in memory (in MB), the artifacts of runs are exported and unloaded
+        # as soon as it is exceeded
+        "memory_budget": None,
+        "results_db": True,  # Append the report to the results database of the environment
+        # Append the report of every run to report.ndjson as soon as it is completed
+        "incremental_report": True,
     }
 
     def __init__(self, label="", idx=None, archived=False, dir=None, config=None):
@@ -70,6 +160,10 @@ class Session:
         self.report = None
         self.next_run_idx = 0
         self.archived = archived
+        self.resumed = False
+        self.tuning_scheduler = None
+        self.memory_lock = threading.Lock()
+        self.memory_usage = {}  # Bytes held in memory by the artifacts of each run
         if dir is None:
             assert not self.archived
             self.tempdir = tempfile.TemporaryDirectory()
@@ -77,10 +171,11 @@ class Session:
         else:
             self.tempdir = None
             self.dir = dir
-            if not self.dir.is_dir():
+            if not self.archived and not self.dir.is_dir():
                 self.dir.mkdir(parents=True)
         self.runs_dir = self.dir / "runs"
-        if not os.path.exists(self.runs_dir):
+        # The directories of archived sessions are not touched to keep the lookup of old sessions cheap
+        if not self.archived and not os.path.exists(self.runs_dir):
             os.mkdir(self.runs_dir)
         if not self.archived:
             self.open()
@@ -95,6 +190,118 @@ class Session:
         """get report_fmt property."""
         return str(self.config["report_fmt"])
 
+    @property
+    def executor(self):
+        """get executor property."""
+        value = str(self.config["executor"])
+        assert value in ["thread", "process"], f"Unsupported session executor: {value}"
+        return value
+
+    @property
+    def cpu_budget(self):
+        """get cpu_budget property."""
+        value = self.config["cpu_budget"]
+        return int(value) if value is not None else None
+
+    @property
+    def stage_limits(self):
+        """get the maximum number of parallel jobs for each stage."""
+        ret = {}
+        for stage in RunStage:
+            value = self.config.get(f"{stage.name.lower()}_workers")
+            if value is not None:
+                ret[stage] = int(value)
+        return ret
+
+    @property
+    def tune_scheduler(self):
+        """get tune_scheduler property."""
+        value = self.config["tune_scheduler"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def tune_scheduler_workers(self):
+        """get tune_scheduler_workers property."""
+        value = self.config["tune_scheduler_workers"]
+        return int(value) if value is not None else None
+
+    @property
+    def tune_budget(self):
+        """get tune_budget property."""
+        value = self.config["tune_budget"]
+        return int(value) if value is not None else None
+
+    @property
+    def tune_early_stopping(self):
+        """get tune_early_stopping property."""
+        value = self.config["tune_early_stopping"]
+        return int(value) if value is not None else None
+
+    @property
+    def results_db(self):
+        """get results_db property."""
+        value = self.config["results_db"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def incremental_report(self):
+        """get incremental_report property."""
+        value = self.config["incremental_report"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def incremental_report_file(self):
+        return Path(self.dir) / "report.ndjson"
+
+    @property
+    def results_timestamp(self):
+        """Start time of the session as stored in the results database."""
+        return self.opened_at.isoformat(timespec="seconds") if self.opened_at else None
+
+    def compact_report(self, results_dir=None, results_db=False):
+        """Turn the incremental report of an interrupted session into the usual report file(s).
+
+        If results_db is set, the rows are also added to the results database unless the session already wrote them.
+
+        Returns the report or None if the session does not have an incremental report.
+        """
+        journal = IncrementalReport(self.incremental_report_file)
+        if not journal.exists:
+            return None
+        report = journal.compact(Path(self.dir) / f"report.{self.report_fmt}")
+        if results_dir is not None:
+            report.export(Path(results_dir) / f"{self.label}.{self.report_fmt}")
+            if results_db:
+                store = get_results_store(results_dir)
+                if store.has_session(self.label, self.idx):
+                    logger.info("%sRows are already in the results database", self.prefix)
+                else:
+                    timestamp = self.results_timestamp or journal.load_timestamp()
+                    store.add_report(report, label=self.label, timestamp=timestamp)
+        return report
+
+    @property
+    def memory_budget(self):
+        """get memory_budget property (in bytes)."""
+        value = self.config["memory_budget"]
+        return int(float(value) * 1024 * 1024) if value is not None else None
+
+    def enforce_memory_budget(self, run):
+        """Spill the artifacts of a run to its directory if the artifacts of the session exceed the memory budget."""
+        budget = self.memory_budget
+        if budget is None:
+            return
+        with self.memory_lock:
+            self.memory_usage[run.idx] = run.get_artifact_memory()
+            total = sum(self.memory_usage.values())
+            if total <= budget:
+                return
+            logger.debug("%s Artifacts use %d of %d bytes, spilling run %s", self.prefix, total, budget, run.idx)
+            self.memory_usage[run.idx] = 0
+        run.spill_artifacts()
+        with self.memory_lock:
+            self.memory_usage[run.idx] = run.get_artifact_memory()
+
     def create_run(self, *args, **kwargs):
         """Factory method to create a run and add it to this session."""
         idx = len(self.runs)
@@ -121,21 +328,53 @@ class Session:
         merged.add(reports)
         return merged
 
-    def enumerate_runs(self):
-        """Update run indices."""
+    def enumerate_runs(self, context=None, checkpoint=False):
+        """Update run indices.
+
+        If checkpoint is set, an initial checkpoint is written for every new run, so that runs which were not started
+        yet can be resumed as well.
+        """
         # Find start index
         max_idx = -1
         for run in self.runs:
-            if run.archived:
+            if run.archived or run.resumed:
                 max_idx = max(max_idx, run.idx)
         run_idx = max_idx + 1
         for run in self.runs:
-            if not run.archived:
+            if not run.archived and not run.resumed:
                 run.idx = run_idx
-                run.init_directory()
+                run.init_directory(context=context)
+                if checkpoint and run.checkpoint:
+                    try:
+                        run.save_checkpoint()
+                    except Exception as e:  # Only affects --resume
+                        logger.error("%s Unable to write checkpoint, the run can not be resumed: %s", run.prefix, e)
                 run_idx += 1
         self.next_run_idx = run_idx
 
+    def restore_runs(self):
+        """Rebuild the runs of an interrupted session from the checkpoints in their directories.
+
+        Runs without a (readable) checkpoint can not be resumed and are skipped.
+        """
+        runs = []
+        run_dirs = [path for path in self.runs_dir.iterdir() if path.is_dir() and path.name.isdigit()]
+        for run_dir in sorted(run_dirs, key=lambda path: int(path.name)):
+            if not (run_dir / Run.CHECKPOINT_FILE).is_file():
+                logger.warning("%sRun %s has no checkpoint and can not be resumed", self.prefix, run_dir.name)
+                continue
+            try:
+                run = Run.from_file(run_dir, session=self)
+            except Exception as e:
+                logger.warning("%sUnable to restore run %s: %s", self.prefix, run_dir.name, e)
+                continue
+            runs.append(run)
+        self.runs = runs
+        self.resumed = True
+        self.next_run_idx = max([run.idx for run in runs], default=-1) + 1
+        num_done = len([run for run in runs if run.next_stage == RunStage.DONE])
+        logger.info("%sRestored %d runs (%d already completed)", self.prefix, len(runs), num_done)
+
     def request_run_idx(self):
         """Return next free run index."""
         ret = self.next_run_idx
@@ -157,7 +396,7 @@ class Session:
 
         # TODO: Add configurable callbacks for stage/run complete
 
-        self.enumerate_runs()
+        self.enumerate_runs(context=context, checkpoint=export)
         self.report = None
         assert num_workers > 0, "num_workers can not be < 1"
         workers = []
@@ -169,9 +408,12 @@ class Session:
         num_failures = 0
         stage_failures = {}
         worker_run_idx = []
+        journal = IncrementalReport(self.incremental_report_file) if self.incremental_report else None
 
         def _init_progress(total, msg="Processing..."):
             """Helper function to initialize a progress bar for the session."""
+            from tqdm import tqdm
+
             return tqdm(
                 total=total,
                 desc=msg,
@@ -191,29 +433,76 @@ class Session:
 
         def _process(pbar, run, until, skip):
             """Helper function to invoke the run."""
-            run.process(until=until, skip=skip, export=export)
+            run.process(until=until, skip=skip, export=export, context=context)
+            self.enforce_memory_budget(run)
             if progress:
                 _update_progress(pbar)
 
+        use_processes = self.executor == "process"
+        worker_context = WorkerContext(context) if (use_processes and context is not None) else None
+        detached_session = DetachedSession(self) if use_processes else None
+
+        def _submit(executor, pbar, run, until, skip):
+            """Helper function to schedule the processing of a run using the chosen executor."""
+            if not use_processes:
+                return executor.submit(_process, pbar, run, until=until, skip=skip)
+            try:
+                data = dump_run(run)
+            except Exception as e:  # Only this run fails, i.e. if one of its components can not be pickled
+                err = RuntimeError(f"Run {run.idx} can not be sent to a worker process: {e}")
+                err.__cause__ = e
+                future = concurrent.futures.Future()
+                future.set_exception(err)
+                if progress:
+                    _update_progress(pbar)
+                return future
+            future = executor.submit(_process_run_in_worker, data, detached_session, until, skip, worker_context)
+            if progress:
+                future.add_done_callback(lambda _: _update_progress(pbar))
+            return future
+
+        def _journal(run):
+            """Helper function to append the report of a completed run to the incremental report."""
+            if journal is None:
+                return
+            try:
+                journal.append(run.get_report(), key=run.idx, timestamp=self.results_timestamp)
+            except Exception as e:  # The results are still available in memory
+                logger.warning("Failed to write the incremental report of run %s: %s", run.idx, e)
+
+        def _collect(w, run_index, last=True):
+            """Helper function to wait for a single worker and handle failures."""
+            nonlocal num_failures
+            run = self.runs[run_index]
+            result = None
+            try:
+                result = w.result()
+                if use_processes:
+                    # Update the state of the run with the one received from the worker
+                    run.__dict__.update(load_run(result, self).__dict__)
+            except Exception as e:
+                logger.exception(e)
+                logger.error("An exception was thrown by a worker during simulation")
+                run.failing = True
+            if run.failing:
+                num_failures += 1
+                failed_stage = RunStage(run.next_stage).name
+                if failed_stage in stage_failures:
+                    stage_failures[failed_stage].append(run_index)
+                else:
+                    stage_failures[failed_stage] = [run_index]
+            if last or run.failing:
+                _journal(run)
+            return result
+
         def _join_workers(workers):
             """Helper function to collect all worker threads."""
-            nonlocal num_failures
-            results = []
-            for i, w in enumerate(workers):
-                try:
-                    results.append(w.result())
-                except Exception as e:
-                    logger.exception(e)
-                    logger.error("An exception was thrown by a worker during simulation")
-                run_index = worker_run_idx[i]
-                run = self.runs[run_index]
-                if run.failing:
-                    num_failures += 1
-                    failed_stage = RunStage(run.next_stage).name
-                    if failed_stage in stage_failures:
-                        stage_failures[failed_stage].append(run_index)
-                    else:
-                        stage_failures[failed_stage] = [run_index]
+            results = [None] * len(workers)
+            indices = {w: i for i, w in enumerate(workers)}
+            # Collect the runs in the order they complete, so that their reports are written as early as possible
+            for w in concurrent.futures.as_completed(workers):
+                i = indices[w]
+                results[i] = _collect(w, worker_run_idx[i])
             if progress:
                 _close_progress(pbar)
             return results
@@ -230,44 +519,84 @@ class Session:
         used_stages = _used_stages(self.runs, until)
         skipped_stages = [stage for stage in RunStage if stage not in used_stages]
 
-        with concurrent.futures.ThreadPoolExecutor(num_workers) as executor:
+        if use_processes:
+            executor_cls = concurrent.futures.ProcessPoolExecutor
+        else:
+            executor_cls = concurrent.futures.ThreadPoolExecutor
+
+        def _next_stage(run, after=None):
+            """Determine the next stage to be processed for a run."""
+            for stage in used_stages:
+                if after is not None and stage <= after:
+                    continue
+                if run.has_stage(stage) and not run.completed[stage]:
+                    return stage
+            return None
+
+        def _process_pipelined(executor):
+            """Process the stages of all runs without waiting for the other runs to complete a stage.
+
+            A run moves on to the next stage as soon as its previous stage is completed and the scheduler admits
+            the job based on the per-stage limits and the global CPU budget.
+            """
+            nonlocal pbar
+            scheduler = StageScheduler(stage_limits=self.stage_limits, cpu_budget=self.cpu_budget)
+            next_stages = {i: _next_stage(run) for i, run in enumerate(self.runs) if not run.failing}
+            ready = [i for i, stage in next_stages.items() if stage is not None]
+            if progress:
+                total = sum(
+                    len([stage for stage in used_stages if run.has_stage(stage) and not run.completed[stage]])
+                    for i, run in enumerate(self.runs)
+                    if i in ready
+                )
+                pbar = _init_progress(total, msg="Processing stages")
+            else:
+                logger.info("%s Processing stages", self.prefix)
+            in_flight = {}
+            while len(ready) > 0 or len(in_flight) > 0:
+                # Prefer runs in later stages to complete them as early as possible
+                for i in sorted(ready, key=lambda i: (-next_stages[i], i)):
+                    if len(in_flight) >= num_workers:
+                        break
+                    run = self.runs[i]
+                    stage = next_stages[i]
+                    cost = scheduler.get_cost(run, stage)
+                    if not scheduler.can_admit(stage, cost) and len(in_flight) > 0:
+                        continue
+                    scheduler.acquire(stage, cost)
+                    ready.remove(i)
+                    future = _submit(executor, pbar, run, until=stage, skip=skipped_stages)
+                    in_flight[future] = (i, stage, cost)
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    i, stage, cost = in_flight.pop(future)
+                    scheduler.release(stage, cost)
+                    run = self.runs[i]
+                    _collect(future, i, last=_next_stage(run, after=stage) is None)
+                    if run.failing:
+                        if progress:
+                            remaining = [s for s in used_stages if s > stage and run.has_stage(s)]
+                            _update_progress(pbar, len(remaining))
+                        continue
+                    next_stages[i] = _next_stage(run, after=stage)
+                    if next_stages[i] is not None:
+                        ready.append(i)
+            if progress:
+                _close_progress(pbar)
+
+        if self.tune_scheduler and RunStage.TUNE in used_stages:
+            if use_processes:
+                logger.warning("The tuning scheduler is not supported together with session.executor=process")
+            else:
+                self.tuning_scheduler = TuningScheduler(
+                    num_workers=self.tune_scheduler_workers or num_workers,
+                    budget=self.tune_budget,
+                    early_stopping=self.tune_early_stopping,
+                )
+
+        with executor_cls(num_workers) as executor, self.tuning_scheduler or contextlib.nullcontext():
             if per_stage:
-                if progress:
-                    pbar2 = _init_progress(len(used_stages), msg="Processing stages")
-                for stage in used_stages:
-                    run_stage = RunStage(stage).name
-                    if progress:
-                        pbar = _init_progress(len(self.runs), msg=f"Processing stage {run_stage}")
-                    else:
-                        logger.info("%s Processing stage %s", self.prefix, run_stage)
-                    for i, run in enumerate(self.runs):
-                        if i == 0:
-                            total_threads = min(len(self.runs), num_workers)
-                            cpu_count = multiprocessing.cpu_count()
-                            if (stage == RunStage.COMPILE) and run.compile_platform:
-                                total_threads *= run.compile_platform.num_threads
-                            if total_threads > 2 * cpu_count:
-                                if pbar2:
-                                    print()
-                                logger.warning(
-                                    "The chosen configuration leads to a maximum of %d threads being"
-                                    + " processed which heavily exceeds the available CPU resources (%d)."
-                                    + " It is recommended to lower the value of 'mlif.num_threads'!",
-                                    total_threads,
-                                    cpu_count,
-                                )
-                        if run.failing:
-                            logger.warning("Skiping stage '%s' for failed run", run_stage)
-                        else:
-                            worker_run_idx.append(i)
-                            workers.append(executor.submit(_process, pbar, run, until=stage, skip=skipped_stages))
-                    _join_workers(workers)
-                    workers = []
-                    worker_run_idx = []
-                    if progress:
-                        _update_progress(pbar2)
-                if progress:
-                    _close_progress(pbar2)
+                _process_pipelined(executor)
             else:
                 if progress:
                     pbar = _init_progress(len(self.runs), msg="Processing all runs")
@@ -296,8 +625,13 @@ class Session:
                                 cpu_count,
                             )
                     worker_run_idx.append(i)
-                    workers.append(executor.submit(_process, pbar, run, until=until, skip=skipped_stages))
+                    workers.append(_submit(executor, pbar, run, until=until, skip=skipped_stages))
                 _join_workers(workers)
+        if self.tuning_scheduler is not None:
+            logger.info("Used %d tuning trials", self.tuning_scheduler.used_trials)
+            if self.tuning_scheduler.num_skipped > 0:
+                logger.warning("Skipped %d tuning tasks due to the tuning budget", self.tuning_scheduler.num_skipped)
+            self.tuning_scheduler = None
         if num_failures == 0:
             logger.info("All runs completed successfuly!")
         elif num_failures == num_runs:
@@ -307,7 +641,7 @@ class Session:
             logger.warning("%d out or %d runs completed successfully!", num_success, num_runs)
             summary = "\n".join(
                 [
-                    f"\t{stage}: \t{len(failed)} failed run(s): " + " ".join([str(idx) for idx in failed])
+                    f"\t{stage}: \t{len(failed)} failed run(s): " + " ".join([str(idx) for idx in sorted(failed)])
                     for stage, failed in stage_failures.items()
                     if len(failed) > 0
                 ]
@@ -315,6 +649,10 @@ class Session:
             logger.info("Summary:\n%s", summary)
 
         report = self.get_reports()
+        num_hits, num_builds = self.get_build_cache_usage(report)
+        if num_builds > 0:
+            rate = 100 * num_hits / num_builds
+            logger.info("Build cache: %d of %d build(s) reused (%.0f%%)", num_hits, num_builds, rate)
         logger.info("Postprocessing session report")
         # Warning: currently we only support one instance of the same type of postprocess,
         # also it will be applied to all rows!
@@ -336,6 +674,8 @@ class Session:
         results_dir = context.environment.paths["results"].path
         results_file = results_dir / f"{self.label}.{self.report_fmt}"
         report.export(results_file)
+        if self.results_db:
+            get_results_store(results_dir).add_report(report, label=self.label, timestamp=self.results_timestamp)
         logger.info(self.prefix + "Done processing runs")
         self.report = report
         if print_report:
@@ -343,6 +683,17 @@ class Session:
 
         return num_failures == 0
 
+    @staticmethod
+    def get_build_cache_usage(report):
+        """Count the builds of a session report which were reused from the build cache.
+
+        Returns a tuple with the number of cache hits and the number of builds.
+        """
+        if "Build Cache Hit" not in report.df.columns:
+            return 0, 0
+        hits = report.df["Build Cache Hit"].dropna()
+        return sum(1 for hit in hits if hit in [True, "True"]), len(hits)
+
     def discard(self):
         """Discard a run and remove its directory."""
         self.close()
@@ -0,0 +1,274 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Persistent store for TVM autotuning records which is shared between runs and sessions."""
+import os
+import json
+import math
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+import filelock
+
+from mlonmcu.logging import get_logger
+from mlonmcu.utils import hash_file
+
+logger = get_logger()
+
+
+def parse_record(line):
+    """Extract workload, target string and cost of a single tuning record.
+
+    Records in the AutoTVM as well as in the auto-scheduler format are supported. The cost of failed measurements
+    is infinite. Returns None for lines which are not a valid record.
+    """
+    line = line.strip()
+    if len(line) == 0:
+        return None
+    try:
+        record = json.loads(line)
+        if "input" in record and "result" in record:  # AutoTVM
+            target, task_name, args, kwargs = record["input"][:4]
+            workload = json.dumps([task_name, args, kwargs], sort_keys=True)
+            costs, error_no = record["result"][:2]
+        elif "i" in record and "r" in record:  # auto_scheduler
+            workload, target = record["i"][0][:2]
+            costs, error_no = record["r"][:2]
+        else:
+            return None
+    except (json.JSONDecodeError, TypeError, ValueError, KeyError, IndexError):
+        return None
+    cost = sum(costs) / len(costs) if error_no == 0 and len(costs) > 0 else math.inf
+    return workload, target, cost
+
+
+def pick_best(content):
+    """Keep only the fastest valid record per workload and target.
+
+    Replaces `python -m tvm.autotvm.record --mode pick` without requiring a TVM installation.
+    """
+    best = {}
+    for line in content.splitlines():
+        parsed = parse_record(line)
+        if parsed is None:
+            continue
+        workload, target, cost = parsed
+        if math.isinf(cost):
+            continue
+        key = (workload, target)
+        if key not in best or cost < best[key][0]:
+            best[key] = (cost, line.strip())
+    return "".join(line + "\n" for _, line in best.values())
+
+
+def get_model_tuning_key(model_path, target_args, mode):
+    """Identify the tuning tasks of a model which depend on the model itself, the TVM target and the tuning mode."""
+    data = {
+        "model": hash_file(model_path),
+        "target": [str(arg) for arg in target_args],
+        "mode": mode,
+    }
+    text = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class TuningRecordStore:
+    """Directory-based database of tuning records keyed by workload, target string and tuner.
+
+    All added records are appended to a log file per tuner. The file `index.json` contains the best record for
+    every key as well as the workloads (per task) which were found while tuning a model, so that already tuned
+    tasks can be skipped later on. The index is only modified while holding a file lock and replaced atomically.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.directory / "index.json"
+        self.lock = filelock.FileLock(self.directory / ".lock")
+
+    def __reduce__(self):
+        # The lock can not be pickled (i.e. for the process executor or checkpoints), use the store of the directory
+        return (get_tuning_record_store, (self.directory,))
+
+    @staticmethod
+    def get_key(workload, target, tuner):
+        text = json.dumps([workload, target, tuner])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def load(self):
+        """Read the index. An empty index is returned if it is missing or incompatible."""
+        try:
+            with open(self.index_file, "r") as handle:
+                index = json.load(handle)
+            if index.get("version") == self.VERSION:
+                return index
+            logger.warning("Ignoring tuning records index with incompatible version: %s", self.index_file)
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError:
+            logger.warning("Ignoring invalid tuning records index: %s", self.index_file)
+        return {"version": self.VERSION, "tuners": [], "records": {}, "models": {}}
+
+    def save(self, index):
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(index, handle)
+        os.replace(tmp_name, self.index_file)
+
+    def add(self, content, tuner, model=None, task=None):
+        """Add the records produced by the given tuner and update the best records.
+
+        Arguments
+        ---------
+        content : str
+            Tuning records (one per line).
+        tuner : str
+            Name of the used tuner.
+        model : str
+            Key of the tuned model (see `get_model_tuning_key`).
+        task : int
+            Index of the tuned task if only a single task of the model was tuned.
+
+        Returns
+        -------
+        int
+            The number of improved records.
+        """
+        records = self._parse(content)
+        if len(records) == 0:
+            return 0
+        improved = 0
+        with self.lock:
+            index = self.load()
+            with open(self.directory / f"{tuner}.log", "a") as handle:
+                handle.write("".join(line + "\n" for line, _, _, _ in records))
+            if tuner not in index["tuners"]:
+                index["tuners"].append(tuner)
+            for line, workload, target, cost in records:
+                if math.isinf(cost):
+                    continue
+                key = self.get_key(workload, target, tuner)
+                best = index["records"].get(key)
+                if best is None or cost < best["cost"]:
+                    index["records"][key] = {"workload": workload, "target": target, "cost": cost, "record": line}
+                    improved += 1
+            if model is not None:
+                self._update_model(index, model, records, task=task)
+            self.save(index)
+        logger.debug("Added %d tuning records (%d improved) to %s", len(records), improved, self.directory)
+        return improved
+
+    @staticmethod
+    def _parse(content):
+        records = []
+        for line in content.splitlines():
+            parsed = parse_record(line)
+            if parsed is not None:
+                records.append((line.strip(), *parsed))
+        return records
+
+    @staticmethod
+    def _get_model_entry(index, model):
+        return index["models"].setdefault(model, {"target": None, "workloads": [], "tasks": {}, "task_names": None})
+
+    def _update_model(self, index, model, records, task=None):
+        entry = self._get_model_entry(index, model)
+        entry["target"] = records[-1][2]
+        workloads = list(dict.fromkeys(workload for _, workload, _, _ in records))
+        entry["workloads"] = list(dict.fromkeys(entry["workloads"] + workloads))
+        if task is not None:
+            entry["tasks"][str(task)] = workloads
+
+    def add_model(self, model, content, task=None):
+        """Remember the workloads of (a task of) a model without adding the records themselves again."""
+        records = self._parse(content)
+        if len(records) == 0:
+            return
+        with self.lock:
+            index = self.load()
+            self._update_model(index, model, records, task=task)
+            self.save(index)
+
+    def get_model_tasks(self, model):
+        """Return the names of the tuning tasks of a model if they were stored before."""
+        entry = self.load()["models"].get(model)
+        return entry.get("task_names") if entry is not None else None
+
+    def set_model_tasks(self, model, names):
+        with self.lock:
+            index = self.load()
+            self._get_model_entry(index, model)["task_names"] = list(names)
+            self.save(index)
+
+    def _get_best(self, index, workload, target, tuner=None):
+        tuners = index["tuners"] if tuner is None else [tuner]
+        candidates = [index["records"].get(self.get_key(workload, target, tuner_)) for tuner_ in tuners]
+        candidates = [candidate for candidate in candidates if candidate is not None]
+        return min(candidates, key=lambda candidate: candidate["cost"]) if len(candidates) > 0 else None
+
+    def get_tuned_tasks(self, model, tuner=None):
+        """Return the indices of tasks of a model for which all workloads already have a valid record."""
+        index = self.load()
+        entry = index["models"].get(model)
+        if entry is None:
+            return []
+        return [
+            int(task)
+            for task, workloads in entry["tasks"].items()
+            if all(self._get_best(index, workload, entry["target"], tuner=tuner) for workload in workloads)
+        ]
+
+    def is_model_tuned(self, model, tuner=None):
+        """Check if every known workload of a model already has a valid record."""
+        index = self.load()
+        entry = index["models"].get(model)
+        if entry is None or len(entry["workloads"]) == 0:
+            return False
+        if entry.get("task_names") is not None and len(entry["tasks"]) < len(entry["task_names"]):
+            return False  # Some tasks were never tuned
+        return all(self._get_best(index, workload, entry["target"], tuner=tuner) for workload in entry["workloads"])
+
+    def get_model_records(self, model, tuner=None):
+        """Return the best known records for the workloads of a model (or None if the model was never tuned)."""
+        index = self.load()
+        entry = index["models"].get(model)
+        if entry is None:
+            return None
+        content = ""
+        for workload in entry["workloads"]:
+            best = self._get_best(index, workload, entry["target"], tuner=tuner)
+            if best is not None:
+                content += best["record"] + "\n"
+        return content
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_tuning_record_store(directory):
+    """Lookup (or create) the store instance for a given directory."""
+    directory = Path(directory)
+    with _stores_lock:
+        if directory not in _stores:
+            _stores[directory] = TuningRecordStore(directory)
+        return _stores[directory]
@@ -0,0 +1,164 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Scheduler for tuning the tasks of all runs in a session using a shared pool of workers."""
+import threading
+import concurrent.futures
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+
+def parse_tune_tasks(out):
+    """Extract the task names from the output of `tvmc tune --tasks list`."""
+    lines = out.split("\n")
+    for i, line in enumerate(lines):
+        if "Available Tasks for tuning" in line:
+            lines = lines[i + 1 :]
+            break
+    return [line.split(". ", 1)[1] for line in lines if len(line.strip()) > 0 and ". " in line]
+
+
+def parse_task_indices(value, num_tasks):
+    """Resolve a task selection such as `0,2,4-6` to a list of indices. Returns all tasks if value is empty."""
+    if value is None or (isinstance(value, str) and len(value.strip()) == 0):
+        return list(range(num_tasks))
+    if isinstance(value, int):
+        value = str(value)
+    if isinstance(value, str):
+        value = value.split(",")
+    ret = []
+    for item in value:
+        item = str(item).strip()
+        if "-" in item:
+            start, end = item.split("-", 1)
+            ret.extend(range(int(start), int(end) + 1))
+        else:
+            ret.append(int(item))
+    invalid = [idx for idx in ret if idx < 0 or idx >= num_tasks]
+    assert len(invalid) == 0, f"Invalid tuning task indices: {invalid} (Number of tasks: {num_tasks})"
+    return list(dict.fromkeys(ret))
+
+
+class TuningScheduler:
+    """Tunes single tasks on a pool of workers which is shared between all runs.
+
+    Tasks are identified by a key describing the task of a model (i.e. model, target, tuning mode, tuner and task
+    index), hence a task which is required by multiple runs of the same model is only tuned once. Identical workloads
+    of different models are not merged because the workload of a task is only known after it was tuned.
+
+    A global budget limits the total number of trials: every task reserves its trials when it is started and returns
+    the unused ones (i.e. due to early stopping) when it is done. Tasks which are started after the budget was exhausted
+    are skipped.
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of tasks to be tuned in parallel.
+    budget : int
+        Total number of trials for all tasks (None: unlimited).
+    early_stopping : int
+        Early stopping used for every task, overrides the value of the runs if not None.
+    """
+
+    def __init__(self, num_workers=1, budget=None, early_stopping=None):
+        self.num_workers = num_workers
+        self.budget = budget
+        self.early_stopping = early_stopping
+        self.used_trials = 0
+        self.num_skipped = 0
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.task_lists = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(num_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def get_task_list(self, model_key, func):
+        """List the tasks of a model only once per session.
+
+        The listing is done by the calling thread, so that it does not have to wait for a free worker.
+        """
+        with self.lock:
+            future = self.task_lists.get(model_key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self.task_lists[model_key] = future
+        if owner:
+            try:
+                future.set_result(func())
+            except Exception as err:
+                future.set_exception(err)
+        return future.result()
+
+    def reserve(self, trials):
+        with self.lock:
+            if self.budget is not None:
+                trials = max(0, min(trials, self.budget - self.used_trials))
+            self.used_trials += trials
+            return trials
+
+    def refund(self, trials):
+        with self.lock:
+            self.used_trials -= trials
+
+    def _tune(self, key, func, trials):
+        granted = self.reserve(trials)
+        if granted == 0:
+            logger.warning("Tuning budget exhausted. Skipping task: %s", key[-1])
+            with self.lock:
+                self.num_skipped += 1
+            return "", ""
+        out, records = func(granted, self.early_stopping)
+        used = len([line for line in records.splitlines() if len(line.strip()) > 0])
+        self.refund(max(0, granted - used))
+        return out, records
+
+    def submit(self, key, func, trials):
+        """Schedule the tuning of a single task.
+
+        Arguments
+        ---------
+        key : tuple
+            Identifies the task. If a task with the same key was already submitted, its future is returned.
+        func : callable
+            Called with the number of granted trials and the early stopping value. Returns stdout and new records.
+        trials : int
+            Number of trials requested by the run.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future for the tuple of stdout and records.
+        """
+        with self.lock:
+            if key in self.futures:
+                logger.debug("Reusing results of identical tuning task: %s", key[-1])
+                return self.futures[key]
+            future = self.executor.submit(self._tune, key, func, trials)
+            self.futures[key] = future
+            return future
@@ -19,7 +19,6 @@
 import os
 import shutil
 import multiprocessing
-from tqdm import tqdm
 
 from mlonmcu.logging import get_logger
 from mlonmcu.feature.type import FeatureType
@@ -27,6 +26,7 @@ from mlonmcu.feature.features import get_matching_features
 from mlonmcu.config import filter_config, str2bool
 from .tasks import get_task_factory
 from .task import TaskGraph
+from . import utils
 from mlonmcu.utils import ask_user
 
 logger = get_logger()
@@ -39,7 +39,8 @@ class Setup:
 
     DEFAULTS = {
         "print_outputs": False,
-        "num_threads": None,
+        "num_threads": None,  # Global job budget shared by all tasks (and their make -j)
+        "parallel": True,  # Process independent tasks concurrently
     }
 
     REQUIRED = []
@@ -62,6 +63,11 @@ class Setup:
         value = self.config["print_outputs"]
         return str2bool(value) if not isinstance(value, (bool, int)) else value
 
+    @property
+    def parallel(self):
+        value = self.config["parallel"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
     def clean_cache(self, interactive=True):
         assert self.context is not None
         deps_dir = self.context.environment.lookup_path("deps").path
@@ -117,6 +123,8 @@ class Setup:
 
     def setup_progress_bar(self, enabled):
         if enabled:
+            from tqdm import tqdm
+
             pbar = tqdm(
                 total=len(self.tasks_factory.registry),
                 desc="Installing dependencies",
@@ -166,11 +174,14 @@ class Setup:
         assert self.context is not None
         order = self.get_dependency_order()
         pbar = self.setup_progress_bar(progress)
-        for task in order:
-            func = self.tasks_factory.registry[task]
-            func(self.context, progress=progress, rebuild=rebuild, verbose=self.verbose, threads=self.num_threads)
-            if pbar:
-                pbar.update(1)
+        if self.parallel and self.num_threads > 1:
+            self._install_parallel(pbar, rebuild=rebuild)
+        else:
+            for task in order:
+                func = self.tasks_factory.registry[task]
+                func(self.context, progress=progress, rebuild=rebuild, verbose=self.verbose, threads=self.num_threads)
+                if pbar:
+                    pbar.update(1)
         if pbar:
             pbar.close()
         if write_cache:
@@ -180,6 +191,31 @@ class Setup:
         logger.info("Finished installing dependencies")
         return True
 
+    def _install_parallel(self, pbar, rebuild=False):
+        """Process ready tasks concurrently. Every task holds a job of the global budget while it is processed."""
+        task_graph = self._get_task_graph()
+        budget = utils.JobBudget(self.num_threads)
+
+        def process(task):
+            func = self.tasks_factory.registry[task]
+            with budget.jobs(1):
+                # Per-task progress bars would be interleaved, hence only the overall one is updated
+                func(self.context, progress=False, rebuild=rebuild, verbose=self.verbose, threads=self.num_threads)
+
+        def done(task):
+            if pbar:
+                pbar.set_description(f"Installed {task}")
+                pbar.update(1)
+            else:
+                logger.debug("Finished task: %s", task)
+
+        prev_budget = utils.get_job_budget()
+        utils.set_job_budget(budget)
+        try:
+            task_graph.execute(process, max_workers=budget.total, callback=done)
+        finally:
+            utils.set_job_budget(prev_budget)
+
     def generate_requirements(
         self,
     ):
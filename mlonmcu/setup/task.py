@@ -20,17 +20,19 @@
 
 from functools import wraps
 import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from enum import Enum
 import time
 from typing import List, Tuple
-import networkx as nx
-from networkx.drawing.nx_agraph import write_dot
-from tqdm import tqdm
 
 from mlonmcu.logging import get_logger
+from mlonmcu.utils import lazy_import
 
 logger = get_logger()
 
+nx = lazy_import("networkx")
+
 
 def get_combs(data) -> List[dict]:
     """Utility which returns combinations of the input data.
@@ -127,8 +129,57 @@ class TaskGraph:
         order = list(nx.topological_sort(graph))
         return order
 
+    def execute(self, func, max_workers=1, callback=None):
+        """Process the tasks concurrently while respecting their dependencies.
+
+        A task is submitted as soon as all tasks providing its dependencies are finished. If a task fails, no further
+        tasks are submitted and the exception is raised after the running tasks are done.
+
+        Parameters
+        ----------
+        func : callable
+            Function which is called with the name of the task to process.
+        max_workers : int
+            Maximum number of tasks which are processed at the same time.
+        callback : callable
+            Optional function which is called with the name of every finished task.
+        """
+        order = self.get_order()
+        _, edges = self.get_graph()
+        pending = {name: set() for name in order}
+        for src, dest in edges:
+            pending[dest].add(src)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            while True:
+                if error is None:
+                    # Submit in topological order for a deterministic schedule
+                    ready = [name for name in order if name in pending and len(pending[name]) == 0]
+                    for name in ready:
+                        del pending[name]
+                        running[executor.submit(func, name)] = name
+                if len(running) == 0:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        error = error if error is not None else exc
+                        continue
+                    for deps in pending.values():
+                        deps.discard(name)
+                    if callback:
+                        callback(name)
+        if error is not None:
+            raise error
+        assert len(pending) == 0, "Unable to process tasks with unresolved dependencies"
+
     def export_dot(self, path):
         """Visualize the task dependency graph."""
+        from networkx.drawing.nx_agraph import write_dot
+
         nodes, edges = self.get_graph()
         graph = nx.DiGraph(edges)
         graph.add_nodes_from(nodes)
@@ -165,6 +216,7 @@ class TaskFactory:
         self.params = {}
         self.validates = {}
         self.changed = []  # Main problem: per
+        self.lock = threading.Lock()  # Tasks may be processed in parallel
 
     def reset_changes(self):
         """Reset all pending changes."""
@@ -307,13 +359,16 @@ class TaskFactory:
                     retval = function(*args, params=params, rebuild=rebuild, **kwargs)
                     if retval:
                         keys = [key for key, provider in self.providers.items() if provider == name]
-                        for key in keys:
-                            if key not in self.changed:
-                                self.changed.append(key)
+                        with self.lock:
+                            for key in keys:
+                                if key not in self.changed:
+                                    self.changed.append(key)
                     # logger.debug("Processed task:", function.__name__)
                     return retval
 
                 if progress:
+                    from tqdm import tqdm
+
                     pbar = tqdm(
                         total=max(len(combs), 1),
                         desc="Processing",
@@ -328,7 +383,6 @@ class TaskFactory:
                         pbar.set_description(f"Processing: {name}")
                     else:
                         logger.info("Processing task: %s", name)
-                    time.sleep(0.1)
                     check = True
                     if name in self.validates:
                         check = self.validates[name](args[0], params={})
@@ -355,7 +409,6 @@ class TaskFactory:
                             pbar.set_description(f"Processing - {extended_name}")
                         else:
                             logger.info("Processing task: %s", extended_name)
-                        time.sleep(0.1)
                         start = time.time()
                         retval = process(extended_name, params=comb, rebuild=rebuild)
                         end = time.time()
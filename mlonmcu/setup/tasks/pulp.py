@@ -19,7 +19,6 @@
 """Definition of tasks used to dynamically install MLonMCU dependencies"""
 
 import os
-import pkg_resources
 from pathlib import Path
 import multiprocessing
 
@@ -129,6 +128,8 @@ def clone_pulp_freertos(
         user_vars = context.environment.vars
         experimental_install = user_vars.get("pulp_freertos.experimental_install", False)
         if experimental_install:
+            import pkg_resources
+
             patchFile = Path(
                 pkg_resources.resource_filename(
                     "mlonmcu", os.path.join("..", "resources", "patches", "pulp_freertos_support.patch")
@@ -19,7 +19,6 @@
 """Definition of tasks used to dynamically install MLonMCU dependencies"""
 
 import os
-import pkg_resources
 import venv
 import multiprocessing
 from pathlib import Path
@@ -106,6 +105,8 @@ def install_zephyr(
         # TODO: allow to limit installed toolchains
         utils.exec_getout(sdkScript, "-t", "all", "-h", print_output=False, live=verbose)
         # Apply patch to fix esp32c3 support
+        import pkg_resources
+
         patchFile = Path(
             pkg_resources.resource_filename(
                 "mlonmcu", os.path.join("..", "resources", "patches", "zephyr", "fix_esp32c3_march.patch")
@@ -17,10 +17,14 @@
 # limitations under the License.
 #
 import os
+import re
+import gzip
+import contextlib
 import signal
 import sys
 import multiprocessing
 import subprocess
+import threading
 
 # import logging
 import tarfile
@@ -30,8 +34,6 @@ import tempfile
 import urllib.request
 from pathlib import Path
 from typing import Union
-from git import Repo
-from tqdm import tqdm
 
 from mlonmcu import logging
 
@@ -101,7 +103,170 @@ def exec(*args, **kwargs):
     subprocess.run([i for i in args], **kwargs, check=True)
 
 
-def exec_getout(*args, live: bool = False, print_output: bool = True, handle_exit=None, prefix="", **kwargs) -> str:
+class ProcessTimeout(TimeoutError):
+    """Raised if a subprocess was killed because it exceeded its time limit."""
+
+    def __init__(self, cmd, timeout, output=None):
+        super().__init__(f"The process did not finish within {timeout}s and was killed (CMD: `{cmd}`)")
+        self.cmd = cmd
+        self.timeout = timeout
+        self.output = output
+
+
+def kill_process_group(process):
+    """Kill a process started with start_new_session=True including all of its children."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # Already terminated
+
+
+# Amount of process output kept in memory before it is spilled to a temporary file
+OUTPUT_SPOOL_SIZE = 2**24  # 16 MB
+
+
+class ProcessOutput:
+    """Captured output of a subprocess.
+
+    The data is kept in memory up to a given size and spilled to a temporary file afterwards, so that very large
+    outputs (i.e. instruction traces) can be processed line by line without holding them in a single string.
+    """
+
+    def __init__(self, max_size=OUTPUT_SPOOL_SIZE):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_size, mode="w+b")
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self.size += len(data)
+
+    def append(self, data):
+        """Append a string or the content of another ProcessOutput without loading it into memory."""
+        self.file.seek(0, os.SEEK_END)
+        if isinstance(data, ProcessOutput):
+            data.file.seek(0)
+            shutil.copyfileobj(data.file, self)
+        else:
+            self.write(data.encode())
+
+    @property
+    def spilled(self):
+        """Returns true if the output exceeded the in-memory limit."""
+        return self.file._rolled
+
+    def lines(self):
+        """Iterate over the decoded lines of the output."""
+        self.file.seek(0)
+        for line in self.file:
+            yield line.decode(errors="replace")
+
+    def search(self, pattern):
+        """Return the first match of a (single-line) regular expression or None."""
+        regex = re.compile(pattern)
+        for line in self.lines():
+            match = regex.search(line)
+            if match:
+                return match
+        return None
+
+    def getvalue(self) -> str:
+        self.file.seek(0)
+        return self.file.read().decode(errors="replace")
+
+    def save(self, dest):
+        """Write the output to the given file."""
+        self.file.seek(0)
+        with open(dest, "wb") as handle:
+            shutil.copyfileobj(self.file, handle)
+
+    def close(self):
+        self.file.close()
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return self.getvalue()
+
+
+def output_lines(output):
+    """Iterate over the lines of a captured output which is either a string or a ProcessOutput."""
+    if isinstance(output, ProcessOutput):
+        yield from output.lines()
+    else:
+        yield from output.splitlines(keepends=True)
+
+
+def stream_output(process, output, live=False, print_func=print, prefix="", timeout=None):
+    """Collect the (merged) stdout of a running process and wait for it to terminate.
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+        The process with stdout set to subprocess.PIPE. It has to be a session leader if a timeout is used.
+    output : ProcessOutput
+        Output buffer to be filled.
+    live : bool
+        Pass every line to the print_func as soon as it was received.
+    print_func : Callable
+        Function used to print the lines in live mode.
+    prefix : str
+        Prefix prepended to every line in live mode.
+    timeout : int
+        Kill the whole process group after the given number of seconds.
+
+    Returns
+    -------
+    exit_code : int
+        The return code of the process.
+
+    Raises
+    ------
+    ProcessTimeout
+        If the process was killed after reaching the timeout.
+    """
+    timer = None
+    expired = threading.Event()
+    if timeout:
+
+        def _expire():
+            expired.set()
+            kill_process_group(process)
+
+        timer = threading.Timer(timeout, _expire)
+        timer.daemon = True
+        timer.start()
+    try:
+        if live:
+            prefix_bytes = prefix.encode()
+            for line in process.stdout:
+                output.write(prefix_bytes + line)
+                print_func(prefix + line.decode(errors="replace").rstrip("\n"))
+        else:
+            shutil.copyfileobj(process.stdout, output)
+        process.stdout.close()
+        exit_code = process.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if expired.is_set():
+        cmd = process.args
+        if isinstance(cmd, list):
+            cmd = " ".join(map(str, cmd))
+        raise ProcessTimeout(cmd, timeout, output=output)
+    return exit_code
+
+
+def exec_getout(
+    *args,
+    live: bool = False,
+    print_output: bool = True,
+    handle_exit=None,
+    prefix="",
+    return_handle: bool = False,
+    timeout=None,
+    **kwargs,
+) -> str:
     """Execute a process with the given args and using the given kwards as Popen arguments and return the output.
 
     Parameters
@@ -112,6 +277,10 @@ def exec_getout(*args, live: bool = False, print_output: bool = True, handle_exi
         If the stdout should be updated in real time.
     print_output : bool
         Print the output at the end on non-live mode.
+    return_handle : bool
+        Return the ProcessOutput instead of a string, which avoids loading large outputs into memory.
+    timeout : int
+        Kill the process and all of its children after the given number of seconds (raises ProcessTimeout).
 
     Returns
     -------
@@ -119,51 +288,30 @@ def exec_getout(*args, live: bool = False, print_output: bool = True, handle_exi
         The text printed to the command line.
     """
     logger.debug("- Executing: " + str(args))
-    outStr = ""
-    if live:
-        process = subprocess.Popen([i for i in args], **kwargs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        try:
-            for line in process.stdout:
-                new_line = prefix + line.decode(errors="replace")
-                outStr = outStr + new_line
-                print(new_line.replace("\n", ""))
-            exit_code = None
-            while exit_code is None:
-                exit_code = process.poll()
-            if handle_exit is not None:
-                exit_code = handle_exit(exit_code)
-            assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
-                exit_code, " ".join(list(map(str, args)))
-            )
-        except KeyboardInterrupt:
-            logger.debug("Interrupted subprocess. Sending SIGINT signal...")
-            pid = process.pid
-            os.kill(pid, signal.SIGINT)
-
-    else:
-        try:
-            p = subprocess.Popen([i for i in args], **kwargs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-            outStr = p.communicate()[0].decode(errors="replace")
-            exit_code = p.poll()
-            # outStr = p.stdout.decode(errors="replace")
-            if print_output:
-                logger.debug(prefix + outStr)
-            if handle_exit is not None:
-                exit_code = handle_exit(exit_code)
-            if exit_code != 0:
-                logger.error(outStr)
-            assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
-                exit_code, " ".join(list(map(str, args)))
-            )
-        except KeyboardInterrupt:
-            logger.debug("Interrupted subprocess. Sending SIGINT signal...")
-            pid = p.pid
-            os.kill(pid, signal.SIGINT)
-        except subprocess.CalledProcessError as e:
-            outStr = e.output.decode(errors="replace")
-            logger.error(outStr)
-            raise e
-
+    output = ProcessOutput()
+    process = subprocess.Popen(
+        [i for i in args], **kwargs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=bool(timeout)
+    )
+    try:
+        exit_code = stream_output(process, output, live=live, prefix=prefix, timeout=timeout)
+        if not live and print_output:
+            logger.debug(prefix + output.getvalue())
+        if handle_exit is not None:
+            exit_code = handle_exit(exit_code)
+        if exit_code != 0 and not live:
+            logger.error(output.getvalue())
+        assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
+            exit_code, " ".join(list(map(str, args)))
+        )
+    except KeyboardInterrupt:
+        logger.debug("Interrupted subprocess. Sending SIGINT signal...")
+        pid = process.pid
+        os.kill(pid, signal.SIGINT)
+
+    if return_handle:
+        return output
+    outStr = output.getvalue()
+    output.close()
     return outStr
 
 
@@ -205,6 +353,8 @@ def clone(
     refesh : bool
         Enables switching the url/branch if the repo already exists
     """
+    from git import Repo
+
     mkdirs(dest)
 
     if is_populated(dest):
@@ -245,17 +395,88 @@ def apply(
     patch_file : Path
         Path to patch file.
     """
+    from git import Repo
 
     repo = Repo(repo_dir)
     repo.git.clean("-xdf")  # Undo all changes
     repo.git.apply(patch_file)
 
 
+class JobBudget:
+    """Global number of parallel jobs shared by concurrently processed tasks and their make/ninja invocations.
+
+    Every thread can hold a number of jobs. A thread which already holds a job (i.e. because it processes a task)
+    only takes additional jobs if they are available, so that it never blocks while holding a job.
+    """
+
+    def __init__(self, total):
+        self.total = max(int(total), 1)
+        self.available = self.total
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _take(self, num, blocking=True):
+        with self._cond:
+            if num == 0:
+                return 0
+            while blocking and self.available == 0:
+                self._cond.wait()
+            taken = min(num, self.available)
+            self.available -= taken
+            return taken
+
+    def _give(self, num):
+        if num == 0:
+            return
+        with self._cond:
+            self.available += num
+            self._cond.notify_all()
+
+    @property
+    def held(self):
+        """Number of jobs held by the current thread."""
+        return getattr(self._local, "held", 0)
+
+    @contextlib.contextmanager
+    def jobs(self, num=1):
+        """Hold up to num jobs (at least one) and return the number of usable jobs."""
+        held = self.held
+        extra = self._take(max(num - held, 0), blocking=held == 0)
+        self._local.held = held + extra
+        try:
+            yield max(held + extra, 1)
+        finally:
+            self._local.held = held
+            self._give(extra)
+
+
+_job_budget = None
+
+
+def set_job_budget(budget):
+    """Install a global job budget (or remove it by passing None)."""
+    global _job_budget
+    _job_budget = budget
+
+
+def get_job_budget():
+    return _job_budget
+
+
 def make(*args, threads=multiprocessing.cpu_count(), use_ninja=False, cwd=None, verbose=False, **kwargs):
     if cwd is None:
         raise RuntimeError("Please always pass a cwd to make()")
     if isinstance(cwd, Path):
         cwd = str(cwd.resolve())
+    budget = _job_budget
+    if budget is not None:
+        # Tasks which are processed in parallel share the available jobs
+        with budget.jobs(threads) as threads_:
+            return _make(*args, threads=threads_, use_ninja=use_ninja, cwd=cwd, **kwargs)
+    return _make(*args, threads=threads, use_ninja=use_ninja, cwd=cwd, **kwargs)
+
+
+def _make(*args, threads=1, use_ninja=False, cwd=None, **kwargs):
     # TODO: make sure that ninja is installed?
     extraArgs = []
     tool = "ninja" if use_ninja else "make"
@@ -309,6 +530,8 @@ def download(url, dest, progress=False):
         return update_to
 
     if progress:
+        from tqdm import tqdm
+
         with tqdm(unit="B", unit_scale=True, unit_divisor=1024, miniters=1, desc="Downloading File") as t:
             urllib.request.urlretrieve(url, dest, reporthook=hook(t))
     else:
@@ -320,6 +543,8 @@ def extract(archive, dest, progress=False):
 
     def handle(f):
         if progress:
+            from tqdm import tqdm
+
             members = f.getmembers()
             for m in tqdm(iterable=members, total=len(members), desc="Extracting..."):
                 f.extract(m, dest)
@@ -348,6 +573,95 @@ def copy(src, dest):
     shutil.copy(src, dest)
 
 
+# Linux ioctl for creating copy-on-write clones of files (supported by btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def reflink(src, dest):
+    """Clone a file without copying its data. Raises an OSError if the filesystem does not support this."""
+    try:
+        import fcntl
+    except ImportError as err:
+        raise OSError("Reflinks are not supported on this platform") from err
+    with open(src, "rb") as src_handle:
+        with open(dest, "wb") as dest_handle:
+            try:
+                fcntl.ioctl(dest_handle.fileno(), FICLONE, src_handle.fileno())
+            except OSError:
+                os.remove(dest)
+                raise
+    shutil.copymode(src, dest)
+
+
+def link_or_copy(src, dest):
+    """Make a file available at another location as cheaply as possible.
+
+    A reflink is preferred because modifying one of the files does not affect the other. Hardlinks are used if both
+    files are located on the same filesystem. The file is copied otherwise.
+
+    Returns
+    -------
+    str
+        The used method (reflink, hardlink or copy).
+    """
+    dest = Path(dest)
+    if dest.is_dir():
+        dest = dest / Path(src).name
+    if dest.is_file() or dest.is_symlink():
+        dest.unlink()
+    try:
+        reflink(src, dest)
+        return "reflink"
+    except OSError:
+        pass
+    try:
+        os.link(src, dest)
+        return "hardlink"
+    except OSError:
+        pass
+    shutil.copy(src, dest)
+    return "copy"
+
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def get_compression(path):
+    """Lookup the compression format of a file based on its suffix (None if uncompressed)."""
+    suffix = Path(path).suffix
+    for compression, suffix_ in COMPRESSION_SUFFIXES.items():
+        if suffix == suffix_:
+            return compression
+    return None
+
+
+def open_compressed(path, mode="rb", compression="auto", **kwargs):
+    """Open a file which is transparently (de)compressed using gzip or zstd.
+
+    The `zstandard` package is only required for zstd compressed files.
+    """
+    if compression == "auto":
+        compression = get_compression(path)
+    if compression is None:
+        return open(path, mode, **kwargs)
+    if compression == "gzip":
+        return gzip.open(path, mode, **kwargs)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as err:
+            raise RuntimeError("The python package 'zstandard' is required for zstd compression") from err
+        return zstandard.open(path, mode, **kwargs)
+    raise RuntimeError(f"Unsupported compression: {compression}")
+
+
+def compress(src, dest, compression, chunk_size=2**20):
+    """Write a (streamed) compressed copy of a file."""
+    with open(src, "rb") as src_handle:
+        with open_compressed(dest, "wb", compression=compression) as dest_handle:
+            shutil.copyfileobj(src_handle, dest_handle, chunk_size)
+
+
 def is_populated(path):
     if not isinstance(path, Path):
         path = Path(path)
@@ -19,14 +19,13 @@
 """MLonMCU Corstone300 Target definitions"""
 
 import os
-import re
 from pathlib import Path
 
 from mlonmcu.logging import get_logger
 from mlonmcu.feature.features import SUPPORTED_TVM_BACKENDS
 from mlonmcu.config import str2bool
 from mlonmcu.target import Target
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
 from .util import resolve_cpu_features
 
@@ -165,15 +164,15 @@ class Corstone300Target(Target):
         return ret
 
     def parse_stdout(self, out, handle_exit=None):
-        exit_match = re.search(r"Application exit code: (.*)\.", out)
+        exit_match = search_output(r"Application exit code: (.*)\.", out)
         if exit_match:
             exit_code = int(exit_match.group(1))
             if handle_exit is not None:
                 exit_code = handle_exit(exit_code)
             if exit_code != 0:
-                logger.error("Execution failed - " + out)
+                logger.error("Execution failed - %s", out)
                 raise RuntimeError(f"unexpected exit code: {exit_code}")
-        cpu_cycles = re.search(r"Total Cycles: (.*)", out)
+        cpu_cycles = search_output(r"Total Cycles: (.*)", out)
 
         if not cpu_cycles:
             if exit == 0:
@@ -185,12 +184,17 @@ class Corstone300Target(Target):
         return cycles
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
         if self.print_outputs:
-            out += self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
-            out += self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+            out = self.exec(
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         cycles = self.parse_stdout(out, handle_exit=handle_exit)
 
@@ -18,6 +18,7 @@
 #
 """Helper functions used by MLonMCU targets"""
 
+import re
 import subprocess
 import argparse
 from typing import List, Callable
@@ -26,10 +27,18 @@ from mlonmcu.cli.helper.parse import extract_feature_names, extract_config
 from mlonmcu.feature.type import FeatureType
 from mlonmcu.feature.features import get_available_features
 from mlonmcu.logging import get_logger
+from mlonmcu.setup.utils import ProcessOutput, ProcessTimeout, stream_output, kill_process_group
 
 logger = get_logger()
 
 
+def search_output(pattern, output):
+    """Search a single-line pattern in the output of a target without loading a ProcessOutput into memory."""
+    if isinstance(output, ProcessOutput):
+        return output.search(pattern)
+    return re.search(pattern, output)
+
+
 # TODO: merge together with mlonmcu.setup.utils.exec_getout
 def execute(
     *args: List[str],
@@ -38,6 +47,8 @@ def execute(
     print_func: Callable = print,
     handle_exit=None,
     err_func: Callable = logger.error,
+    return_handle: bool = False,
+    timeout=None,
     **kwargs,
 ) -> str:
     """Wrapper for running a program in a subprocess.
@@ -54,6 +65,10 @@ def execute(
         Function which should be used to print sysout messages.
     err_func : Callable
         Function which should be used to print errors.
+    return_handle : bool
+        Return a file-backed ProcessOutput instead of a string.
+    timeout : int
+        Kill the process and all of its children after the given number of seconds (raises ProcessTimeout).
     kwargs: dict
         Arbitrary keyword arguments passed through to the subprocess.
 
@@ -65,42 +80,37 @@ def execute(
     logger.debug("- Executing: %s", str(args))
     if ignore_output:
         assert not live
-        subprocess.run(args, **kwargs, check=True)
+        with subprocess.Popen(args, **kwargs, start_new_session=bool(timeout)) as process:
+            try:
+                exit_code = process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                kill_process_group(process)
+                process.wait()
+                raise ProcessTimeout(" ".join(map(str, args)), timeout)
+        if exit_code != 0:
+            raise subprocess.CalledProcessError(exit_code, args)
         return None
 
-    out_str = ""
-    if live:
-        with subprocess.Popen(
-            args,
-            **kwargs,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        ) as process:
-            for line in process.stdout:
-                new_line = line.decode(errors="replace")
-                out_str = out_str + new_line
-                print_func(new_line.replace("\n", ""))
-            exit_code = None
-            while exit_code is None:
-                exit_code = process.poll()
-            if handle_exit is not None:
-                exit_code = handle_exit(exit_code)
-            assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
-                exit_code, " ".join(list(map(str, args)))
-            )
-    else:
-        p = subprocess.Popen([i for i in args], **kwargs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        out_str = p.communicate()[0].decode(errors="replace")
-        exit_code = p.poll()
-        print_func(out_str)
-        if handle_exit is not None:
-            exit_code = handle_exit(exit_code)
-        if exit_code != 0:
-            err_func(out_str)
-        assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
-            exit_code, " ".join(list(map(str, args)))
-        )
+    output = ProcessOutput()
+    process = subprocess.Popen(
+        [i for i in args], **kwargs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=bool(timeout)
+    )
+    exit_code = stream_output(process, output, live=live, print_func=print_func, timeout=timeout)
+    if not live:
+        for line in output.lines():
+            print_func(line.rstrip("\n"))
+    if handle_exit is not None:
+        exit_code = handle_exit(exit_code)
+    if exit_code != 0 and not live:
+        err_func(output.getvalue())
+    assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
+        exit_code, " ".join(list(map(str, args)))
+    )
 
+    if return_handle:
+        return output
+    out_str = output.getvalue()
+    output.close()
     return out_str
 
 
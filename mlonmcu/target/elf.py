@@ -23,7 +23,6 @@
 # import sys
 import csv
 import argparse
-from elftools.elf import elffile
 
 from mlonmcu.logging import get_logger
 
@@ -120,6 +119,8 @@ def parseElf(inFile):
         ".info",
     ]
 
+    from elftools.elf import elffile
+
     with open(inFile, "rb") as f:
         e = elffile.ELFFile(f)
 
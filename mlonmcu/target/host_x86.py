@@ -72,9 +72,9 @@ class HostX86Target(Target):
                 # return execute(self.gdb_path, program, *args, **kwargs)
             else:
                 comm = f"127.0.0.1:{self.gdbserver_port}"
-                return execute(self.gdb_server_path, comm, program, *args, **kwargs)
+                return execute(self.gdb_server_path, comm, program, *args, timeout=self.timeout_sec, **kwargs)
 
-        return execute(program, *args, **kwargs)
+        return execute(program, *args, timeout=self.timeout_sec, **kwargs)
 
     def get_arch(self):
         return "x86"
@@ -19,6 +19,87 @@
 import io
 import csv
 import ast
+import math
+import statistics
+
+# Supported statistics and the prefixes of the resulting columns
+STATISTICS = {
+    "mean": "Average",
+    "median": "Median",
+    "min": "Min",
+    "max": "Max",
+    "stddev": "Stddev",
+    "ci": "CI",
+}
+
+
+def t_quantile(p, dof):
+    """Quantile of the student t distribution.
+
+    Uses scipy if available, otherwise an expansion around the normal distribution is used which is accurate for
+    more than a handful of degrees of freedom.
+    """
+    try:
+        from scipy.stats import t
+
+        return float(t.ppf(p, dof))
+    except ImportError:
+        pass
+    z = statistics.NormalDist().inv_cdf(p)
+    return (
+        z
+        + (z**3 + z) / (4 * dof)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * dof**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * dof**3)
+    )
+
+
+def summarize(values, stats, confidence=0.95):
+    """Calculate statistics for the values of multiple repetitions.
+
+    Arguments
+    ---------
+    values : list
+        Numeric samples (None values are ignored).
+    stats : list
+        Names of the statistics (see STATISTICS).
+    confidence : float
+        Confidence level of the interval for the mean.
+
+    Returns
+    -------
+    dict
+        Maps the column prefixes to the values. The confidence interval results in two columns
+        (i.e. `CI95 Low` and `CI95 High`). Statistics which can not be determined from a single sample are None.
+    """
+    values = [float(value) for value in values if value is not None]
+    ret = {}
+    if len(values) == 0:
+        return ret
+    for stat in stats:
+        assert stat in STATISTICS, f"Unsupported statistic: {stat}"
+        if stat == "mean":
+            ret[STATISTICS[stat]] = statistics.fmean(values)
+        elif stat == "median":
+            ret[STATISTICS[stat]] = statistics.median(values)
+        elif stat == "min":
+            ret[STATISTICS[stat]] = min(values)
+        elif stat == "max":
+            ret[STATISTICS[stat]] = max(values)
+        elif stat == "stddev":
+            ret[STATISTICS[stat]] = statistics.stdev(values) if len(values) > 1 else None
+        elif stat == "ci":
+            prefix = f"{STATISTICS[stat]}{round(confidence * 100):g}"
+            if len(values) > 1:
+                mean = statistics.fmean(values)
+                half = t_quantile((1 + confidence) / 2, len(values) - 1) * statistics.stdev(values)
+                half /= math.sqrt(len(values))
+                low, high = mean - half, mean + half
+            else:
+                low, high = None, None
+            ret[f"{prefix} Low"] = low
+            ret[f"{prefix} High"] = high
+    return ret
 
 
 class Metrics:
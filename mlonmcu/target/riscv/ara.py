@@ -19,15 +19,21 @@
 """MLonMCU ARA Target definitions"""
 
 import os
-import re
+import hashlib
+import multiprocessing
+import shutil
+import tempfile
 from pathlib import Path
 from tempfile import TemporaryDirectory
 import time
 
+from filelock import FileLock
+
 from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool
+from mlonmcu.utils import fingerprint_path
 from mlonmcu.feature.features import SUPPORTED_TVM_BACKENDS
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
 from .riscv import RISCVTarget
 from .util import update_extensions
@@ -49,6 +55,9 @@ class AraTarget(RISCVTarget):
         "vext_spec": 1.0,
         "embedded_vext": False,
         "elen": 64,
+        "verilator_cache": True,  # Reuse verilated testbenches with the same hardware configuration
+        "verilator_cache_dir": None,  # Defaults to <env temp>/ara_verilator
+        "verilator_threads": None,  # Used for the Verilator model and the C++ compilation (default: cpu_count)
     }
 
     REQUIRED = RISCVTarget.REQUIRED + [
@@ -59,6 +68,8 @@ class AraTarget(RISCVTarget):
     def __init__(self, name="ara", features=None, config=None):
         super().__init__(name, features=features, config=config)
         assert self.config["xlen"] == str(64), 'ARA target must has xlen equal 64, try "-c ara.xlen=64"'
+        self.tb_ara_verilator_build_dir = None
+        self.tb_ara_verilator_tempdir = None
 
     @property
     def ara_apps_dir(self):
@@ -100,6 +111,43 @@ class AraTarget(RISCVTarget):
     def elen(self):
         return int(self.config["elen"])
 
+    @property
+    def verilator_cache(self):
+        value = self.config["verilator_cache"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def verilator_cache_dir(self):
+        value = self.config["verilator_cache_dir"]
+        if value is None:
+            if self.temp_dir is not None:
+                return Path(self.temp_dir) / "ara_verilator"
+            return Path(tempfile.gettempdir()) / "mlonmcu_ara_verilator"  # Used without an environment
+        return Path(value)
+
+    @property
+    def verilator_threads(self):
+        value = self.config["verilator_threads"]
+        return int(value) if value is not None else multiprocessing.cpu_count()
+
+    def get_verilator_version(self):
+        verilator_exe = self.verilator_install_dir / "bin" / "verilator"
+        try:
+            return execute(verilator_exe, "--version", live=False, print_func=lambda *args, **kwargs: None).strip()
+        except Exception:  # Fall back to the state of the installation
+            return fingerprint_path(self.verilator_install_dir)
+
+    def get_verilator_cache_key(self):
+        """Identifier for a verilated testbench, which only depends on the hardware and the used Verilator."""
+        parts = [
+            f"nr_lanes={self.nr_lanes}",
+            f"vlen={self.vlen}",
+            f"hw={fingerprint_path(self.ara_hardware_dir)}",
+            f"verilator={self.get_verilator_version()}",
+        ]
+        digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+        return f"lanes{self.nr_lanes}_vlen{self.vlen}_{digest}"
+
     @property
     def extensions(self):
         exts = super().extensions
@@ -112,13 +160,13 @@ class AraTarget(RISCVTarget):
             variant=self.gcc_variant,
         )
 
-    def prepare_simulator(self, program, *args, cwd=os.getcwd(), **kwargs):
-        # populate the ara verilator testbench directory
-        self.tb_ara_verilator_build_dir = TemporaryDirectory()
+    def verilate(self, build_dir, *args, **kwargs):
+        """Generate the verilator testbench in the given directory."""
         env = os.environ.copy()
         env["ROOT_DIR"] = str(self.ara_hardware_dir)
-        env["veril_library"] = self.tb_ara_verilator_build_dir.name
+        env["veril_library"] = str(build_dir)
         env["veril_path"] = str(self.verilator_install_dir / "bin")
+        env["veril_threads"] = str(self.verilator_threads)
         env["nr_lanes"] = str(self.nr_lanes)
         env["vlen"] = str(self.vlen)
         env["bender_defs"] = f"--define NR_LANES={self.nr_lanes} --define VLEN={self.vlen} --define RVV_ARIANE=1"
@@ -126,6 +174,7 @@ class AraTarget(RISCVTarget):
             "make",
             "verilate",
             "-i",  # the origin Makefile will check the path of QuestaSim in line 80. This error should be ignored
+            f"-j{self.verilator_threads}",
             env=env,
             cwd=self.ara_hardware_dir,
             *args,
@@ -133,6 +182,34 @@ class AraTarget(RISCVTarget):
         )
         return compile_verilator_tb_ret
 
+    def prepare_simulator(self, program, *args, cwd=os.getcwd(), **kwargs):
+        # populate the ara verilator testbench directory
+        if not self.verilator_cache:
+            self.tb_ara_verilator_tempdir = TemporaryDirectory()
+            self.tb_ara_verilator_build_dir = Path(self.tb_ara_verilator_tempdir.name)
+            return self.verilate(self.tb_ara_verilator_build_dir, *args, **kwargs)
+        cache_dir = self.verilator_cache_dir
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        build_dir = cache_dir / self.get_verilator_cache_key()
+        ret = ""
+        # Concurrent runs with the same configuration wait for a single build
+        with FileLock(str(build_dir) + ".lock"):
+            if (build_dir / "Vara_tb_verilator").is_file():
+                logger.debug("Using cached verilator testbench: %s", build_dir)
+            else:
+                # Build in a temporary directory first to never expose incomplete testbenches
+                tmp_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix=f"{build_dir.name}_tmp"))
+                try:
+                    ret = self.verilate(tmp_dir, *args, **kwargs)
+                    if not (tmp_dir / "Vara_tb_verilator").is_file():
+                        raise RuntimeError("Verilation of the ara testbench failed")
+                    tmp_dir.rename(build_dir)
+                finally:
+                    if tmp_dir.is_dir():
+                        shutil.rmtree(tmp_dir)
+        self.tb_ara_verilator_build_dir = build_dir
+        return ret
+
     def exec(self, program, *args, cwd=os.getcwd(), **kwargs):
         """Use target to execute an executable with given arguments"""
         # run simulation
@@ -150,25 +227,28 @@ class AraTarget(RISCVTarget):
         ), "A folder containing Vara_tb_verilator should be generated by the function prepare_simulator"
         env = os.environ.copy()
         simulation_ret = execute(
-            str(Path(self.tb_ara_verilator_build_dir.name) / "Vara_tb_verilator"),
+            str(self.tb_ara_verilator_build_dir / "Vara_tb_verilator"),
             *ara_verilator_args,
             env=env,
             cwd=cwd,
             *args,
+            timeout=self.timeout_sec,
             **kwargs,
         )
-        self.tb_ara_verilator_build_dir.cleanup()
+        if self.tb_ara_verilator_tempdir is not None:
+            self.tb_ara_verilator_tempdir.cleanup()
+            self.tb_ara_verilator_tempdir = None
         return simulation_ret
 
     def parse_stdout(self, out):
-        cpu_cycles = re.search(r"Total Cycles: (.*)", out)
+        cpu_cycles = search_output(r"Total Cycles: (.*)", out)
         if not cpu_cycles:
             logger.warning("unexpected script output (cycles)")
             cycles = None
         else:
             cycles = int(float(cpu_cycles.group(1)))
 
-        cpu_instructions = re.search(r"Total Instructions: (.*)", out)
+        cpu_instructions = search_output(r"Total Instructions: (.*)", out)
         if not cpu_instructions:
             logger.warning("unexpected script output (instructions)")
             cpu_instructions = None
@@ -177,7 +257,6 @@ class AraTarget(RISCVTarget):
         return cycles, cpu_instructions
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
         if self.print_outputs:
             self.prepare_simulator(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
         else:
@@ -186,10 +265,16 @@ class AraTarget(RISCVTarget):
             )
         simulation_start = time.time()
         if self.print_outputs:
-            out += self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
-            out += self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+            out = self.exec(
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         simulation_end = time.time()
         cycles, instructions = self.parse_stdout(out)
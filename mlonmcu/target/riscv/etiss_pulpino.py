@@ -19,7 +19,6 @@
 """MLonMCU ETISS/Pulpino Target definitions"""
 
 import os
-import re
 import csv
 from pathlib import Path
 
@@ -27,7 +26,7 @@ from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool, str2list
 from mlonmcu.artifact import Artifact, ArtifactFormat
 from mlonmcu.feature.features import SUPPORTED_TVM_BACKENDS
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
 from .riscv import RISCVTarget
 from .util import update_extensions
@@ -274,46 +273,44 @@ class EtissPulpinoTarget(RISCVTarget):
         for plugin in self.plugins:
             etiss_script_args.extend(["-p", plugin])
 
-        if self.timeout_sec > 0:
-            raise NotImplementedError
-        else:
-            ret = execute(
-                Path(self.etiss_script).resolve(),
-                program,
-                *etiss_script_args,
-                *args,
-                cwd=cwd,
-                **kwargs,
-            )
+        ret = execute(
+            Path(self.etiss_script).resolve(),
+            program,
+            *etiss_script_args,
+            *args,
+            cwd=cwd,
+            timeout=self.timeout_sec,
+            **kwargs,
+        )
         return ret
 
     def parse_stdout(self, out, handle_exit=None):
-        exit_match = re.search(r"exit called with code: (.*)", out)
+        exit_match = search_output(r"exit called with code: (.*)", out)
         if exit_match:
             exit_code = int(exit_match.group(1))
             if handle_exit is not None:
                 exit_code = handle_exit(exit_code)
             if exit_code != 0:
-                logger.error("Execution failed - " + out)
+                logger.error("Execution failed - %s", out)
                 raise RuntimeError(f"unexpected exit code: {exit_code}")
         else:
             exit_code = 0
-        error_match = re.search(r"ETISS: Error: (.*)", out)
+        error_match = search_output(r"ETISS: Error: (.*)", out)
         if error_match:
             error_msg = error_match.group(1)
             raise RuntimeError(f"An ETISS Error occured during simulation: {error_msg}")
 
         if self.end_to_end_cycles:
-            cpu_cycles = re.search(r"CPU Cycles \(estimated\): (.*)", out)
+            cpu_cycles = search_output(r"CPU Cycles \(estimated\): (.*)", out)
         else:
-            cpu_cycles = re.search(r"Total Cycles: (.*)", out)
+            cpu_cycles = search_output(r"Total Cycles: (.*)", out)
         if not cpu_cycles:
             if exit_code == 0:
                 logger.warning("unexpected script output (cycles)")
             cycles = None
         else:
             cycles = int(float(cpu_cycles.group(1)))
-        mips_match = re.search(r"MIPS \(estimated\): (.*)", out)
+        mips_match = search_output(r"MIPS \(estimated\): (.*)", out)
         if not mips_match:
             if exit_code == 0:
                 raise logger.warning("unexpected script output (mips)")
@@ -324,7 +321,6 @@ class EtissPulpinoTarget(RISCVTarget):
         return cycles, mips
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
         if self.trace_memory:
             trace_file = os.path.join(directory, "dBusAccess.csv")
             if os.path.exists(trace_file):
@@ -337,10 +333,16 @@ class EtissPulpinoTarget(RISCVTarget):
             os.remove(metrics_file)
 
         if self.print_outputs:
-            out += self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
-            out += self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+            out = self.exec(
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         total_cycles, mips = self.parse_stdout(out, handle_exit=handle_exit)
 
@@ -352,14 +354,16 @@ class EtissPulpinoTarget(RISCVTarget):
             get_metrics_args.extend(["--trace", trace_file])
         get_metrics_args.extend(["--out", metrics_file])
         if self.print_outputs:
-            out += execute(self.metrics_script.resolve(), *get_metrics_args, live=True)
+            out.append(execute(self.metrics_script.resolve(), *get_metrics_args, live=True))
         else:
-            out += execute(
-                self.metrics_script.resolve(),
-                *get_metrics_args,
-                live=False,
-                cwd=directory,
-                print_func=lambda *args, **kwargs: None,
+            out.append(
+                execute(
+                    self.metrics_script.resolve(),
+                    *get_metrics_args,
+                    live=False,
+                    cwd=directory,
+                    print_func=lambda *args, **kwargs: None,
+                )
             )
 
         metrics = Metrics()
@@ -19,13 +19,13 @@
 """MLonMCU GVSOC/Pulp or Pulpissimo Target definitions"""
 
 import os
-import re
 from pathlib import Path
 
 from mlonmcu.logging import get_logger
 from mlonmcu.feature.features import SUPPORTED_TVM_BACKENDS
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
+from mlonmcu.setup.utils import ProcessOutput
 from .riscv import RISCVTarget
 from .util import update_extensions_pulp
 import shutil
@@ -134,6 +134,7 @@ class GvsocPulpTarget(RISCVTarget):
         env = os.environ.copy()
         env.update(self.gvsoc_preparation_env())
 
+        return_handle = kwargs.pop("return_handle", False)
         gvsoc_compile_retval = execute(
             "make",
             *gvsoc_compile_args,
@@ -160,19 +161,27 @@ class GvsocPulpTarget(RISCVTarget):
             env=env,
             cwd=cwd,
             *args,
+            timeout=self.timeout_sec,
+            return_handle=return_handle,
             **kwargs,
         )
+        if return_handle:
+            output = ProcessOutput()
+            output.append(gvsoc_compile_retval)
+            output.append(simulation_retval)
+            simulation_retval.close()
+            return output
         return gvsoc_compile_retval + simulation_retval
 
     def parse_stdout(self, out):
-        cpu_cycles = re.search(r"Total Cycles: (.*)", out)
+        cpu_cycles = search_output(r"Total Cycles: (.*)", out)
         if not cpu_cycles:
             logger.warning("unexpected script output (cycles)")
             cycles = None
         else:
             cycles = int(float(cpu_cycles.group(1)))
 
-        cpu_instructions = re.search(r"Total Instructions: (.*)", out)
+        cpu_instructions = search_output(r"Total Instructions: (.*)", out)
         if not cpu_instructions:
             logger.warning("unexpected script output (instructions)")
             cpu_instructions = None
@@ -181,12 +190,17 @@ class GvsocPulpTarget(RISCVTarget):
         return cycles, cpu_instructions
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
         if self.print_outputs:
-            out += self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
-            out += self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+            out = self.exec(
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         cycles, instructions = self.parse_stdout(out)
         metrics = Metrics()
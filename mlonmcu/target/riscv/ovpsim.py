@@ -19,13 +19,12 @@
 """MLonMCU OVPSim Target definitions"""
 
 import os
-import re
 from pathlib import Path
 
 from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool
 from mlonmcu.feature.features import SUPPORTED_TVM_BACKENDS
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
 from .riscv import RISCVTarget, sort_extensions_canonical
 from .util import update_extensions
@@ -221,14 +220,12 @@ class OVPSimTarget(RISCVTarget):
                 extra_args = self.extra_args
             ovpsim_args.extend(extra_args)  # I rename args to extra_args because otherwise it overwrites *args
 
-        if self.timeout_sec > 0:
-            raise NotImplementedError
-
         ret = execute(
             self.ovpsim_exe.resolve(),
             *ovpsim_args,
             *args,  # Does this work?
             cwd=cwd,
+            timeout=self.timeout_sec,
             **kwargs,
         )
         return ret
@@ -236,16 +233,16 @@ class OVPSimTarget(RISCVTarget):
     def parse_stdout(self, out):
         # cpi = 1
         if self.end_to_end_cycles:
-            cpu_cycles = re.search(r".*  Simulated instructions:(.*)", out)
+            cpu_cycles = search_output(r".*  Simulated instructions:(.*)", out)
         else:
-            cpu_cycles = re.search(r".* Total Cycles: (.*)", out)
+            cpu_cycles = search_output(r".* Total Cycles: (.*)", out)
         if not cpu_cycles:
             raise RuntimeError("unexpected script output (cycles)")
             cycles = None
         else:
             cycles = int(cpu_cycles.group(1).replace(",", ""))
         mips = None  # TODO: parse mips?
-        mips_match = re.search(r".*  Simulated MIPS:(.*)", out)
+        mips_match = search_output(r".*  Simulated MIPS:(.*)", out)
         if mips_match:
             mips_str = float(mips_match.group(1))
             if "run too short for meaningful result" not in mips:
@@ -253,12 +250,17 @@ class OVPSimTarget(RISCVTarget):
         return cycles, mips
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
         if self.print_outputs:
-            out += self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
-            out += self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+            out = self.exec(
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         cycles, mips = self.parse_stdout(out)
 
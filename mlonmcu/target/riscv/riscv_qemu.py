@@ -19,11 +19,10 @@
 
 import os
 
-import re
 
 from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
 from .riscv import RISCVTarget
 from .util import update_extensions
@@ -113,19 +112,17 @@ class RiscvQemuTarget(RISCVTarget):
         assert len(args) == 0, "Qemu does not support passing arguments."
         qemu_args = self.get_qemu_args(program)
 
-        if self.timeout_sec > 0:
-            raise NotImplementedError
-        else:
-            ret = execute(
-                self.riscv32_qemu_exe,
-                *qemu_args,
-                cwd=cwd,
-                **kwargs,
-            )
+        ret = execute(
+            self.riscv32_qemu_exe,
+            *qemu_args,
+            cwd=cwd,
+            timeout=self.timeout_sec,
+            **kwargs,
+        )
         return ret
 
     def parse_stdout(self, out, handle_exit=None):
-        cpu_cycles = re.search(r"Total Cycles: (.*)", out)
+        cpu_cycles = search_output(r"Total Cycles: (.*)", out)
         if not cpu_cycles:
             logger.warning("unexpected script output (cycles)")
             cycles = None
@@ -134,13 +131,17 @@ class RiscvQemuTarget(RISCVTarget):
         return cycles
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
-
         if self.print_outputs:
-            out += self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
-            out += self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+            out = self.exec(
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         total_cycles = self.parse_stdout(out, handle_exit=handle_exit)
 
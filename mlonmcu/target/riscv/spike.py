@@ -19,14 +19,13 @@
 """MLonMCU Spike Target definitions"""
 
 import os
-import re
 import time
 from pathlib import Path
 
 from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool
 from mlonmcu.feature.features import SUPPORTED_TVM_BACKENDS
-from mlonmcu.target.common import cli, execute
+from mlonmcu.target.common import cli, execute, search_output
 from mlonmcu.target.metrics import Metrics
 from .riscv import RISCVTarget
 from .util import update_extensions
@@ -170,9 +169,6 @@ class SpikeTarget(RISCVTarget):
         else:
             assert self.vlen == 0
 
-        if self.timeout_sec > 0:
-            raise NotImplementedError
-
         ret = execute(
             self.spike_exe.resolve(),
             *spike_args,
@@ -180,15 +176,16 @@ class SpikeTarget(RISCVTarget):
             *spikepk_args,
             program,
             *args,
+            timeout=self.timeout_sec,
             **kwargs,
         )
         return ret
 
     def parse_stdout(self, out):
         if self.end_to_end_cycles:
-            cpu_cycles = re.search(r"(\d*) cycles", out)
+            cpu_cycles = search_output(r"(\d*) cycles", out)
         else:
-            cpu_cycles = re.search(r"Total Cycles: (.*)", out)
+            cpu_cycles = search_output(r"Total Cycles: (.*)", out)
         if not cpu_cycles:
             logger.warning("unexpected script output (cycles)")
             cycles = None
@@ -198,13 +195,18 @@ class SpikeTarget(RISCVTarget):
         return cycles
 
     def get_metrics(self, elf, directory, *args, handle_exit=None):
-        out = ""
         start_time = time.time()
         if self.print_outputs:
-            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
             out = self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         # TODO: do something with out?
         end_time = time.time()
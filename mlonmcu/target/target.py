@@ -21,6 +21,7 @@
 import os
 import tempfile
 import time
+import concurrent.futures
 from pathlib import Path
 from typing import List, Tuple
 
@@ -31,12 +32,16 @@ from mlonmcu.feature.type import FeatureType
 from mlonmcu.feature.features import get_matching_features
 from mlonmcu.artifact import Artifact, ArtifactFormat
 from mlonmcu.config import str2bool
+from mlonmcu.logging import get_logger
+from mlonmcu.setup.utils import ProcessOutput
 
 
 # TODO: class TargetFactory:
 from .common import execute
 from .metrics import Metrics
 
+logger = get_logger()
+
 
 class Target:
     """Base target class
@@ -55,12 +60,16 @@ class Target:
         List of additional arguments to the inspect_program
     env : os._Environ
         Optinal map of environment variables
+    temp_dir : Path
+        Temporary directory of the MLonMCU environment (if available)
     """
 
     FEATURES = ["benchmark"]
     DEFAULTS = {
         "print_outputs": False,
         "repeat": None,
+        "repeat_workers": 1,  # Number of repetitions executed in parallel
+        "timeout_sec": 0,  # disabled
     }
 
     REQUIRED = []
@@ -81,6 +90,7 @@ class Target:
         self.inspect_program = "readelf"
         self.inspect_program_args = ["--all"]
         self.env = os.environ
+        self.temp_dir = None
         self.artifacts = []
 
     @property
@@ -92,9 +102,33 @@ class Target:
     def repeat(self):
         return self.config["repeat"]
 
+    @property
+    def repeat_workers(self):
+        return max(1, int(self.config["repeat_workers"]))
+
+    @property
+    def timeout_sec(self):
+        return int(self.config["timeout_sec"])
+
     def __repr__(self):
         return f"Target({self.name})"
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The callbacks are closures created by the features, they are recreated after unpickling
+        state["pre_callbacks"] = []
+        state["post_callbacks"] = []
+        # The process environment can not be pickled either
+        state["env"] = None if self.env is os.environ else dict(self.env)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.env is None:
+            self.env = os.environ
+        for feature in self.features:
+            feature.add_target_callbacks(self.name, self.pre_callbacks, self.post_callbacks)
+
     def process_features(self, features):
         if features is None:
             return []
@@ -118,10 +152,16 @@ class Target:
         # This should not be accurate, just a fallback which should be overwritten
         start_time = time.time()
         if self.print_outputs:
-            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit)
+            out = self.exec(elf, *args, cwd=directory, live=True, handle_exit=handle_exit, return_handle=True)
         else:
             out = self.exec(
-                elf, *args, cwd=directory, live=False, print_func=lambda *args, **kwargs: None, handle_exit=handle_exit
+                elf,
+                *args,
+                cwd=directory,
+                live=False,
+                print_func=lambda *args, **kwargs: None,
+                handle_exit=handle_exit,
+                return_handle=True,
             )
         # TODO: do something with out?
         end_time = time.time()
@@ -134,20 +174,51 @@ class Target:
 
     def generate(self, elf) -> Tuple[dict, dict]:
         artifacts = []
-        metrics = []
         total = 1 + (self.repeat if self.repeat else 0)
-        # We only save the stdout and artifacts of the last execution
-        # Callect metrics from all runs to aggregate them in a callback with high priority
-        artifacts_ = []
-        for n in range(total):
-            with tempfile.TemporaryDirectory() as temp_dir:
+        # The repetitions are independent, hence they are executed concurrently in separate working directories.
+        # We only save the stdout and artifacts of the last execution, the metrics of all runs are collected to
+        # aggregate them in a callback with high priority.
+        # The pre callbacks are invoked in order, so stateful callbacks refer to the last execution.
+        temp_dirs = []
+        jobs = []
+        try:
+            for _ in range(total):
+                temp_dir = tempfile.TemporaryDirectory()
+                temp_dirs.append(temp_dir)
                 args = []
                 for callback in self.pre_callbacks:
-                    callback(temp_dir, args)
-                metrics_, out, artifacts_ = self.get_metrics(elf, *args, temp_dir)
-            metrics.append(metrics_)
-        for callback in self.post_callbacks:
-            out = callback(out, metrics, artifacts_)
+                    callback(temp_dir.name, args)
+                jobs.append(args)
+
+            results = [None] * total
+            with concurrent.futures.ThreadPoolExecutor(min(self.repeat_workers, total)) as executor:
+                futures = {
+                    executor.submit(self.get_metrics, elf, temp_dirs[n].name, *args): n for n, args in enumerate(jobs)
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    n = futures[future]
+                    results[n] = future.result()
+                    if n < total - 1:
+                        # Only the metrics are kept, the working directory of the last execution is kept until the
+                        # callbacks have processed its files
+                        if isinstance(results[n][1], ProcessOutput):
+                            results[n][1].close()
+                        results[n] = (results[n][0], None, None)
+                        temp_dirs[n].cleanup()
+                    logger.debug("Finished repetition %d/%d of target %s", n + 1, total, self.name)
+            metrics = [result[0] for result in results]
+            _, out, artifacts_ = results[-1]
+            # The output is passed to the callbacks as a string unless it is too large to be kept in memory, in which
+            # case they receive the ProcessOutput (see mlonmcu.setup.utils.output_lines)
+            if isinstance(out, ProcessOutput) and not out.spilled:
+                text = out.getvalue()
+                out.close()
+                out = text
+            for callback in self.post_callbacks:
+                out = callback(out, metrics, artifacts_)
+        finally:
+            for temp_dir in temp_dirs:
+                temp_dir.cleanup()
         artifacts.extend(artifacts_)
         if len(metrics) > 1:
             raise RuntimeError("Collected target metrics for multiple runs. Please aggregate them in a callback!")
@@ -156,9 +227,17 @@ class Target:
         artifacts_ = {"default": artifacts}
         if not isinstance(metrics, dict):
             metrics = {"default": metrics}
-        stdout_artifact = Artifact(
-            f"{self.name}_out.log", content=out, fmt=ArtifactFormat.TEXT
-        )  # TODO: rename to tvmaot_out.log?
+        if isinstance(out, ProcessOutput):
+            # Large outputs are never loaded into memory, the exported artifact is moved to the run
+            fd, dest = tempfile.mkstemp(prefix=f"mlonmcu_{self.name}_", suffix="_out.log")
+            os.close(fd)
+            out.save(dest)
+            out.close()
+            stdout_artifact = Artifact(f"{self.name}_out.log", path=Path(dest), fmt=ArtifactFormat.TEXT, temporary=True)
+        else:
+            stdout_artifact = Artifact(
+                f"{self.name}_out.log", content=out, fmt=ArtifactFormat.TEXT
+            )  # TODO: rename to tvmaot_out.log?
         artifacts_["default"].append(stdout_artifact)
         return artifacts_, metrics
 
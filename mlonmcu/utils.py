@@ -17,6 +17,10 @@
 # limitations under the License.
 #
 import sys
+import types
+import hashlib
+import importlib
+from pathlib import Path
 
 
 def is_power_of_two(n):
@@ -47,3 +51,107 @@ def get_base_prefix_compat():
 def in_virtualenv():
     """Detects if the current python interpreter is from a virtual environment."""
     return get_base_prefix_compat() != sys.prefix
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder for a module which is only imported on the first attribute access."""
+
+    def __init__(self, name, callback=None):
+        super().__init__(name)
+        self._callback = callback
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            module = importlib.import_module(self.__name__)
+            if self._callback:
+                self._callback(module)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name, callback=None):
+    """Defer the import of a heavy module (i.e. pandas or numpy) to reduce the startup time of the CLI.
+
+    The optional callback is invoked with the actual module after it was imported.
+    """
+    return LazyModule(name, callback=callback)
+
+
+class LazyRegistry(dict):
+    """Registry where entries can be given as "module:Class" strings which are only imported when looked up."""
+
+    def _resolve(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, str):
+            module_name, attr = value.split(":")
+            value = getattr(importlib.import_module(module_name), attr)
+            super().__setitem__(key, value)
+        return value
+
+    def __getitem__(self, key):
+        return self._resolve(key)
+
+    def get(self, key, default=None):
+        return self._resolve(key) if key in self else default
+
+    def values(self):
+        return [self._resolve(key) for key in self]
+
+    def items(self):
+        return [(key, self._resolve(key)) for key in self]
+
+
+def hash_file(path, chunk_size=2**20):
+    """Return the SHA256 hexdigest of a files contents."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _find_git_head(path):
+    """Resolve the commit checked out in the git repository containing the given path (if any)."""
+    for directory in [path, *path.parents]:
+        git_dir = directory / ".git"
+        if git_dir.is_file():  # Submodules and worktrees
+            content = git_dir.read_text().strip()
+            if content.startswith("gitdir:"):
+                git_dir = (directory / content[len("gitdir:") :].strip()).resolve()
+        if git_dir.is_dir():
+            head_file = git_dir / "HEAD"
+            if not head_file.is_file():
+                return None
+            head = head_file.read_text().strip()
+            if head.startswith("ref:"):
+                ref = head[len("ref:") :].strip()
+                ref_file = git_dir / ref
+                if ref_file.is_file():
+                    return ref_file.read_text().strip()
+                packed = git_dir / "packed-refs"
+                if packed.is_file():
+                    for line in packed.read_text().splitlines():
+                        if line.endswith(" " + ref):
+                            return line.split(" ")[0]
+                return None
+            return head
+    return None
+
+
+def fingerprint_path(path):
+    """Cheap fingerprint of a dependency path (i.e. a TVM or TFLM install) used as part of a cache key.
+
+    Directories in a git repository are identified by the checked out revision, other paths by their size and
+    modification time.
+    """
+    path = Path(path)
+    if path.is_dir():
+        head = _find_git_head(path.resolve())
+        if head is not None:
+            return f"git:{head}"
+    stat = path.stat()
+    return f"stat:{stat.st_size}:{stat.st_mtime_ns}"
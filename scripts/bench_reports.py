@@ -0,0 +1,54 @@
+"""Micro-benchmark comparing the legacy and the bulk session report merging."""
+import time
+import argparse
+
+import pandas as pd
+
+from mlonmcu.report import Report
+
+
+def make_reports(num_runs):
+    reports = []
+    for i in range(num_runs):
+        report = Report()
+        pre = [{"Session": 0, "Run": i, "Model": f"model{i % 50}", "Backend": "tvmaot", "Target": "spike"}]
+        main = [{"Cycles": i * 1000, "Instructions": i * 900, "ROM code": 4096, "RAM data": 1024}]
+        post = [{"Features": [], "Config": {}, "Postprocesses": [], "Comment": "-"}]
+        report.set(pre=pre, main=main, post=post)
+        reports.append(report)
+    return reports
+
+
+def merge_legacy(reports):
+    """The previous implementation of Report.add (one pd.concat per run and part)."""
+    pre_df, main_df, post_df = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    for report in reports:
+        pre_df = pd.concat([pre_df, report.pre_df], axis=0).reset_index(drop=True)
+        main_df = pd.concat([main_df, report.main_df], axis=0).reset_index(drop=True)
+        post_df = pd.concat([post_df, report.post_df], axis=0).reset_index(drop=True)
+    return pd.concat([pre_df, main_df, post_df], axis=1)
+
+
+def merge_bulk(reports):
+    merged = Report()
+    merged.add(reports)
+    return merged.df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session report merging")
+    parser.add_argument("--runs", type=int, default=10000, help="Number of synthetic runs (default: %(default)s)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only benchmark the new implementation")
+    args = parser.parse_args()
+
+    start = time.time()
+    df = merge_bulk(make_reports(args.runs))
+    print(f"bulk:   {time.time() - start:.3f}s ({len(df)} rows)")
+    if not args.skip_legacy:
+        start = time.time()
+        df = merge_legacy(make_reports(args.runs))
+        print(f"legacy: {time.time() - start:.3f}s ({len(df)} rows)")
+
+
+if __name__ == "__main__":
+    main()
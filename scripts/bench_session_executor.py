@@ -0,0 +1,79 @@
+"""Benchmark comparing the thread and process executors of Session.process_runs using synthetic runs."""
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.flow.backend import Backend
+from mlonmcu.models.model import Model
+from mlonmcu.session.run import RunStage
+from mlonmcu.session.session import Session
+
+
+class DummyFrontend:
+    """Frontend stub returning the model file as artifact."""
+
+    name = "dummy"
+    DEFAULTS = {}
+    config = {}
+
+    def generate_artifacts(self, model):
+        return [Artifact("model.bin", raw=bytes(range(256)) * 1024, fmt=ArtifactFormat.RAW, flags=["model"])]
+
+    def process_metadata(self, model, cfg=None):
+        pass
+
+
+class DummyFramework:
+    name = "dummy"
+    DEFAULTS = {}
+    config = {}
+
+
+class DummyBackend(Backend):
+    """Backend stub doing pure-Python work (similar to generating C arrays from binaries)."""
+
+    name = "dummy"
+
+    def load_model(self, model):
+        self.model = model
+
+    def generate(self):
+        with open(self.model, "rb") as handle:
+            data = handle.read()
+        src = ""
+        for x in data:
+            src += "0x{:02x}, ".format(x)
+        return {"default": [Artifact("model.c", content=src, fmt=ArtifactFormat.SOURCE)]}, {}
+
+
+def bench(executor, num_runs, num_workers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        paths = {"results": SimpleNamespace(path=tmpdir / "results"), "temp": SimpleNamespace(path=tmpdir)}
+        context = SimpleNamespace(environment=SimpleNamespace(paths=paths), cache=None)
+        session = Session(label="bench", dir=tmpdir / "session", config={"session.executor": executor})
+        for _ in range(num_runs):
+            run = session.create_run(config={})
+            run.add_frontends([DummyFrontend()])
+            run.add_model(Model("dummy", [tmpdir / "model.bin"]))
+            run.framework = DummyFramework()
+            run.backend = DummyBackend()
+        start = time.time()
+        assert session.process_runs(until=RunStage.BUILD, num_workers=num_workers, context=context)
+        return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session executors")
+    parser.add_argument("--runs", type=int, default=500, help="Number of synthetic runs (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=8, help="Number of workers (default: %(default)s)")
+    args = parser.parse_args()
+    for executor in ["thread", "process"]:
+        print(f"{executor}: {bench(executor, args.runs, args.workers):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,9 @@
 #
 """Unit tests for the artifact submodule."""
 
+import pickle
+
+
 from mlonmcu.artifact import Artifact, ArtifactFormat, lookup_artifacts
 
 
@@ -36,3 +39,41 @@ def test_lookup_artifacts():
     assert lookup_artifacts(artifacts, fmt=ArtifactFormat.RAW) == [third]
     assert lookup_artifacts(artifacts, flags={"test"}) == [third, fourth]
     assert lookup_artifacts(artifacts, flags={"test", "sw"}) == [third]
+
+
+def test_artifact_file_backed(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    elf = src / "generic_mlif"
+    elf.write_bytes(b"\x7fELF" + bytes(1024))
+    artifact = Artifact("generic_mlif", path=elf, fmt=ArtifactFormat.RAW)
+    assert not artifact.in_memory
+    assert artifact.memory_size == 0
+    assert artifact.raw[:4] == b"\x7fELF"
+    assert len(artifact.raw) == 1028
+    assert not artifact.in_memory  # Mapped, not read
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    artifact.export(dest)
+    assert (dest / "generic_mlif").read_bytes() == elf.read_bytes()
+    assert artifact.path == elf
+    copy = pickle.loads(pickle.dumps(artifact))
+    assert copy.raw[:4] == b"\x7fELF"
+
+
+def test_artifact_export_does_not_write_through_links(tmp_path):
+    src = tmp_path / "out.log"
+    src.write_text("original")
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    Artifact("out.log", path=src, fmt=ArtifactFormat.TEXT).export(dest)
+    Artifact("out.log", content="new", fmt=ArtifactFormat.TEXT).export(dest)
+    assert (dest / "out.log").read_text() == "new"
+    assert src.read_text() == "original"
+    artifact = Artifact("out.log", content="in memory", fmt=ArtifactFormat.TEXT)
+    assert artifact.in_memory
+    assert artifact.memory_size == 9
+    artifact.export(dest)
+    artifact.unload()
+    assert not artifact.in_memory
+    assert artifact.content == "in memory"
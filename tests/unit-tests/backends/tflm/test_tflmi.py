@@ -0,0 +1,43 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import pytest
+
+from mlonmcu.flow.tflm.backend.tflmi import TFLMICodegen
+
+
+@pytest.mark.parametrize("model_embedding", ["array", "incbin"])
+def test_tflmi_codegen_model_embedding(tmp_path, model_embedding):
+    model_file = tmp_path / "model.tflite"
+    model_file.write_bytes(bytes([0, 1, 16, 255]))
+    codegen = TFLMICodegen()
+    wrapper, header = codegen.generate_wrapper(model_file, model_embedding=model_embedding)
+    assert "model_init()" in header
+    if model_embedding == "array":
+        assert "const unsigned char g_model_data[] ALIGN(16) = { 0x00, 0x01, 0x10, 0xff,  };" in wrapper
+    else:
+        assert f'.incbin \\"{model_file.resolve()}\\"' in wrapper
+        assert 'extern "C" const unsigned char g_model_data[];' in wrapper
+        assert "0x00" not in wrapper
+
+
+def test_tflmi_codegen_model_embedding_invalid(tmp_path):
+    model_file = tmp_path / "model.tflite"
+    model_file.write_bytes(bytes([0]))
+    with pytest.raises(AssertionError):
+        TFLMICodegen().generate_wrapper(model_file, model_embedding="foo")
@@ -0,0 +1,86 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+from unittest import mock
+
+import pytest
+
+from mlonmcu.flow.tvm.backend.tvmc_server import TvmcServer, TvmcServerUnavailable
+
+DUMMY_TVMC = """
+import os
+import sys
+
+print("Stray output while importing tvmc")
+
+
+def _main(argv):
+    print("tvmc", *argv)
+    sys.stderr.write("cwd=" + os.getcwd() + "\\n")
+    if "--fail" in argv:
+        return 2
+    with open(argv[-1], "w") as handle:
+        handle.write("mlf")
+    return 0
+"""
+
+
+@pytest.fixture
+def dummy_tvm(tmp_path):
+    pkg = tmp_path / "python" / "tvm" / "driver" / "tvmc"
+    pkg.mkdir(parents=True)
+    for directory in [pkg.parent.parent, pkg.parent, pkg]:
+        (directory / "__init__.py").touch()
+    (pkg / "main.py").write_text(DUMMY_TVMC)
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(tmp_path / "python")
+    return env
+
+
+def test_tvmc_server_invoke(dummy_tvm, tmp_path):
+    server = TvmcServer(dummy_tvm, num_workers=1)
+    out_file = tmp_path / "default.tar"
+    exit_code, out = server.invoke(["compile", "model.tflite", out_file], cwd=tmp_path)
+    assert exit_code == 0
+    assert "tvmc compile model.tflite" in out
+    assert f"cwd={tmp_path}" in out
+    assert out_file.read_text() == "mlf"
+    exit_code, out = server.invoke(["compile", "--fail"])
+    assert exit_code == 2
+    assert server.num_spawned == 1  # Worker was reused
+    server.shutdown()
+    assert server.num_spawned == 0
+
+
+def test_tvmc_server_unavailable(tmp_path):
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(tmp_path)  # TVM can not be imported
+    server = TvmcServer(env, num_workers=1)
+    with pytest.raises(TvmcServerUnavailable):
+        server.invoke(["compile"])
+    with pytest.raises(TvmcServerUnavailable):
+        server.invoke(["compile"])
+
+
+def test_tvmc_server_invalid_response(tmp_path):
+    server = TvmcServer(os.environ.copy(), num_workers=1)
+    with mock.patch("mlonmcu.flow.tvm.backend.tvmc_server.WORKER_SCRIPT", tmp_path / "worker.py"):
+        (tmp_path / "worker.py").write_text("print('not json')\n")
+        with pytest.raises(TvmcServerUnavailable):
+            server.invoke(["compile"])
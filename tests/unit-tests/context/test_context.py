@@ -19,12 +19,15 @@
 from pathlib import Path
 import pytest
 from mlonmcu.context.context import MlonMcuContext
+from mlonmcu.session.run import RunStage
 
 
-def create_minimal_environment_yaml(path):
+def create_minimal_environment_yaml(path, lock_timeout=None):
     dirname = path.parent.absolute()
     with open(path, "w") as f:
         f.write(f"---\nhome: {dirname}")  # Use defaults
+        if lock_timeout is not None:
+            f.write(f"\nlocks:\n  timeout: {lock_timeout}")
 
 
 def create_invalid_environment_yaml(path):
@@ -81,6 +84,42 @@ def test_open_context(monkeypatch, fake_environment_directory: Path, fake_config
 #         assert context
 
 
+def test_context_session_index(monkeypatch, fake_environment_directory: Path, fake_config_home: Path):
+    monkeypatch.chdir(fake_environment_directory)
+    create_minimal_environment_yaml(fake_environment_directory / "environment.yml")
+    with MlonMcuContext() as context:
+        session = context.create_session(label="first")
+        session.create_run()
+        assert session.idx == 0
+    with MlonMcuContext() as context:
+        assert len(context.sessions) == 1
+        assert context.sessions[0].label == "first"
+        assert [run.idx for run in context.sessions[0].runs] == [0]
+        session = context.create_session(label="second")
+        assert session.idx == 1
+        session.close()
+        context.cleanup_sessions(keep=1, interactive=False)
+    with MlonMcuContext() as context:
+        assert [session.label for session in context.sessions] == ["second"]
+        assert context.session_idx == 1
+
+
+def test_context_resume_session(monkeypatch, fake_environment_directory: Path, fake_config_home: Path):
+    monkeypatch.chdir(fake_environment_directory)
+    create_minimal_environment_yaml(fake_environment_directory / "environment.yml")
+    with MlonMcuContext() as context:
+        session = context.create_session(label="interrupted")
+        run = session.create_run()
+        run.completed[RunStage.LOAD] = True
+        run.save_checkpoint()
+    with MlonMcuContext() as context:
+        session = context.get_session(resume=True)
+        assert session.active and session.resumed
+        assert session.idx == 0 and session.label == "interrupted"
+        assert [run.next_stage for run in session.runs] == [RunStage.DONE]
+        assert context.get_session(resume=True) is session
+
+
 def test_reuse_context(monkeypatch, fake_environment_directory: Path, fake_config_home: Path):
     monkeypatch.chdir(fake_environment_directory)
     create_minimal_environment_yaml(fake_environment_directory / "environment.yml")
@@ -110,7 +149,7 @@ def test_nest_context_read_after_read(monkeypatch, fake_environment_directory: P
 
 def test_nest_context_read_after_write(monkeypatch, fake_environment_directory: Path, fake_config_home: Path):
     monkeypatch.chdir(fake_environment_directory)
-    create_minimal_environment_yaml(fake_environment_directory / "environment.yml")
+    create_minimal_environment_yaml(fake_environment_directory / "environment.yml", lock_timeout=0)
 
     with MlonMcuContext(deps_lock="write") as context:
         assert context
@@ -121,7 +160,7 @@ def test_nest_context_read_after_write(monkeypatch, fake_environment_directory:
 
 def test_nest_context_write_after_read(monkeypatch, fake_environment_directory: Path, fake_config_home: Path):
     monkeypatch.chdir(fake_environment_directory)
-    create_minimal_environment_yaml(fake_environment_directory / "environment.yml")
+    create_minimal_environment_yaml(fake_environment_directory / "environment.yml", lock_timeout=0)
 
     with MlonMcuContext(deps_lock="write") as context:
         assert context
@@ -132,7 +171,7 @@ def test_nest_context_write_after_read(monkeypatch, fake_environment_directory:
 
 def test_nest_context_write_after_write(monkeypatch, fake_environment_directory: Path, fake_config_home: Path):
     monkeypatch.chdir(fake_environment_directory)
-    create_minimal_environment_yaml(fake_environment_directory / "environment.yml")
+    create_minimal_environment_yaml(fake_environment_directory / "environment.yml", lock_timeout=0)
 
     with MlonMcuContext(deps_lock="write") as context:
         assert context
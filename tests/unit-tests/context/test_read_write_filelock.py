@@ -16,9 +16,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import os
+import sys
+import time
+import threading
+import subprocess
 from pathlib import Path
 import pytest
-from mlonmcu.context.read_write_filelock import ReadFileLock, WriteFileLock, RWLockTimeout
+from mlonmcu.context.read_write_filelock import ReadFileLock, WriteFileLock, RWLockTimeout, HOSTNAME
 
 
 @pytest.mark.parametrize("test_input_raise_exception", [False, True])
@@ -47,7 +52,7 @@ def test_read_after_write_exception_disabled(monkeypatch, fake_environment_direc
     readlock1 = ReadFileLock(filepath)
     print("read1: " + readlock1.id)
     assert writelock1.acquire(raise_exception=False)
-    assert not readlock1.acquire(raise_exception=False)
+    assert not readlock1.acquire(raise_exception=False, timeout=0)
 
     writelock1.release()
 
@@ -63,7 +68,7 @@ def test_read_after_write_exception_enabled(monkeypatch, fake_environment_direct
 
     assert writelock1.acquire()
     with pytest.raises(RWLockTimeout, match=r".*The lock.*could\ not\ be\ acquired\..*"):
-        readlock1.acquire()
+        readlock1.acquire(timeout=0)
 
     writelock1.release()
 
@@ -77,7 +82,7 @@ def test_write_after_read_exception_disabled(monkeypatch, fake_environment_direc
     writelock1 = WriteFileLock(filepath)
     print("write1: " + writelock1.id)
     assert readlock1.acquire(raise_exception=False)
-    assert not writelock1.acquire(raise_exception=False)
+    assert not writelock1.acquire(raise_exception=False, timeout=0)
 
     readlock1.release()
 
@@ -93,7 +98,7 @@ def test_write_after_read_exception_enabled(monkeypatch, fake_environment_direct
 
     assert readlock1.acquire()
     with pytest.raises(RWLockTimeout, match=r".*The lock.*could\ not\ be\ acquired\..*"):
-        writelock1.acquire()
+        writelock1.acquire(timeout=0)
 
     readlock1.release()
 
@@ -107,7 +112,7 @@ def test_write_after_write_exception_disabled(monkeypatch, fake_environment_dire
     writelock2 = WriteFileLock(filepath)
     print("write1: " + writelock1.id)
     assert writelock1.acquire(raise_exception=False)
-    assert not writelock2.acquire(raise_exception=False)
+    assert not writelock2.acquire(raise_exception=False, timeout=0)
 
     writelock1.release()
 
@@ -123,6 +128,81 @@ def test_write_after_write_exception_enabled(monkeypatch, fake_environment_direc
 
     assert writelock1.acquire()
     with pytest.raises(RWLockTimeout, match=r".*The lock.*could\ not\ be\ acquired\..*"):
-        writelock2.acquire()
+        writelock2.acquire(timeout=0)
+
+    writelock1.release()
+
+
+def test_write_waits_for_read(monkeypatch, fake_environment_directory: Path):
+    monkeypatch.chdir(fake_environment_directory)
+    filepath = fake_environment_directory / ".lock"
+
+    readlock1 = ReadFileLock(filepath)
+    writelock1 = WriteFileLock(filepath, poll_interval=0.01)
+    assert readlock1.acquire()
+    timer = threading.Timer(0.2, readlock1.release)
+    timer.start()
+    start = time.monotonic()
+    assert writelock1.acquire(timeout=10)
+    assert time.monotonic() - start >= 0.1
+    timer.join()
+    assert writelock1.is_locked is False
+    writelock1.release()
+
+
+def test_write_timeout(monkeypatch, fake_environment_directory: Path):
+    monkeypatch.chdir(fake_environment_directory)
+    filepath = fake_environment_directory / ".lock"
+
+    readlock1 = ReadFileLock(filepath)
+    writelock1 = WriteFileLock(filepath, timeout=0.2, poll_interval=0.01)
+    assert readlock1.acquire()
+    start = time.monotonic()
+    with pytest.raises(RWLockTimeout):
+        writelock1.acquire()
+    assert time.monotonic() - start >= 0.2
+    readlock1.release()
+    assert writelock1.acquire(timeout=0)  # the waiting marker was removed
+    writelock1.release()
+    assert len(list(writelock1.trackdir.iterdir())) == 0
+
+
+def test_waiting_write_blocks_later_read(monkeypatch, fake_environment_directory: Path):
+    monkeypatch.chdir(fake_environment_directory)
+    filepath = fake_environment_directory / ".lock"
 
+    readlock1 = ReadFileLock(filepath)
+    writelock1 = WriteFileLock(filepath)
+    readlock2 = ReadFileLock(filepath)
+    assert readlock1.acquire()
+    assert not writelock1.try_acquire()  # writer is queued now
+    assert readlock2.is_locked
+    assert not readlock2.acquire(raise_exception=False, timeout=0)
+    readlock1.release()
+    assert writelock1.try_acquire()
     writelock1.release()
+    assert readlock2.acquire(timeout=0)
+    readlock2.release()
+
+
+def test_stale_holder_is_removed(monkeypatch, fake_environment_directory: Path):
+    monkeypatch.chdir(fake_environment_directory)
+    filepath = fake_environment_directory / ".lock"
+
+    # Simulate a crashed process which still holds the write lock
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    trackdir = fake_environment_directory / ".lock_holders"
+    trackdir.mkdir()
+    stale = trackdir / f"1_write_held_{dead.pid}_abc_{HOSTNAME}"
+    stale.touch()
+    # Holders on other hosts can not be checked and are kept
+    remote = trackdir / f"2_read_held_{os.getpid()}_def_otherhost"
+    remote.touch()
+
+    readlock1 = ReadFileLock(filepath)
+    with readlock1:
+        assert readlock1.acquired
+        assert not stale.exists()
+    assert not readlock1.acquired
+    assert remote.exists()
@@ -0,0 +1,80 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from types import SimpleNamespace
+from unittest import mock
+
+from mlonmcu.context.session_index import SessionIndex
+from mlonmcu.session.session import SessionStatus
+
+
+def test_session_index_rebuild(tmp_path):
+    (tmp_path / "0" / "runs" / "0").mkdir(parents=True)
+    (tmp_path / "0" / "runs" / "1").mkdir()
+    (tmp_path / "2" / "runs").mkdir(parents=True)
+    (tmp_path / "latest").symlink_to(tmp_path / "2")
+    index = SessionIndex(tmp_path)
+    assert index.load() == {
+        0: {"label": None, "status": "unknown", "runs": [0, 1]},
+        2: {"label": None, "status": "unknown", "runs": []},
+    }
+    assert index.file.is_file()
+    assert index.last_idx == 2
+
+
+def test_session_index_update(tmp_path):
+    index = SessionIndex(tmp_path)
+    index.load()
+    assert index.last_idx == -1
+    runs = [SimpleNamespace(idx=1), SimpleNamespace(idx=0)]
+    session = SimpleNamespace(idx=3, label="foo", status=SessionStatus.CLOSED, runs=runs)
+    index.update(session)
+    index.save()
+    # Changes to the directories are not picked up once the index exists
+    (tmp_path / "5").mkdir()
+    index2 = SessionIndex(tmp_path)
+    assert index2.load() == {3: {"label": "foo", "status": "closed", "runs": [0, 1]}}
+    index2.remove([3])
+    index2.save()
+    assert SessionIndex(tmp_path).load() == {}
+
+
+def test_session_index_invalid(tmp_path):
+    (tmp_path / "1").mkdir()
+    (tmp_path / SessionIndex.FILENAME).write_text("{")
+    index = SessionIndex(tmp_path)
+    assert index.load() == {1: {"label": None, "status": "unknown", "runs": []}}
+
+
+def test_session_index_unfinished(tmp_path):
+    index = SessionIndex(tmp_path)
+    index.load()
+    index.update(SimpleNamespace(idx=0, label="done", status=SessionStatus.CLOSED, runs=[]))
+    index.update(SimpleNamespace(idx=1, label="killed", status=SessionStatus.CREATED, runs=[]))
+    index.save()
+    # The session was killed after creating its runs, hence the index was not updated
+    for sid in [0, 1]:
+        (tmp_path / str(sid) / "runs" / "0").mkdir(parents=True)
+    entries = SessionIndex(tmp_path).load()
+    assert entries[0]["runs"] == []
+    assert entries[1] == {"label": "killed", "status": "unknown", "runs": [0]}
+    # The refreshed entry was written back, hence the directories are not scanned again
+    (tmp_path / "1" / "runs" / "1").mkdir()
+    with mock.patch("mlonmcu.context.session_index.get_ids") as get_ids:
+        assert SessionIndex(tmp_path).load()[1]["runs"] == [0]
+        get_ids.assert_not_called()
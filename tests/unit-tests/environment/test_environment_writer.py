@@ -37,6 +37,7 @@ def test_create_environment_dict():
         "home": "/foo/bar",
         "logging": {"level": "DEBUG", "to_file": False, "rotate": False},
         "cleanup": {"auto": False, "keep": 100},
+        "locks": {"timeout": 60},
         "paths": {
             "foo": os.path.join(os.getcwd(), "bar"),
             "foobar": [
@@ -19,7 +19,13 @@
 import pytest
 import numpy as np
 
-from mlonmcu.models.utils import make_hex_array, fill_data_source, lookup_data_buffers, get_data_source
+from mlonmcu.models.utils import (
+    make_hex_array,
+    fill_data_source,
+    lookup_data_buffers,
+    get_data_source,
+    write_data_source,
+)
 
 
 def test_models_utils_make_hex_array_bin(tmp_path_factory):
@@ -195,3 +201,24 @@ const size_t data_size_out[] = {};
 
     # non empty
     # too complex
+
+
+@pytest.mark.parametrize("mode", ["array", "incbin"])
+def test_models_utils_write_data_source(tmp_path_factory, mode):
+    ins_dir = tmp_path_factory.mktemp("ins")
+    outs_dir = tmp_path_factory.mktemp("outs")
+    for i in range(2):
+        with open(ins_dir / f"{i}.bin", "wb") as f:
+            f.write(bytes(range(3 + i)))
+        with open(outs_dir / f"{i}.bin", "wb") as f:
+            f.write(bytes([i + 1] * 5))
+    dest = tmp_path_factory.mktemp("build") / "data.c"
+    write_data_source([ins_dir], [outs_dir], dest, mode=mode)
+    out = dest.read_text()
+    assert "const int num_data_buffers_in = 2;" in out
+    assert "const size_t data_size_out[] = {sizeof(data_buffer_out_0_0), sizeof(data_buffer_out_1_0), };" in out
+    if mode == "array":
+        assert out == get_data_source([ins_dir], [outs_dir])
+    else:
+        assert "extern const unsigned char data_buffer_in_1_0[4];" in out
+        assert f'.incbin \\"{(outs_dir / "0.bin").resolve()}\\"' in out
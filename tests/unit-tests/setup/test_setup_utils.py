@@ -33,6 +33,12 @@
 #     is_populated,
 #     download_and_extract,
 # )
+import sys
+import time
+
+import pytest
+
+from mlonmcu.setup.utils import exec_getout, ProcessOutput, ProcessTimeout, JobBudget, link_or_copy
 
 
 def test_setup_utils_makeFlags():
@@ -47,10 +53,62 @@ def test_setup_makeDirName():
 #     pass
 #
 #
-# def test_setup_exec_getout():
-#     pass
-#
-#
+@pytest.mark.parametrize("live", [False, True])
+def test_setup_exec_getout(live, capsys):
+    out = exec_getout(sys.executable, "-c", "print('foo'); print('bar')", live=live, prefix="> ")
+    if live:
+        assert out == "> foo\n> bar\n"
+        assert "> bar" in capsys.readouterr().out
+    else:
+        assert out == "foo\nbar\n"
+    with pytest.raises(AssertionError):
+        exec_getout(sys.executable, "-c", "import sys; sys.exit(1)", live=live)
+
+
+def test_setup_exec_getout_handle():
+    script = "import sys; [sys.stdout.write('x' * 99 + '\\n') for _ in range(1000)]"
+    out = exec_getout(sys.executable, "-c", script, return_handle=True)
+    assert isinstance(out, ProcessOutput)
+    assert len(out) == 100000
+    assert sum(1 for _ in out.lines()) == 1000
+
+
+@pytest.mark.parametrize("live", [False, True])
+def test_setup_exec_getout_timeout(live):
+    start = time.time()
+    # The child process keeps the pipe open, hence it has to be killed as well
+    with pytest.raises(ProcessTimeout):
+        exec_getout("bash", "-c", "sleep 30 & sleep 30", live=live, timeout=1)
+    assert time.time() - start < 10
+
+
+def test_setup_process_output_spill(tmp_path):
+    output = ProcessOutput(max_size=10)
+    output.write(b"abc\n")
+    assert not output.spilled
+    output.write(b"defghijklmno\n")
+    assert output.spilled
+    assert list(output.lines()) == ["abc\n", "defghijklmno\n"]
+    output.save(tmp_path / "out.log")
+    assert (tmp_path / "out.log").read_text() == "abc\ndefghijklmno\n"
+    output.close()
+
+
+def test_setup_process_output_search():
+    output = ProcessOutput(max_size=10)
+    output.write(b"foo\nTotal Cycles: 42\nbar\n")
+    assert output.search(r"Total Cycles: (.*)").group(1) == "42"
+    assert output.search(r"MIPS: (.*)") is None
+    other = ProcessOutput()
+    other.write(b"baz\n")
+    output.append(other)
+    output.append("qux\n")
+    assert output.getvalue() == "foo\nTotal Cycles: 42\nbar\nbaz\nqux\n"
+    assert len(output) == 33
+    output.close()
+    other.close()
+
+
 # def test_setup_python():
 #     pass
 
@@ -71,6 +129,20 @@ def test_setup_make():
     pass
 
 
+def test_setup_job_budget():
+    budget = JobBudget(4)
+    with budget.jobs(1) as jobs:
+        assert jobs == 1
+        # A thread already holding a job only takes the remaining ones without blocking
+        with budget.jobs(8) as jobs_:
+            assert jobs_ == 4
+            assert budget.available == 0
+            with budget.jobs(2) as jobs__:
+                assert jobs__ == 4
+        assert budget.available == 3
+    assert budget.available == 4
+
+
 def test_setup_cmake():
     pass
 
@@ -95,6 +167,19 @@ def test_setup_copy():
     pass
 
 
+def test_setup_link_or_copy(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"data")
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    (dest / "src.bin").write_text("old")
+    method = link_or_copy(src, dest)
+    assert method in ["reflink", "hardlink", "copy"]
+    assert (dest / "src.bin").read_bytes() == b"data"
+    if method == "hardlink":
+        assert (dest / "src.bin").stat().st_ino == src.stat().st_ino
+
+
 def test_setup_is_populated():
     pass
 
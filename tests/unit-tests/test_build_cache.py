@@ -0,0 +1,106 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Unit tests for the build cache."""
+
+import os
+from types import SimpleNamespace
+
+from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.report import Report
+from mlonmcu.session.run import Run
+from mlonmcu.session.session import Session
+from mlonmcu.target.metrics import Metrics
+from mlonmcu.session.build_cache import BuildCache, get_build_cache_key
+
+
+class DummyBackend:
+    name = "dummy"
+    cacheable = True
+
+    def __init__(self, config):
+        self.config = config
+
+    def generate_artifacts(self):
+        metrics = Metrics()
+        metrics.add("Build Stage Time [s]", 100.0, True)
+        content = metrics.to_csv(include_optional=True)
+        return {"default": [Artifact("build_metrics.csv", content=content, fmt=ArtifactFormat.TEXT, flags=["metrics"])]}
+
+
+def test_build_cache_key(tmp_path):
+    model = tmp_path / "model.tflite"
+    model.write_bytes(b"\x00\x01")
+    records = tmp_path / "records.log"
+    records.write_text("foo")
+    key = get_build_cache_key(model, DummyBackend({"opt_level": 3}))
+    assert key == get_build_cache_key(model, DummyBackend({"opt_level": 3}))
+    assert key != get_build_cache_key(model, DummyBackend({"opt_level": 2}))
+    assert key != get_build_cache_key(model, DummyBackend({"opt_level": 3}), tuning_records=records)
+    model.write_bytes(b"\x00\x02")
+    assert key != get_build_cache_key(model, DummyBackend({"opt_level": 3}))
+
+
+def test_build_cache_lookup_store(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    assert cache.lookup("foo") is None
+    artifacts = {"default": [Artifact("default.tar", raw=b"123", fmt=ArtifactFormat.MLF)]}
+    cache.store("foo", artifacts)
+    cached = cache.lookup("foo")
+    assert cached["default"][0].raw == b"123"
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_build_cache_evict(tmp_path):
+    cache = BuildCache(tmp_path / "cache", max_size=None)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.store(key, {"default": [Artifact("x", raw=bytes(1000), fmt=ArtifactFormat.RAW)]})
+        os.utime(cache.directory / f"{key}.pkl", ns=(i * 10**9, i * 10**9))
+    assert cache.lookup("a") is not None  # Most recently used now
+    size = (cache.directory / "a.pkl").stat().st_size
+    cache.max_size = 2 * size
+    cache.evict()
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") is not None
+    assert cache.lookup("c") is not None
+
+
+def test_build_cache_run_metrics(tmp_path):
+    model = tmp_path / "model.tflite"
+    model.write_bytes(b"\x00\x01")
+    context = SimpleNamespace(environment=SimpleNamespace(paths={"temp": SimpleNamespace(path=tmp_path)}))
+    rows = []
+    for _ in range(2):
+        run = Run(backend=DummyBackend({}), config={"run.build_cache": True})
+        artifacts = run.generate_build_artifacts(model, context=context)
+        rows.append(Metrics.from_csv(artifacts["default"][0].content).get_data(include_optional=True))
+    assert rows[0] == {"Build Stage Time [s]": 100.0, "Build Cache Hit": False}
+    assert rows[1]["Build Stage Time [s]"] != 100.0  # Time of the lookup instead of the original build
+    assert rows[1]["Build Cache Hit"]
+    report = Report()
+    report.set(pre=[{"Run": 0}, {"Run": 1}], main=rows, post=[{}, {}])
+    assert Session.get_build_cache_usage(report) == (1, 2)
+
+
+def test_build_cache_tflmi_incbin():
+    from mlonmcu.flow.tflm.backend.tflmi import TFLMIBackend
+
+    assert TFLMIBackend().cacheable
+    # The generated wrapper refers to the model file of the run
+    assert not TFLMIBackend(config={"tflmi.model_embedding": "incbin"}).cacheable
@@ -16,3 +16,56 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+"""Unit tests for the feature submodule."""
+import gzip
+
+import pytest
+
+from mlonmcu.artifact import ArtifactFormat
+from mlonmcu.feature.features import REGISTERED_FEATURES
+
+SPIKE_TRACE = """core   0: 0x00001000 (0x00000297) auipc   t0, 0x0
+core   0: 0x00001004 (0x02028593) addi    a1, t0, 32
+"""
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_feature_log_instrs_to_file(compress, tmp_path):
+    feature = REGISTERED_FEATURES["log_instrs"](config={"log_instrs.to_file": True, "log_instrs.compress": compress})
+    config = {}
+    feature.add_target_config("spike", config)
+    assert config["spike.extra_args"] == ["-l", "--log=spike_instrs.log"]
+    pre_callback, post_callback = feature.get_target_callbacks("spike")
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    pre_callback(work_dir, [])
+    (work_dir / "spike_instrs.log").write_text(SPIKE_TRACE)  # Written by the simulator
+    artifacts = []
+    assert post_callback("Total Cycles: 2", [], artifacts) == "Total Cycles: 2"
+    assert len(artifacts) == 1
+    artifact = artifacts[0]
+    assert artifact.name == "spike_instrs.log" + (".gz" if compress else "")
+    assert artifact.fmt == ArtifactFormat.TEXT
+    with artifact.open() as handle:
+        assert handle.read() == SPIKE_TRACE
+    src = artifact.path
+    out_dir = tmp_path / "run"
+    out_dir.mkdir()
+    artifact.export(out_dir)
+    # Temporary trace files are moved instead of being copied
+    assert artifact.path == out_dir / artifact.name
+    assert not src.is_file()
+    if compress:
+        with gzip.open(artifact.path, "rt") as handle:
+            assert handle.read() == SPIKE_TRACE
+    assert artifact.content == SPIKE_TRACE
+
+
+def test_feature_log_instrs_etiss_stdout(tmp_path):
+    feature = REGISTERED_FEATURES["log_instrs"](config={"log_instrs.to_file": True})
+    pre_callback, post_callback = feature.get_target_callbacks("etiss_pulpino")
+    pre_callback(tmp_path, [])
+    stdout = "Hello\n0x0000000000000080: jal 0 [1010]\nTotal Cycles: 1"
+    artifacts = []
+    assert post_callback(stdout, [], artifacts) == "Hello\nTotal Cycles: 1"
+    assert artifacts[0].content == "0x0000000000000080: jal 0 [1010]\n"
@@ -0,0 +1,61 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import re
+import sys
+import subprocess
+
+import pytest
+
+# Modules which must not be imported by `mlonmcu --help` to keep the startup time of the CLI low
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "tflite",
+    "elftools",
+    "git",
+    "tqdm",
+    "networkx",
+    "jinja2",
+    "pkg_resources",
+    "mlonmcu.platform.mlif",
+    "mlonmcu.platform.espidf",
+    "mlonmcu.platform.zephyr",
+    "mlonmcu.platform.tvm",
+    "mlonmcu.platform.microtvm",
+]
+MAX_IMPORT_TIME_US = 1000000  # Generous limit to avoid flaky results on slow machines
+
+
+def get_import_times(*args):
+    out = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in out.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+@pytest.mark.parametrize("args", [["-m", "mlonmcu", "--help"], ["-m", "mlonmcu", "env", "--help"]])
+def test_import_time_cli_help(args):
+    times = get_import_times(*args)
+    assert "mlonmcu.cli.main" in times
+    for name in HEAVY_MODULES:
+        assert name not in times, f"{name} should be imported lazily"
+    assert times["mlonmcu.cli.main"] < MAX_IMPORT_TIME_US
@@ -0,0 +1,43 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.session.postprocess.postprocesses import AnalyseInstructionsPostprocess
+
+SPIKE_TRACE = """core   0: 0x80000000 (0x00000513) addi a0, zero, 0
+core   0: 0x80000004 (0x00a12023) sw a0, 0(sp)
+core   0: 0x80000008 (0x00000513) addi a0, zero, 0
+core   0: 0x8000000c (0x00a12023) sw a0, 0(sp)
+core   0: 0x80000010 (0x00004108) c.lw a0, 0(a0)
+"""
+
+
+def test_postprocess_analyse_instructions(tmp_path):
+    log_file = tmp_path / "spike_instrs.log"
+    log_file.write_text(SPIKE_TRACE)
+    artifact = Artifact("spike_instrs.log", path=log_file, fmt=ArtifactFormat.TEXT, flags=("log_instrs", "spike"))
+    # Use a tiny chunk size to cover sequences crossing chunk boundaries
+    postprocess = AnalyseInstructionsPostprocess(config={"analyse_instructions.chunk_size": 10})
+    artifacts = {artifact.name: artifact for artifact in postprocess.post_run(None, [artifact])}
+    majors = artifacts["analyse_instructions_majors.csv"].content.splitlines()
+    assert majors == ["Major,Count,Probablity", "OP-IMM,2,0.400", "STORE,2,0.400", "LOAD (Compressed),1,0.200"]
+    seq2 = artifacts["analyse_instructions_seq2.csv"].content.splitlines()
+    assert seq2 == ["Sequence,Count,Probablity", "addi;sw,2,0.500", "sw;addi,1,0.250", "sw;c.lw,1,0.250"]
+    seq3 = artifacts["analyse_instructions_seq3.csv"].content.splitlines()
+    assert len(seq3) == 4
+    assert "addi;sw;addi,1,0.333" in seq3
@@ -0,0 +1,86 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Unit tests for the report module."""
+
+import pandas as pd
+
+from mlonmcu.report import Report, IncrementalReport
+
+
+def _make_report(idx, main=None):
+    report = Report()
+    report.set(pre=[{"Run": idx}], main=[main if main else {"Cycles": idx * 10}], post=[{"Comment": "-"}])
+    return report
+
+
+def test_report_set():
+    report = _make_report(0)
+    assert list(report.df.columns) == ["Run", "Cycles", "Comment"]
+    assert len(report.df) == 1
+
+
+def test_report_add():
+    merged = Report()
+    merged.add([_make_report(i) for i in range(5)])
+    merged.add(_make_report(5, main={"Cycles": 50, "Instructions": 1}))
+    df = merged.df
+    assert len(df) == 6
+    assert list(df["Run"]) == list(range(6))
+    assert list(df["Cycles"]) == [i * 10 for i in range(6)]
+    assert pd.isna(df["Instructions"][0])
+    assert df["Instructions"][5] == 1
+
+
+def test_report_add_materialized():
+    first = _make_report(0)
+    first.main_df["Extra"] = "foo"  # Forces materialization of the dataframe
+    merged = Report()
+    merged.add([first, _make_report(1)])
+    assert list(merged.df["Run"]) == [0, 1]
+    assert list(merged.main_df.index) == [0, 1]
+    assert merged.main_df["Extra"][0] == "foo"
+    assert pd.isna(merged.main_df["Extra"][1])
+    merged.post_df = merged.post_df.rename(columns={"Comment": "Note"})
+    assert "Note" in merged.df.columns
+
+
+def test_incremental_report(tmp_path):
+    journal = IncrementalReport(tmp_path / "report.ndjson")
+    assert len(journal.load().df) == 0
+    for i in [1, 0, 2]:
+        journal.append(_make_report(i), key=i)
+    journal.append(_make_report(1, main={"Cycles": 11}), key=1)  # Run was processed again
+    with open(journal.path, "a") as handle:
+        handle.write('{"key": 3, "pre": [{"Run"')  # Interrupted while writing
+    df = journal.load().df
+    assert list(df["Run"]) == [0, 1, 2]
+    assert list(df["Cycles"]) == [0, 11, 20]
+    report = journal.compact(tmp_path / "report.csv")
+    assert len(report.df) == 3
+    assert list(pd.read_csv(tmp_path / "report.csv")["Run"]) == [0, 1, 2]
+
+
+def test_incremental_report_append_truncated(tmp_path):
+    journal = IncrementalReport(tmp_path / "report.ndjson")
+    for i in range(3):
+        journal.append(_make_report(i), key=i)
+    lines = journal.path.read_text().splitlines(keepends=True)
+    journal.path.write_text(lines[0] + lines[1][:10])  # Killed while writing the entry of run 1
+    journal.append(_make_report(2), key=2)  # Resumed session
+    assert list(journal.load_entries().keys()) == [0, 2]
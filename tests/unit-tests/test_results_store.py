@@ -0,0 +1,75 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Unit tests for the results store."""
+
+import pytest
+
+from mlonmcu.report import Report
+from mlonmcu.session.results_store import ResultsStore
+
+
+def _make_report(rows):
+    report = Report()
+    pre = [
+        {"Session": 0, "Run": i, "Model": model, "Backend": backend, "Target": target}
+        for i, (model, backend, target, _, _) in enumerate(rows)
+    ]
+    main = [{"Cycles": cycles, "Note": "ok"} for _, _, _, cycles, _ in rows]
+    post = [{"Features": features, "Config": {"foo.bar": 1}} for _, _, _, _, features in rows]
+    report.set(pre=pre, main=main, post=post)
+    return report
+
+
+def test_results_store_query(tmp_path):
+    store = ResultsStore(tmp_path / "results.db")
+    report = _make_report(
+        [
+            ("aww", "tvmaot", "spike", 100, ["autotune"]),
+            ("aww", "tflmi", "spike", 300, []),
+            ("resnet", "tvmaot", "spike", 1000, ["autotune", "debug"]),
+        ]
+    )
+    assert store.add_report(report, label="nightly1", timestamp="2024-01-01T00:00:00") == 3
+    store.add_report(
+        _make_report([("aww", "tvmaot", "spike", 200, [])]), label="nightly2", timestamp="2024-02-01T00:00:00"
+    )
+    assert store.get_metric_names() == ["Cycles", "Note"]
+    assert store.has_session("nightly1", 0)
+    assert not store.has_session("nightly1", 1)
+    assert not store.has_session("nightly3", 0)
+
+    columns, rows = store.query(filters={"model": ["aww"]}, metrics=["Cycles"])
+    assert columns[-1] == "Cycles"
+    assert [row[-1] for row in rows] == [100, 300, 200]
+
+    _, rows = store.query(features=["autotune"], metrics=["Cycles", "Note"])
+    assert [(row[4], row[-2], row[-1]) for row in rows] == [("aww", 100, "ok"), ("resnet", 1000, "ok")]
+
+    _, rows = store.query(since="2024-01-15", metrics=["Cycles"])
+    assert len(rows) == 1 and rows[0][0] == "nightly2"
+
+    columns, rows = store.query(filters={"model": "aww"}, metrics=["Cycles"], group_by=["backend"], aggregate="avg")
+    assert columns == ["backend", "Runs", "Avg Cycles"]
+    assert rows == [("tflmi", 1, 300.0), ("tvmaot", 2, 150.0)]
+
+    _, rows = store.query(limit=2)
+    assert len(rows) == 2
+
+    with pytest.raises(AssertionError):
+        store.query(filters={"config": "foo"})
@@ -16,3 +16,204 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+"""Unit tests for the session submodule."""
+
+import os
+import json
+from types import SimpleNamespace
+
+from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.feature.features import Benchmark
+from mlonmcu.report import Report, IncrementalReport
+from mlonmcu.session.run import Run, RunStage
+from mlonmcu.session.session import Session
+from mlonmcu.session.results_store import get_results_store
+from mlonmcu.setup.utils import ProcessTimeout
+from mlonmcu.target.host_x86 import HostX86Target
+from mlonmcu.session.scheduler import StageScheduler
+
+
+def test_stage_scheduler_limits():
+    scheduler = StageScheduler(stage_limits={RunStage.BUILD: 1}, cpu_budget=4)
+    assert scheduler.can_admit(RunStage.BUILD, 1)
+    scheduler.acquire(RunStage.BUILD, 1)
+    assert not scheduler.can_admit(RunStage.BUILD, 1)
+    assert scheduler.can_admit(RunStage.RUN, 1)
+    scheduler.release(RunStage.BUILD, 1)
+    assert scheduler.can_admit(RunStage.BUILD, 1)
+
+
+def test_stage_scheduler_cpu_budget():
+    scheduler = StageScheduler(cpu_budget=4)
+    run = SimpleNamespace(compile_platform=SimpleNamespace(num_threads=16))
+    cost = scheduler.get_cost(run, RunStage.COMPILE)
+    assert cost == 4  # Limited by the budget
+    assert scheduler.get_cost(run, RunStage.RUN) == 1
+    scheduler.acquire(RunStage.RUN, 1)
+    assert not scheduler.can_admit(RunStage.COMPILE, cost)
+    scheduler.release(RunStage.RUN, 1)
+    assert scheduler.can_admit(RunStage.COMPILE, cost)
+    scheduler.acquire(RunStage.COMPILE, cost)
+    assert not scheduler.can_admit(RunStage.RUN, 1)
+
+
+def test_run_timeout_report():
+    run = Run()
+
+    def _load(context=None):
+        raise ProcessTimeout("sim", 1)
+
+    run.load = _load
+    run.has_stage = lambda stage: stage == RunStage.LOAD
+    run.process(until=RunStage.LOAD)
+    assert run.failing
+    assert run.timed_out
+    run.artifacts_per_stage = {RunStage.LOAD: {"default": []}}
+    report = run.get_report()
+    assert bool(report.post_df["Timeout"][0])
+
+
+def test_run_copy_shares_components():
+    feature = SimpleNamespace(name="foo", used=True)
+    run = Run(config={"foo.bar": 1})
+    run.features = [feature]
+    run.model = SimpleNamespace(name="model")
+    new = run.copy()
+    assert new.model is run.model
+    assert new.features[0] is feature
+    new.config["foo.bar"] = 2
+    new.features.append(SimpleNamespace(name="baz", used=True))
+    assert run.config["foo.bar"] == 1
+    assert len(run.features) == 1
+    assert new.dir != run.dir
+
+
+def test_run_deferred_components():
+    run = Run()
+    added = []
+
+    def _add_platform(name, context=None):
+        assert name != "broken"
+        added.append(("platform", name))
+
+    run.add_platform_by_name = _add_platform
+    run.add_backend_by_name = lambda name, context=None: added.append(("backend", name))
+    run.defer_component("platform", "broken", "mlif", optional=True)
+    run.defer_component("platform", "broken", optional=True)
+    run.defer_component("backend", "tvmaot")
+    assert run.is_pending("backend")
+    assert run.get_pending_name("platform") == "broken"
+    assert run.has_stage(RunStage.BUILD)
+    assert not run.has_stage(RunStage.COMPILE)
+    new = run.copy()
+    assert len(added) == 0
+    new.resolve_components()
+    assert added == [("platform", "mlif"), ("backend", "tvmaot")]
+    assert not new.is_pending("backend")
+    assert run.is_pending("backend")
+
+    run.defer_component("platform", "broken")
+    run.process(until=RunStage.BUILD)
+    assert run.failing
+
+
+def test_session_memory_budget(tmp_path):
+    session = Session(dir=tmp_path / "session", config={"session.memory_budget": 0.001})  # ~1kB
+    run = session.create_run()
+    small = Artifact("small.txt", content="x" * 100, fmt=ArtifactFormat.TEXT)
+    run.artifacts_per_stage[RunStage.LOAD] = {"default": [small]}
+    run.completed[RunStage.LOAD] = True
+    session.enforce_memory_budget(run)
+    assert small.in_memory
+    large = Artifact("large.bin", raw=bytes(2048), fmt=ArtifactFormat.RAW)
+    run.artifacts_per_stage[RunStage.LOAD]["default"].append(large)
+    session.enforce_memory_budget(run)
+    assert not small.in_memory
+    assert not large.in_memory
+    assert (run.dir / "large.bin").is_file()
+    assert len(large.raw) == 2048
+    assert session.memory_usage[run.idx] == 0
+
+
+def test_session_compact_report(tmp_path):
+    session = Session(idx=3, dir=tmp_path / "session")
+    assert session.compact_report() is None
+    for i in range(2):
+        report = Report()
+        report.set(pre=[{"Session": session.idx, "Run": i}], main=[{"Cycles": i}], post=[{}])
+        IncrementalReport(session.incremental_report_file).append(report, key=i, timestamp="2024-01-01T00:00:00")
+    archived = Session(idx=3, label=session.label, archived=True, dir=session.dir)
+    for _ in range(2):  # Compacting again must not duplicate the rows in the results database
+        report = archived.compact_report(results_dir=tmp_path / "results", results_db=True)
+    assert list(report.df["Run"]) == [0, 1]
+    assert (session.dir / "report.csv").is_file()
+    assert (tmp_path / "results" / f"{session.label}.csv").is_file()
+    _, rows = get_results_store(tmp_path / "results").query(since="2024-01-01", metrics=["Cycles"])
+    assert [row[-1] for row in rows] == [0, 1]
+
+
+def test_run_checkpoint(tmp_path):
+    session = Session(dir=tmp_path / "session")
+    run = session.create_run()
+    model = Artifact("model.txt", content="model", fmt=ArtifactFormat.TEXT)
+    elf = Artifact("generic_mlif", raw=b"elf", fmt=ArtifactFormat.RAW)
+    run.artifacts_per_stage[RunStage.LOAD] = {"default": [model]}
+    run.artifacts_per_stage[RunStage.COMPILE] = {"default": [elf]}
+    run.sub_parents[(RunStage.COMPILE, "default")] = (RunStage.LOAD, "default")
+    run.completed[RunStage.LOAD] = True
+    run.completed[RunStage.COMPILE] = True
+    run.save_checkpoint(stage=RunStage.LOAD)
+    assert not model.in_memory
+    assert elf.in_memory  # Only the artifacts of the given stage are exported
+    run.save_checkpoint(stage=RunStage.COMPILE)
+    assert not elf.in_memory
+    manifest = json.loads((run.dir / Run.MANIFEST_FILE).read_text())
+    assert manifest["completed"] == ["NOP", "LOAD", "COMPILE"]
+    assert manifest["sub_parents"] == [["COMPILE", "default", "LOAD", "default"]]
+    assert manifest["artifacts"]["LOAD"]["default"][0]["path"] == str(run.dir / "model.txt")
+
+    restored = Run.from_file(run.dir, session=session)
+    assert restored.resumed and restored.session is session
+    assert restored.completed[RunStage.COMPILE]
+    assert restored.artifacts_per_stage[RunStage.LOAD]["default"][0].content == "model"
+
+    # Stages are processed again if their artifacts got lost
+    (run.dir / "generic_mlif").unlink()
+    restored = Run.from_file(run.dir, session=session)
+    assert restored.completed[RunStage.LOAD]
+    assert not restored.completed[RunStage.COMPILE]
+    assert RunStage.COMPILE not in restored.artifacts_per_stage
+    assert len(restored.sub_parents) == 0
+
+
+def test_session_restore_runs(tmp_path):
+    session = Session(dir=tmp_path / "session")
+    for _ in range(3):
+        session.create_run()
+    session.enumerate_runs(checkpoint=True)  # Runs which were not started yet are checkpointed as well
+    for run in session.runs[:2]:
+        run.completed[RunStage.LOAD] = True
+        run.save_checkpoint(stage=RunStage.LOAD)
+    resumed = Session(idx=session.idx, dir=session.dir)
+    resumed.restore_runs()
+    assert resumed.resumed
+    assert [run.idx for run in resumed.runs] == [0, 1, 2]
+    assert [run.completed[RunStage.LOAD] for run in resumed.runs] == [True, True, False]
+    new_run = resumed.create_run()
+    resumed.enumerate_runs()
+    assert [run.idx for run in resumed.runs] == [0, 1, 2, 3]
+    assert new_run.dir == session.runs_dir / "3"
+
+
+def test_session_restore_runs_target_features(tmp_path):
+    session = Session(dir=tmp_path / "session")
+    run = session.create_run(features=[Benchmark()])
+    run.target = HostX86Target(features=run.features)  # The callbacks of target features are closures
+    session.enumerate_runs(checkpoint=True)
+    assert (run.dir / Run.CHECKPOINT_FILE).is_file()
+    resumed = Session(idx=session.idx, dir=session.dir)
+    resumed.restore_runs()
+    target = resumed.runs[0].target
+    assert target.features[0].name == "benchmark"
+    assert len(target.post_callbacks) == 1
+    assert target.env is os.environ
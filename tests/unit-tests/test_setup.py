@@ -16,6 +16,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import time
+import threading
+
 import pytest
 import mock
 from mlonmcu.setup.task import get_combs, TaskFactory, TaskType, TaskGraph
@@ -72,12 +75,13 @@ def test_task_registry_reset_changes():
 @pytest.mark.parametrize("rebuild", [False, True])  # TODO: actually test this
 @pytest.mark.parametrize("write_cache", [False])  # TODO: True
 @pytest.mark.parametrize("write_env", [False])  # TODO: True
-def test_setup_install_dependencies(progress, print_output, rebuild, write_cache, write_env, fake_context):
+@pytest.mark.parametrize("parallel", [False, True])
+def test_setup_install_dependencies(progress, print_output, rebuild, write_cache, write_env, parallel, fake_context):
     # example_task1_mock = mock.Mock(return_value=True)
     TestTaskFactory.registry["example_task1"] = mock.Mock(return_value=True)
     # example_task2_mock = mock.Mock(return_value=True)
     TestTaskFactory.registry["example_task2"] = mock.Mock(return_value=True)
-    config = {"print_output": print_output}
+    config = {"print_output": print_output, "setup.parallel": parallel, "setup.num_threads": 4}
     installer = Setup(config=config, context=fake_context, tasks_factory=TestTaskFactory)
     result = installer.install_dependencies(progress=progress, write_cache=write_cache, write_env=write_env, rebuild=rebuild)
     assert result
@@ -113,3 +117,43 @@ def test_task_graph():
     assert len(order) == len(nodes)
     assert order.index("NodeB") > order.index("NodeA") and order.index("NodeB") > order.index("NodeC")
     assert order.index("NodeC") > order.index("NodeA")
+
+
+def test_task_graph_execute():
+    names = ["NodeA", "NodeB", "NodeC", "NodeD"]
+    dependencies = {"NodeB": ["foo", "bar"], "NodeC": ["foo"]}
+    providers = {"foo": "NodeA", "bar": "NodeC"}
+    task_graph = TaskGraph(names, dependencies, providers)
+    lock = threading.Lock()
+    started = []
+    finished = []
+
+    def process(name):
+        with lock:
+            started.append(name)
+        time.sleep(0.01)
+        with lock:
+            finished.append(name)
+
+    task_graph.execute(process, max_workers=4)
+    assert sorted(finished) == sorted(names)
+    # Tasks only start after their dependencies are finished
+    assert finished.index("NodeA") < started.index("NodeC")
+    assert finished.index("NodeC") < started.index("NodeB")
+
+
+def test_task_graph_execute_error():
+    names = ["NodeA", "NodeB", "NodeC"]
+    dependencies = {"NodeB": ["foo"]}
+    providers = {"foo": "NodeA"}
+    task_graph = TaskGraph(names, dependencies, providers)
+    processed = []
+
+    def process(name):
+        if name == "NodeA":
+            raise RuntimeError("failed")
+        processed.append(name)
+
+    with pytest.raises(RuntimeError, match="failed"):
+        task_graph.execute(process, max_workers=2)
+    assert "NodeB" not in processed
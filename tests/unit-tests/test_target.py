@@ -16,12 +16,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import time
+import threading
+from pathlib import Path
+
 import pytest
 import mock
 
-from mlonmcu.target.common import execute, cli
+from mlonmcu.target.common import execute, cli, search_output
+from mlonmcu.setup.utils import ProcessOutput
 from mlonmcu.target.target import Target
+from mlonmcu.target.metrics import Metrics, summarize
+from mlonmcu.feature.features import REGISTERED_FEATURES
 from mlonmcu.target import EtissPulpinoTarget, HostX86Target
+from mlonmcu.target.riscv.ara import AraTarget
 
 
 class CustomTarget(Target):
@@ -129,3 +137,141 @@ def test_target_host_x86(features, example_elf_file, capsys):
     t.exec("/bin/date")
 
     t.inspect(example_elf_file)
+
+
+def test_target_ara_verilator_cache(tmp_path):
+    (tmp_path / "ara" / "hardware").mkdir(parents=True)
+    config = {
+        "ara.src_dir": tmp_path / "ara",
+        "verilator.install_dir": tmp_path / "verilator",
+        "riscv_gcc.install_dir": tmp_path / "gcc",
+        "riscv_gcc.name": "riscv64-unknown-elf",
+        "riscv_gcc.variant": "unknown",
+        "ara.xlen": "64",
+        "ara.verilator_cache_dir": tmp_path / "cache",
+        "ara.verilator_threads": 2,
+    }
+    builds = []
+
+    def _fake_execute(*args, env=None, **kwargs):
+        if args[0] == "make":
+            builds.append(args)
+            (Path(env["veril_library"]) / "Vara_tb_verilator").touch()
+        return ""
+
+    with mock.patch("mlonmcu.target.riscv.ara.execute", side_effect=_fake_execute):
+        t = AraTarget(config=config)
+        t.prepare_simulator("foo.elf")
+        t2 = AraTarget(config=config)
+        t2.prepare_simulator("foo.elf")
+        assert len(builds) == 1
+        assert "-j2" in builds[0]
+        assert t.tb_ara_verilator_build_dir == t2.tb_ara_verilator_build_dir
+        assert (t.tb_ara_verilator_build_dir / "Vara_tb_verilator").is_file()
+        t3 = AraTarget(config={**config, "ara.nr_lanes": 8})
+        t3.prepare_simulator("foo.elf")
+        assert len(builds) == 2
+        assert t3.tb_ara_verilator_build_dir != t.tb_ara_verilator_build_dir
+        t4 = AraTarget(config={key: value for key, value in config.items() if key != "ara.verilator_cache_dir"})
+        t4.temp_dir = tmp_path / "temp"
+        assert t4.verilator_cache_dir == tmp_path / "temp" / "ara_verilator"
+
+
+class RepeatTarget(Target):
+    FEATURES = ["benchmark"]
+
+    def __init__(self, features=None, config=None):
+        super().__init__("repeat", features=features, config=config)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.count = 0
+
+    def get_metrics(self, elf, directory, *args, handle_exit=None):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.count += 1
+            cycles = 100 * self.count
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        metrics = Metrics()
+        metrics.add("Cycles", cycles)
+        metrics.add("MIPS", cycles / 10)
+        return metrics, f"out {directory}", []
+
+
+@pytest.mark.parametrize("num_workers", [1, 4])
+def test_target_parallel_repeat(num_workers):
+    benchmark = REGISTERED_FEATURES["benchmark"](
+        config={
+            "benchmark.num_repeat": 4,
+            "benchmark.num_workers": num_workers,
+            "benchmark.aggregate": "stats",
+        }
+    )
+    t = RepeatTarget(features=[benchmark])
+    artifacts, metrics = t.generate("foo.elf")
+    assert t.count == 5
+    assert t.max_active == num_workers
+    data = metrics["default"].get_data()
+    assert "Cycles" not in data
+    # The first (warmup) run is dropped
+    assert sorted(data.keys()) == sorted(
+        [
+            f"{prefix} {key}"
+            for key in ["Cycles", "MIPS"]
+            for prefix in ["Median", "Min", "Max", "Stddev", "CI95 Low", "CI95 High"]
+        ]
+    )
+    if num_workers == 1:
+        assert data["Min Cycles"] == 200
+        assert data["Max Cycles"] == 500
+        assert data["Median Cycles"] == 350
+    assert data["CI95 Low Cycles"] < 350 < data["CI95 High Cycles"]
+    assert artifacts["default"][-1].content.startswith("out ")
+
+
+def test_target_metrics_summarize():
+    values = [10, 12, 11, 13, None]
+    stats = summarize(values, ["mean", "median", "min", "max", "stddev", "ci"], confidence=0.9)
+    assert stats["Average"] == pytest.approx(11.5)
+    assert stats["Median"] == pytest.approx(11.5)
+    assert stats["Min"] == 10
+    assert stats["Max"] == 13
+    assert stats["Stddev"] == pytest.approx(1.29099, rel=1e-4)
+    # t(0.95, 3) = 2.353
+    assert stats["CI90 High"] - stats["Average"] == pytest.approx(2.353 * 1.29099 / 2, rel=1e-2)
+    single = summarize([5], ["stddev", "ci"])
+    assert single == {"Stddev": None, "CI95 Low": None, "CI95 High": None}
+
+
+class OutputTarget(Target):
+    def __init__(self, size, features=None, config=None):
+        super().__init__("output", features=features, config=config)
+        self.size = size
+
+    def get_metrics(self, elf, directory, *args, handle_exit=None):
+        out = ProcessOutput(max_size=1024)
+        out.write(b"x" * self.size + b"\nTotal Cycles: 42\n")
+        metrics = Metrics()
+        metrics.add("Cycles", int(search_output(r"Total Cycles: (.*)", out).group(1)))
+        return metrics, out, []
+
+
+@pytest.mark.parametrize("size", [10, 4096])
+def test_target_output_handle(size):
+    target = OutputTarget(size)
+    artifacts, metrics = target.generate("dummy.elf")
+    assert metrics["default"].get_data()["Cycles"] == 42
+    stdout = [artifact for artifact in artifacts["default"] if artifact.name == "output_out.log"][0]
+    # Outputs which exceed the in-memory limit are kept in a file (reading the content loads it into memory)
+    in_memory, path = stdout.in_memory, stdout.path
+    try:
+        assert in_memory == (size < 1024)
+        assert (path is None) == in_memory
+        assert stdout.content.endswith("Total Cycles: 42\n")
+    finally:
+        if path is not None:
+            Path(path).unlink(missing_ok=True)
@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Unit tests for the shared tuning records."""
+
+import json
+import pickle
+
+from mlonmcu.session.tuning_records import (
+    TuningRecordStore,
+    parse_record,
+    pick_best,
+    get_model_tuning_key,
+    get_tuning_record_store,
+)
+
+TARGET = "llvm -keys=cpu"
+
+
+def autotvm_record(workload, cost, error_no=0, config=0):
+    return json.dumps(
+        {
+            "input": [TARGET, "conv2d_nchw.x86", [workload], {}],
+            "config": {"index": config},
+            "result": [[cost], error_no, 1.0, 1234],
+            "version": 0.2,
+        }
+    )
+
+
+def ansor_record(workload, cost):
+    return json.dumps({"i": [[workload, TARGET, [], []], [[], []]], "r": [[cost, cost], 0, 1.0, 1234], "v": "v0.6"})
+
+
+def test_tuning_records_parse():
+    workload, target, cost = parse_record(autotvm_record("a", 2.0))
+    assert target == TARGET
+    assert cost == 2.0
+    assert parse_record(autotvm_record("a", 2.0, config=1))[0] == workload
+    assert parse_record(autotvm_record("a", 2.0, error_no=4))[2] == float("inf")
+    assert parse_record(ansor_record('["key"]', 3.0)) == ('["key"]', TARGET, 3.0)
+    assert parse_record("") is None
+    assert parse_record("foo") is None
+    assert parse_record("{}") is None
+
+
+def test_tuning_records_pick_best():
+    content = "\n".join(
+        [
+            autotvm_record("a", 2.0),
+            autotvm_record("a", 1.0, config=1),
+            autotvm_record("a", 0.5, error_no=1),
+            autotvm_record("b", 3.0),
+        ]
+    )
+    best = pick_best(content).splitlines()
+    assert best == [autotvm_record("a", 1.0, config=1), autotvm_record("b", 3.0)]
+
+
+def test_tuning_records_model_key(tmp_path):
+    model = tmp_path / "model.tflite"
+    model.write_bytes(b"\x00\x01")
+    key = get_model_tuning_key(model, ["--target", "llvm"], "autotvm")
+    assert key == get_model_tuning_key(model, ["--target", "llvm"], "autotvm")
+    assert key != get_model_tuning_key(model, ["--target", "c"], "autotvm")
+    assert key != get_model_tuning_key(model, ["--target", "llvm"], "auto_scheduler")
+
+
+def test_tuning_records_store(tmp_path):
+    store = TuningRecordStore(tmp_path / "records")
+    assert store.get_model_records("model") is None
+    assert not store.is_model_tuned("model")
+
+    # Task 1 only produced failed measurements
+    assert store.add(autotvm_record("a", 2.0), "ga", model="model", task=0) == 1
+    assert store.add(autotvm_record("b", 1.0, error_no=1), "ga", model="model", task=1) == 0
+    assert store.get_tuned_tasks("model", tuner="ga") == [0]
+    assert not store.is_model_tuned("model")
+    assert store.get_model_records("model") == autotvm_record("a", 2.0) + "\n"
+
+    assert store.add(autotvm_record("b", 1.0, config=1), "xgb", model="model", task=1) == 1
+    assert store.is_model_tuned("model")
+    assert not store.is_model_tuned("model", tuner="ga")
+    assert store.get_tuned_tasks("model", tuner="xgb") == [1]
+
+    # The best record is chosen across tuners unless a tuner is given
+    assert store.add(autotvm_record("a", 0.5, config=2), "xgb") == 1
+    assert store.add(autotvm_record("a", 3.0, config=3), "xgb") == 0
+    assert store.get_model_records("model").splitlines() == [
+        autotvm_record("a", 0.5, config=2),
+        autotvm_record("b", 1.0, config=1),
+    ]
+    assert store.get_model_records("model", tuner="ga").splitlines() == [autotvm_record("a", 2.0)]
+
+    # All records are kept in the per-tuner logs and the index survives a new instance
+    assert len((tmp_path / "records" / "xgb.log").read_text().splitlines()) == 3
+    assert TuningRecordStore(tmp_path / "records").is_model_tuned("model")
+
+
+def test_tuning_records_store_pickle(tmp_path):
+    store = get_tuning_record_store(tmp_path / "records")
+    restored = pickle.loads(pickle.dumps(store))
+    assert restored is store  # Unpickled in the same process
+    assert pickle.loads(pickle.dumps(TuningRecordStore(tmp_path / "other"))).directory == tmp_path / "other"
+
+
+def test_tuning_records_store_other_model(tmp_path):
+    store = TuningRecordStore(tmp_path / "records")
+    # The workload of the task of model B is known, but it was not tuned successfully yet
+    store.add(autotvm_record("c", 1.0, error_no=1), "ga", model="model_b", task=0)
+    assert store.get_tuned_tasks("model_b") == []
+    # Records found for the same workload while tuning another model are used as well
+    store.add(autotvm_record("c", 2.0), "ga", model="model_a", task=3)
+    assert store.get_tuned_tasks("model_b") == [0]
+    assert store.get_model_records("model_b") == autotvm_record("c", 2.0) + "\n"
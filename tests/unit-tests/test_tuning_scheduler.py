@@ -0,0 +1,172 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Unit tests for the session-level tuning scheduler."""
+
+import json
+
+import pytest
+
+from mlonmcu.platform.platform import TunePlatform
+from mlonmcu.session.tuning_records import TuningRecordStore
+from mlonmcu.session.tuning_scheduler import TuningScheduler, parse_task_indices, parse_tune_tasks
+
+
+def test_tuning_scheduler_parse_task_indices():
+    assert parse_task_indices(None, 3) == [0, 1, 2]
+    assert parse_task_indices("", 3) == [0, 1, 2]
+    assert parse_task_indices(1, 3) == [1]
+    assert parse_task_indices("0,2", 3) == [0, 2]
+    assert parse_task_indices("1-3,0,1", 4) == [1, 2, 3, 0]
+    with pytest.raises(AssertionError):
+        parse_task_indices("3", 3)
+
+
+def test_tuning_scheduler_parse_tune_tasks():
+    out = """Extracting tasks...
+Available Tasks for tuning:
+  0. Task(func_name=dense_nopack.x86, args=(1, 2))
+  1. Task(func_name=conv2d_NCHWc.x86, args=(3, 4))
+"""
+    assert parse_tune_tasks(out) == [
+        "Task(func_name=dense_nopack.x86, args=(1, 2))",
+        "Task(func_name=conv2d_NCHWc.x86, args=(3, 4))",
+    ]
+
+
+def make_records(name, num):
+    return "".join(
+        json.dumps({"input": ["llvm", name, [i], {}], "result": [[1.0 + i], 0, 1.0, 0]}) + "\n" for i in range(num)
+    )
+
+
+def test_tuning_scheduler_dedup():
+    calls = []
+
+    def func(trials, early_stopping):
+        calls.append(trials)
+        return "out", make_records("a", trials)
+
+    with TuningScheduler(num_workers=2) as scheduler:
+        future1 = scheduler.submit(("llvm", "a"), func, 5)
+        future2 = scheduler.submit(("llvm", "a"), func, 5)
+        future3 = scheduler.submit(("llvm", "b"), func, 3)
+        assert future1 is future2
+        assert len(future1.result()[1].splitlines()) == 5
+        future3.result()
+    assert sorted(calls) == [3, 5]
+    assert scheduler.used_trials == 8
+
+
+def test_tuning_scheduler_budget():
+    def func(trials, early_stopping):
+        assert early_stopping == 4
+        # Early stopping after two trials
+        return "", make_records("a", min(trials, 2))
+
+    with TuningScheduler(num_workers=1, budget=5, early_stopping=4) as scheduler:
+        results = [scheduler.submit(("llvm", str(i)), func, 3).result() for i in range(4)]
+    # The unused trials of early stopped tasks are returned to the budget
+    assert [len(records.splitlines()) for _, records in results] == [2, 2, 1, 0]
+    assert scheduler.used_trials == 5
+    assert scheduler.num_skipped == 1
+
+
+def test_tuning_scheduler_task_list():
+    calls = []
+
+    def list_tasks():
+        calls.append(None)
+        return ["a", "b"]
+
+    with TuningScheduler() as scheduler:
+        assert scheduler.get_task_list("model", list_tasks) == ["a", "b"]
+        assert scheduler.get_task_list("model", list_tasks) == ["a", "b"]
+    assert len(calls) == 1
+
+
+class DummyTunePlatform(TunePlatform):
+    """Platform where each model has two tasks and the second one has the same name for all models."""
+
+    DEFAULTS = {
+        **TunePlatform.DEFAULTS,
+        "autotuning_trials": 10,
+        "autotuning_tasks": None,
+        "autotuning_tuner": "ga",
+        "autotuning_mode": "autotvm",
+    }
+
+    def __init__(self, config=None):
+        super().__init__("dummy", config=config)
+        self.tuned = []
+
+    def get_tuning_target_args(self, backend):
+        return ["--target", "llvm"]
+
+    def list_tune_tasks(self, model_path, backend, target):
+        return [f"Task({model_path.name})", "Task(shared)"]
+
+    def tune_task(self, model_path, backend, target, idx, prepend="", trials=None, early_stopping=None):
+        name = self.list_tune_tasks(model_path, backend, target)[idx]
+        self.tuned.append(name)
+        return f"tuned {name}\n", make_records(name, trials)
+
+    def _tune_model(self, model_path, backend, target):
+        raise NotImplementedError
+
+
+def test_tuning_scheduler_tune_tasks(tmp_path):
+    models = []
+    for name in ["model1.tflite", "model2.tflite"]:
+        models.append(tmp_path / name)
+        models[-1].write_text(name)
+    platform = DummyTunePlatform(config={"dummy.autotuning_trials": 2})
+    platform.tuning_database = TuningRecordStore(tmp_path / "records")
+    with TuningScheduler(num_workers=2) as scheduler:
+        results = [platform.tune_tasks(scheduler, model, None, None) for model in models]
+    # Tasks with the same name might still be different workloads, so they are only shared within a model
+    assert sorted(platform.tuned) == ["Task(model1.tflite)", "Task(model2.tflite)", "Task(shared)", "Task(shared)"]
+    for out, records in results:
+        assert "Task(shared)" in out
+        assert len(records.splitlines()) == 4
+    for model in models:
+        model_key = platform.get_tuning_key(model, None)
+        assert platform.tuning_database.is_model_tuned(model_key)
+        assert len(platform.lookup_tuning_records(model, None).splitlines()) == 4
+
+    # Already tuned tasks are skipped in later sessions and only the selected tasks are tuned
+    platform.tuned = []
+    model3 = tmp_path / "model3.tflite"
+    model3.write_text("model3")
+    platform.config["autotuning_tasks"] = "0"
+    with TuningScheduler() as scheduler:
+        out, records = platform.tune_tasks(scheduler, models[0], None, None)
+        assert out == ""
+        assert len(records.splitlines()) == 4
+        platform.tune_tasks(scheduler, model3, None, None)
+    assert platform.tuned == ["Task(model3.tflite)"]
+
+
+def test_tuning_scheduler_tune_tasks_same_model(tmp_path):
+    model = tmp_path / "model.tflite"
+    model.write_text("model")
+    platform = DummyTunePlatform(config={"dummy.autotuning_trials": 2})
+    with TuningScheduler(num_workers=2) as scheduler:
+        results = [platform.tune_tasks(scheduler, model, None, None) for _ in range(2)]
+    assert sorted(platform.tuned) == ["Task(model.tflite)", "Task(shared)"]
+    assert results[0] == results[1]
@@ -16,10 +16,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import sys
 import pytest
 from io import StringIO
 
-from mlonmcu.utils import is_power_of_two, ask_user, get_base_prefix_compat, in_virtualenv
+from mlonmcu.utils import (
+    is_power_of_two,
+    ask_user,
+    get_base_prefix_compat,
+    in_virtualenv,
+    lazy_import,
+    LazyRegistry,
+    fingerprint_path,
+)
 
 
 def test_utils_is_power_of_two():
@@ -66,3 +75,35 @@ def test_utils_get_base_prefix_compat():
 
 def test_utils_in_virtualenv():
     assert isinstance(in_virtualenv(), bool)
+
+
+def test_utils_lazy_import(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    loaded = []
+    colorsys = lazy_import("colorsys", callback=loaded.append)
+    assert "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+    colorsys.hsv_to_rgb(0.0, 1.0, 1.0)
+    assert loaded == [sys.modules["colorsys"]]  # callback only invoked once
+
+
+def test_utils_lazy_registry():
+    registry = LazyRegistry()
+    registry["path"] = "pathlib:Path"
+    registry["int"] = int
+    assert "path" in registry
+    assert registry["path"].__name__ == "Path"
+    assert registry.get("int") is int
+    assert registry.get("missing") is None
+    assert dict(registry.items())["path"] is registry["path"]
+    assert set(registry.values()) == {registry["path"], int}
+
+
+def test_utils_fingerprint_path_git(tmp_path):
+    repo = tmp_path / "tvm"
+    (repo / ".git" / "refs" / "heads").mkdir(parents=True)
+    (repo / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (repo / ".git" / "refs" / "heads" / "main").write_text("abc123\n")
+    (repo / "python").mkdir()
+    assert fingerprint_path(repo / "python") == "git:abc123"